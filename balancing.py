@@ -0,0 +1,182 @@
+"""
+Пакетная балансировка команд для командных турниров.
+
+Все открытые заявки турнира (соло и неполные команды) раскладываются
+по командам фиксированного размера так, чтобы средние рейтинги команд
+были как можно ближе друг к другу. Заявка не делится: её участники
+всегда попадают в одну команду.
+"""
+
+import logging
+from typing import List, Dict, Any, Tuple
+
+import aiosqlite
+
+from database import queries as db_queries
+
+logger = logging.getLogger(__name__)
+
+# Ограничение на число улучшающих обменов в локальном поиске
+MAX_SWAP_ITERATIONS = 2000
+
+
+def _prepare_units(rows: List[Dict[str, Any]], team_size: int) -> List[Dict[str, Any]]:
+    """
+    Собрать заявки из строк (заявка × участник).
+    Заявки, которые не помещаются в команду или пересекаются по участникам
+    с уже взятыми, пропускаются.
+    """
+    units: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        unit = units.get(row["element_id"])
+        if unit is None:
+            unit = units[row["element_id"]] = {
+                "element_id": row["element_id"],
+                "member_ids": [],
+                "ratings": [],
+            }
+        unit["member_ids"].append(row["user_id"])
+        unit["ratings"].append(row["rating"])
+
+    # Пустой рейтинг считаем средним по турниру, чтобы не смещать баланс
+    known = [r for unit in units.values() for r in unit["ratings"] if r is not None]
+    default_rating = sum(known) / len(known) if known else 0.0
+
+    result = []
+    seen_users = set()
+    for unit in units.values():
+        size = len(unit["member_ids"])
+        if size == 0 or size >= team_size:
+            continue
+        if seen_users.intersection(unit["member_ids"]):
+            continue
+        seen_users.update(unit["member_ids"])
+        unit["size"] = size
+        unit["rating_sum"] = sum(default_rating if r is None else r for r in unit["ratings"])
+        result.append(unit)
+
+    return result
+
+
+def _greedy_assign(units: List[Dict[str, Any]], team_size: int, mean_rating: float) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Жадная раскладка: крупные и сильные заявки первыми,
+    каждая — в команду с минимальной прогнозной суммой рейтинга.
+    Возвращает (полные команды, оставшиеся заявки).
+    """
+    teams_count = sum(unit["size"] for unit in units) // team_size
+    teams = [{"units": [], "free": team_size, "rating_sum": 0.0} for _ in range(teams_count)]
+    leftover = []
+
+    ordered = sorted(units, key=lambda u: (u["size"], u["rating_sum"]), reverse=True)
+    for unit in ordered:
+        best = None
+        best_score = None
+        for team in teams:
+            if team["free"] < unit["size"]:
+                continue
+            # Прогноз: текущая сумма + свободные места, заполненные средним игроком
+            score = team["rating_sum"] + (team["free"] - unit["size"]) * mean_rating
+            if best_score is None or score < best_score:
+                best, best_score = team, score
+        if best is None:
+            leftover.append(unit)
+            continue
+        best["units"].append(unit)
+        best["free"] -= unit["size"]
+        best["rating_sum"] += unit["rating_sum"]
+
+    full_teams = []
+    for team in teams:
+        if team["free"] == 0:
+            full_teams.append(team)
+        else:
+            leftover.extend(team["units"])
+
+    return full_teams, leftover
+
+
+def _local_search(teams: List[Dict[str, Any]]) -> None:
+    """
+    Локальный поиск: обмениваем заявки одинакового размера между
+    самой сильной и самой слабой командой, пока разброс уменьшается.
+    """
+    if len(teams) < 2:
+        return
+
+    for _ in range(MAX_SWAP_ITERATIONS):
+        strong = max(teams, key=lambda t: t["rating_sum"])
+        weak = min(teams, key=lambda t: t["rating_sum"])
+        gap = strong["rating_sum"] - weak["rating_sum"]
+        if gap <= 0:
+            return
+
+        # Идеальный обмен переносит половину разрыва
+        best = None
+        best_error = gap
+        for i, strong_unit in enumerate(strong["units"]):
+            for j, weak_unit in enumerate(weak["units"]):
+                if strong_unit["size"] != weak_unit["size"]:
+                    continue
+                delta = strong_unit["rating_sum"] - weak_unit["rating_sum"]
+                if delta <= 0:
+                    continue
+                error = abs(gap - 2 * delta)
+                if error < best_error:
+                    best, best_error = (i, j, delta), error
+
+        if best is None:
+            return
+
+        i, j, delta = best
+        strong["units"][i], weak["units"][j] = weak["units"][j], strong["units"][i]
+        strong["rating_sum"] -= delta
+        weak["rating_sum"] += delta
+
+
+def balance_teams(rows: List[Dict[str, Any]], team_size: int) -> List[Dict[str, Any]]:
+    """
+    Разбить заявки на сбалансированные команды.
+    rows — строки (element_id, user_id, rating).
+    Возвращает список команд: {"element_ids", "member_ids", "rating_avg"}.
+    """
+    units = _prepare_units(rows, team_size)
+    if not units:
+        return []
+
+    total_members = sum(unit["size"] for unit in units)
+    mean_rating = sum(unit["rating_sum"] for unit in units) / total_members
+
+    teams, _ = _greedy_assign(units, team_size, mean_rating)
+    _local_search(teams)
+
+    return [
+        {
+            "element_ids": [unit["element_id"] for unit in team["units"]],
+            "member_ids": [user_id for unit in team["units"] for user_id in unit["member_ids"]],
+            "rating_avg": team["rating_sum"] / team_size,
+        }
+        for team in teams
+    ]
+
+
+async def form_balanced_teams(db: aiosqlite.Connection, event_id: int, team_size: int) -> List[int]:
+    """
+    Сформировать сбалансированные команды из всех открытых заявок турнира.
+    Чтение, расчёт и запись выполняются в одной транзакции.
+    Возвращает список group_id созданных команд.
+    """
+    await db.execute("BEGIN IMMEDIATE")
+    try:
+        rows = await db_queries.get_event_elements_for_balancing(db, event_id)
+        teams = balance_teams(rows, team_size)
+        if not teams:
+            await db.rollback()
+            return []
+        group_ids = await db_queries.create_balanced_groups(db, event_id, teams)
+    except Exception:
+        await db.rollback()
+        raise
+
+    logger.info(f"⚖️ Турнир {event_id}: сформировано команд — {len(group_ids)}")
+    return group_ids
@@ -0,0 +1,68 @@
+"""
+Микробенчмарк маршрутизации callback-запросов.
+
+Сравнивает обычный Router (F.data.startswith — перебор хэндлеров по порядку)
+с CallbackRouter (дерево префиксов) при разном числе хэндлеров.
+Замеряется выбор хэндлера и его вызов для callback последнего
+зарегистрированного префикса — худший случай для перебора.
+
+Запуск из корня проекта:
+    python -m benchmarks.callback_routing
+"""
+
+import asyncio
+import time
+
+from aiogram import F, Router
+from aiogram.types import CallbackQuery, User
+
+from utils.callbacks import CallbackPrefix, CallbackRouter
+
+HANDLER_COUNTS = (10, 100, 1000)
+ITERATIONS = 200
+
+
+async def _handler(callback: CallbackQuery) -> bool:
+    return True
+
+
+def build_linear(count: int) -> Router:
+    """Роутер с фильтрами F.data.startswith, как было до CallbackRouter."""
+    router = Router()
+    for i in range(count):
+        router.callback_query.register(_handler, F.data.startswith(f"action_{i}:"))
+    return router
+
+
+def build_prefix(count: int) -> CallbackRouter:
+    """Роутер с маршрутизацией по префиксу."""
+    router = CallbackRouter()
+    for i in range(count):
+        router.callback_query.register(_handler, CallbackPrefix(f"action_{i}", item_id=int))
+    return router
+
+
+async def measure(router: Router, callback: CallbackQuery) -> float:
+    """Среднее время одного апдейта, мкс."""
+    observer = router.callback_query
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        assert await observer.trigger(callback) is True
+    return (time.perf_counter() - started) / ITERATIONS * 1e6
+
+
+async def main():
+    user = User(id=1, is_bot=False, first_name="bench")
+    
+    print(f"{'хэндлеров':>10} {'перебор, мкс':>14} {'префикс, мкс':>14}")
+    for count in HANDLER_COUNTS:
+        callback = CallbackQuery(
+            id="1", from_user=user, chat_instance="1", data=f"action_{count - 1}:42"
+        )
+        linear = await measure(build_linear(count), callback)
+        prefix = await measure(build_prefix(count), callback)
+        print(f"{count:>10} {linear:>14.1f} {prefix:>14.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
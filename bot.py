@@ -11,10 +11,15 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from config import BOT_TOKEN, OWNER_IDS
-from database.connection import init_db
+from database.connection import init_db, close_pool
 from handlers import setup_routers
-from middlewares import DatabaseMiddleware, BlacklistMiddleware
-from scheduler import run_scheduler
+from notifications import join_request_digest
+import broadcast
+from middlewares import (
+    DatabaseMiddleware, BlacklistMiddleware, DedupMiddleware, ThrottlingMiddleware,
+    UsernameMiddleware, BackgroundMiddleware
+)
+from scheduler import run_scheduler, run_reaper, run_request_expiry
 
 
 async def main():
@@ -45,16 +50,40 @@ async def main():
     dp = Dispatcher(storage=storage)
     
     # Подключение middleware (порядок важен!)
+    # Защита от двойных нажатий — внешний слой: повтор отбрасывается
+    # до фильтров, а ожидание своей очереди не держит соединение с БД
+    dedup = DedupMiddleware()
+    dp.message.outer_middleware(dedup)
+    dp.callback_query.outer_middleware(dedup)
+    # Ограничение частоты — до DatabaseMiddleware, чтобы флуд не открывал соединения
+    throttling = ThrottlingMiddleware()
+    dp.message.middleware(throttling)
+    dp.callback_query.middleware(throttling)
+    # Тяжёлые хэндлеры (флаг background): мгновенный ответ на нажатие,
+    # работа — фоновой задачей, которая сама берёт соединение с БД
+    background = BackgroundMiddleware()
+    dp.callback_query.middleware(background)
     dp.message.middleware(DatabaseMiddleware())
     dp.callback_query.middleware(DatabaseMiddleware())
     dp.message.middleware(BlacklistMiddleware())
     dp.callback_query.middleware(BlacklistMiddleware())
+    # Актуальный telegram_username: пишется пачкой и только при изменении
+    usernames = UsernameMiddleware()
+    dp.message.middleware(usernames)
+    dp.callback_query.middleware(usernames)
     
     # Подключение роутеров
     dp.include_router(setup_routers())
     
     # Запуск планировщика в фоне
     scheduler_task = asyncio.create_task(run_scheduler())
+    reaper_task = asyncio.create_task(run_reaper())
+    expiry_task = asyncio.create_task(run_request_expiry())
+    usernames_task = asyncio.create_task(usernames.run())
+    # Доставка уведомлений планировщика с общим лимитом отправки
+    delivery_task = asyncio.create_task(broadcast.run_delivery(bot))
+    # Продолжаем рассылки, прерванные прошлой остановкой
+    await broadcast.resume_broadcasts(bot)
     
     # Запуск бота
     logger.info("🚀 Бот запущен!")
@@ -62,12 +91,20 @@ async def main():
     try:
         await dp.start_polling(bot)
     finally:
-        # Останавливаем планировщик
-        scheduler_task.cancel()
-        try:
-            await scheduler_task
-        except asyncio.CancelledError:
-            pass
+        # Останавливаем планировщик, фоновые задачи, запись username и доставку
+        for task in (scheduler_task, reaper_task, expiry_task, usernames_task, delivery_task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        # Даём фоновым хэндлерам доработать (недоделанные прерываем) до закрытия пула
+        await background.shutdown()
+        # Досылаем накопленные дайджесты запросов, пока пул ещё открыт
+        await join_request_digest.shutdown()
+        # Рассылки останавливаются с сохранением прогресса
+        await broadcast.shutdown()
+        await close_pool()
         await bot.session.close()
 
 
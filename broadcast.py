@@ -0,0 +1,210 @@
+"""
+Рассылки владельцев бота: всем пользователям или участникам одного турнира.
+
+Получатели читаются из БД пачками по возрастанию user_id (keyset, без OFFSET),
+поэтому память не зависит от числа получателей, а соединение с БД
+не держится открытым между пачками. После каждой пачки прогресс
+сохраняется в broadcasts.last_user_id: прерванная рассылка продолжается
+с места остановки после перезапуска (повторно может уйти не больше
+одного сообщения).
+
+Здесь же очередь доставки уведомлений планировщика (напоминания,
+закрытие турниров). Рассылки и очередь отправляют не быстрее
+BROADCAST_RATE сообщений в секунду вместе.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError, TelegramRetryAfter
+
+from config import BROADCAST_RATE, BROADCAST_BATCH_SIZE
+from database.connection import acquire_db, release_db
+from database import queries as db_queries
+from utils.ratelimit import TokenBucket
+from utils.render import BROADCAST_REPORT
+
+logger = logging.getLogger(__name__)
+
+# Общий лимит отправки на все рассылки (лимит Telegram — на бота целиком)
+_bucket = TokenBucket(BROADCAST_RATE, BROADCAST_RATE)
+
+# broadcast_id -> задача рассылки
+_tasks: Dict[int, asyncio.Task] = {}
+
+# Очередь доставки: (user_id, текст)
+_delivery: "asyncio.Queue[Tuple[int, str]]" = asyncio.Queue()
+
+SENT, FAILED, BLOCKED = "sent", "failed", "blocked"
+
+
+async def _send(bot: Bot, user_id: int, text: str) -> str:
+    """Отправить одно сообщение с учётом лимита. Возвращает итог отправки."""
+    while True:
+        while not _bucket.consume():
+            await asyncio.sleep(_bucket.wait_time())
+        try:
+            await bot.send_message(user_id, text)
+            return SENT
+        except TelegramRetryAfter as e:
+            # Telegram просит подождать — ждём и повторяем тому же получателю
+            await asyncio.sleep(e.retry_after)
+        except TelegramForbiddenError:
+            return BLOCKED
+        except TelegramAPIError as e:
+            logger.warning(f"⚠️ Рассылка: не удалось отправить {user_id}: {e}")
+            return FAILED
+
+
+async def _run(bot: Bot, broadcast_id: int) -> None:
+    """Разослать сообщение, начиная с сохранённого прогресса."""
+    db = await acquire_db()
+    try:
+        broadcast = await db_queries.get_broadcast(db, broadcast_id)
+    finally:
+        await release_db(db)
+    
+    if not broadcast or broadcast["status"] != "running":
+        return
+    
+    last_user_id = broadcast["last_user_id"]
+    while True:
+        db = await acquire_db()
+        try:
+            recipients = await db_queries.get_broadcast_recipients(
+                db, broadcast["event_id"], last_user_id, BROADCAST_BATCH_SIZE
+            )
+        finally:
+            await release_db(db)
+        
+        if not recipients:
+            break
+        
+        sent = failed = 0
+        blocked: List[int] = []
+        try:
+            for user_id in recipients:
+                result = await _send(bot, user_id, broadcast["text"])
+                if result == SENT:
+                    sent += 1
+                elif result == BLOCKED:
+                    blocked.append(user_id)
+                else:
+                    failed += 1
+                last_user_id = user_id
+        finally:
+            # Сохраняем прогресс и при отмене (остановка бота, /broadcast_cancel)
+            db = await acquire_db()
+            try:
+                running = await db_queries.save_broadcast_progress(
+                    db, broadcast_id, last_user_id, sent, failed, blocked
+                )
+            finally:
+                await release_db(db)
+        
+        if not running:
+            return
+    
+    db = await acquire_db()
+    try:
+        await db_queries.finish_broadcast(db, broadcast_id)
+        broadcast = await db_queries.get_broadcast(db, broadcast_id)
+    finally:
+        await release_db(db)
+    
+    logger.info(f"📣 Рассылка #{broadcast_id} завершена: отправлено {broadcast['sent_count']}")
+    try:
+        await bot.send_message(broadcast["admin_id"], BROADCAST_REPORT(**broadcast), parse_mode="HTML")
+    except TelegramAPIError:
+        pass
+
+
+async def _guarded_run(bot: Bot, broadcast_id: int) -> None:
+    try:
+        await _run(bot, broadcast_id)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Рассылка остаётся в статусе running и продолжится после перезапуска
+        logger.error(f"❌ Ошибка рассылки #{broadcast_id}: {e}")
+
+
+def start_broadcast(bot: Bot, broadcast_id: int) -> None:
+    """Запустить рассылку в фоне (если она ещё не запущена)."""
+    if broadcast_id in _tasks:
+        return
+    task = asyncio.create_task(_guarded_run(bot, broadcast_id))
+    _tasks[broadcast_id] = task
+    task.add_done_callback(lambda _: _tasks.pop(broadcast_id, None))
+
+
+def stop_broadcast(broadcast_id: int) -> None:
+    """Прервать отправку рассылки (прогресс сохраняется)."""
+    task = _tasks.get(broadcast_id)
+    if task:
+        task.cancel()
+
+
+async def resume_broadcasts(bot: Bot) -> None:
+    """Продолжить рассылки, прерванные остановкой бота."""
+    db = await acquire_db()
+    try:
+        broadcast_ids = await db_queries.get_running_broadcasts(db)
+    finally:
+        await release_db(db)
+    
+    for broadcast_id in broadcast_ids:
+        logger.info(f"📣 Продолжаем рассылку #{broadcast_id}")
+        start_broadcast(bot, broadcast_id)
+
+
+async def shutdown() -> None:
+    """Остановить рассылки, сохранив прогресс (при остановке бота)."""
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# ==================== ОЧЕРЕДЬ ДОСТАВКИ ====================
+
+def enqueue(messages: Iterable[Tuple[int, str]]) -> int:
+    """Поставить сообщения (user_id, текст) в очередь доставки. Возвращает их число."""
+    count = 0
+    for message in messages:
+        _delivery.put_nowait(message)
+        count += 1
+    return count
+
+
+async def _mark_blocked(user_ids: List[int]) -> None:
+    try:
+        db = await acquire_db()
+        try:
+            await db_queries.mark_blocked_recipients(db, user_ids)
+        finally:
+            await release_db(db)
+    except Exception as e:
+        logger.error(f"❌ Ошибка при отметке заблокировавших бота: {e}")
+
+
+async def run_delivery(bot: Bot) -> None:
+    """Фоновая доставка очереди с общим лимитом отправки (до отмены)."""
+    blocked: List[int] = []
+    try:
+        while True:
+            user_id, text = await _delivery.get()
+            if await _send(bot, user_id, text) == BLOCKED:
+                blocked.append(user_id)
+            
+            # Отметки о блокировке пишем пачкой: очередь опустела или пачка набралась
+            if blocked and (_delivery.empty() or len(blocked) >= BROADCAST_BATCH_SIZE):
+                await _mark_blocked(blocked)
+                blocked = []
+    finally:
+        if blocked:
+            await _mark_blocked(blocked)
+        if not _delivery.empty():
+            logger.warning(f"⚠️ Остановка: не доставлено уведомлений — {_delivery.qsize()}")
@@ -14,6 +14,11 @@ BASE_DIR = Path(__file__).resolve().parent
 DB_PATH = BASE_DIR / "database" / "bot.db"
 SCHEMA_PATH = BASE_DIR / "database" / "schema.sql"
 
+# Пул соединений с БД: сколько простаивающих соединений держать открытыми
+# и сколько подготовленных запросов кэшировать на каждом соединении
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+
 # Константы для пола
 GENDER_MALE = "male"
 GENDER_FEMALE = "female"
@@ -22,6 +27,63 @@ GENDER_LABELS = {
     GENDER_FEMALE: "👩 Женский"
 }
 
+# Сколько лучших заявок показывать в поиске (ранжирование по совместимости)
+SEARCH_TOP_K = int(os.getenv("SEARCH_TOP_K", "30"))
+
+# Сколько пользователей держать в кэше счётчиков профиля
+USER_STATS_CACHE_SIZE = int(os.getenv("USER_STATS_CACHE_SIZE", "5000"))
+
+# Фоновая очистка удалённых турниров и аккаунтов:
+# сколько строк удалять за одну транзакцию и пауза между проходами (сек)
+REAPER_BATCH_SIZE = int(os.getenv("REAPER_BATCH_SIZE", "500"))
+REAPER_INTERVAL = int(os.getenv("REAPER_INTERVAL", "30"))
+
+# Истечение запросов на присоединение: как часто проверять (сек)
+# и сколько запросов помечать за одну транзакцию
+REQUEST_EXPIRY_INTERVAL = int(os.getenv("REQUEST_EXPIRY_INTERVAL", "300"))
+REQUEST_EXPIRY_BATCH_SIZE = int(os.getenv("REQUEST_EXPIRY_BATCH_SIZE", "500"))
+
+# Повторное нажатие той же кнопки в течение окна (сек) игнорируется
+CALLBACK_DEDUP_WINDOW = float(os.getenv("CALLBACK_DEDUP_WINDOW", "2"))
+# Максимум пользователей, для которых одновременно хранятся блокировки
+USER_LOCKS_MAX = int(os.getenv("USER_LOCKS_MAX", "10000"))
+
+# Ограничение частоты запросов: (токенов в секунду, размер пачки).
+# Ключ задаётся флагом хэндлера throttling_key, без флага — "default".
+THROTTLING_RATES = {
+    "default": (1.0, 5),
+    "search": (0.2, 3),      # /search и поиск заявок — самые тяжёлые запросы
+    "view": (1.0, 5),        # Просмотр заявок
+    "calendar": (3.0, 10),   # Листание календаря
+}
+# Общий лимит на всех пользователей вместе (защищает БД)
+THROTTLING_GLOBAL_RATE = float(os.getenv("THROTTLING_GLOBAL_RATE", "50"))
+THROTTLING_GLOBAL_BURST = int(os.getenv("THROTTLING_GLOBAL_BURST", "100"))
+
+# Обновление telegram_username: изменения копятся и пишутся пачкой раз в интервал (сек)
+USERNAME_FLUSH_INTERVAL = float(os.getenv("USERNAME_FLUSH_INTERVAL", "5"))
+# Для скольких пользователей помнить последний увиденный username
+USERNAME_CACHE_SIZE = int(os.getenv("USERNAME_CACHE_SIZE", "10000"))
+
+# Тяжёлые callback-хэндлеры (флаг background) выполняются в фоне:
+# сколько таких задач может работать одновременно (у одного пользователя —
+# одна, её очередь держит DedupMiddleware) и сколько секунд ждать
+# их завершения при остановке бота
+BACKGROUND_TASKS_MAX = int(os.getenv("BACKGROUND_TASKS_MAX", "20"))
+BACKGROUND_SHUTDOWN_TIMEOUT = float(os.getenv("BACKGROUND_SHUTDOWN_TIMEOUT", "10"))
+
+# Уведомления о запросах: первый приходит владельцу сразу, остальные
+# за окно (сек) объединяются в один дайджест по заявке
+NOTIFY_DIGEST_WINDOW = float(os.getenv("NOTIFY_DIGEST_WINDOW", "30"))
+
+# Рассылки владельцев: сообщений в секунду на все рассылки (лимит Telegram — 30,
+# оставляем запас для обычных ответов) и сколько получателей читать из БД за раз
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "50"))
+
+# В котором часу рассылать напоминания о завтрашних турнирах
+REMINDER_HOUR = int(os.getenv("REMINDER_HOUR", "10"))
+
 
 def is_owner(user_id: int) -> bool:
     """Проверить, является ли пользователь владельцем бота."""
@@ -0,0 +1,111 @@
+"""
+In-process кэши для горячих запросов на чтение.
+"""
+
+from collections import OrderedDict
+from datetime import date
+from typing import Optional, List, Dict, Any
+
+from config import USER_STATS_CACHE_SIZE
+
+from utils.dates import get_days_until
+
+
+class OpenEventsCache:
+    """
+    Версионированный read-through кэш списка открытых турниров.
+
+    Любая запись, меняющая список (создание, редактирование, закрытие,
+    удаление турнира), вызывает invalidate() и повышает версию.
+    Результат запроса, начатого до инвалидации, не сохраняется.
+    Бейджи дат (date_badge) считаются при заполнении и пересчитываются
+    при смене дня без обращения к БД.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._events: Optional[List[Dict[str, Any]]] = None
+        self._day: Optional[date] = None
+
+    def invalidate(self) -> None:
+        """Сбросить кэш после изменения турниров."""
+        self.version += 1
+        self._events = None
+
+    def get(self) -> Optional[List[Dict[str, Any]]]:
+        """Вернуть копию списка или None, если кэш пуст."""
+        if self._events is None:
+            return None
+        if self._day != date.today():
+            self._refresh_badges()
+        # Хэндлеры дополняют словари, поэтому отдаём копии
+        return [dict(event) for event in self._events]
+
+    def store(self, version: int, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Добавить бейджи и сохранить результат запроса, если версия не изменилась."""
+        today = date.today()
+        _add_date_badges(events, today)
+        if version != self.version:
+            return events
+        self._events = events
+        self._day = today
+        return self.get()
+
+    def _refresh_badges(self) -> None:
+        """Пересчитать бейджи дат относительно сегодняшнего дня."""
+        self._day = date.today()
+        _add_date_badges(self._events, self._day)
+
+
+def _add_date_badges(events: List[Dict[str, Any]], today: date) -> None:
+    """Проставить date_badge каждому турниру."""
+    for event in events:
+        event["date_badge"] = get_days_until(event.get("event_date"), today)
+
+
+class UserStatsCache:
+    """
+    Кэш счётчиков профиля по пользователям (LRU).
+
+    Записи, меняющие заявки, участие, запросы или группы, вызывают
+    invalidate() для затронутых пользователей уже после коммита.
+    Как и в OpenEventsCache, любая инвалидация повышает версию,
+    и результат запроса, начатого раньше неё, не сохраняется.
+    """
+
+    def __init__(self, max_size: int):
+        self.version = 0
+        self.max_size = max_size
+        self._stats: "OrderedDict[int, Dict[str, int]]" = OrderedDict()
+
+    def get(self, user_id: int) -> Optional[Dict[str, int]]:
+        """Вернуть копию счётчиков или None, если их нет в кэше."""
+        stats = self._stats.get(user_id)
+        if stats is None:
+            return None
+        self._stats.move_to_end(user_id)
+        return dict(stats)
+
+    def store(self, version: int, user_id: int, stats: Dict[str, int]) -> Dict[str, int]:
+        """Сохранить счётчики, если с начала запроса не было инвалидаций."""
+        if version == self.version:
+            self._stats[user_id] = dict(stats)
+            self._stats.move_to_end(user_id)
+            while len(self._stats) > self.max_size:
+                self._stats.popitem(last=False)
+        return stats
+
+    def invalidate(self, *user_ids: int) -> None:
+        """Сбросить счётчики указанных пользователей."""
+        self.version += 1
+        for user_id in user_ids:
+            self._stats.pop(user_id, None)
+
+    def clear(self) -> None:
+        """Сбросить все счётчики (массовые изменения: удаление турнира, очистка)."""
+        self.version += 1
+        self._stats.clear()
+
+
+open_events_cache = OpenEventsCache()
+user_stats_cache = UserStatsCache(USER_STATS_CACHE_SIZE)
@@ -1,5 +1,66 @@
+from typing import List
+
 import aiosqlite
-from config import DB_PATH, SCHEMA_PATH
+from config import DB_PATH, SCHEMA_PATH, DB_POOL_SIZE, DB_STATEMENT_CACHE_SIZE
+
+
+# Колонки, добавленные в существующие таблицы после первого релиза.
+# CREATE TABLE IF NOT EXISTS их не добавит, поэтому дописываем через ALTER TABLE.
+# Последний элемент — запрос заполнения колонки для уже существующих строк.
+COLUMN_MIGRATIONS = [
+    ("users", "deleted_at", "TEXT", None),
+    ("events", "deleted_at", "TEXT", None),
+    (
+        "elements", "members_count", "INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE elements SET members_count = (
+            SELECT COUNT(*) FROM element_members em WHERE em.element_id = elements.element_id
+        )
+        """
+    ),
+]
+
+
+async def migrate_columns(db: aiosqlite.Connection) -> None:
+    """Добавить недостающие колонки в уже существующие таблицы."""
+    for table, column, definition, backfill in COLUMN_MIGRATIONS:
+        cursor = await db.execute(f"PRAGMA table_info({table})")
+        columns = {row[1] for row in await cursor.fetchall()}
+        # Пустой результат — таблицы ещё нет, её создаст schema.sql
+        if columns and column not in columns:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            if backfill:
+                await db.execute(backfill)
+
+
+async def dedupe_pending_requests(db: aiosqlite.Connection) -> None:
+    """
+    Отклонить повторные ожидающие запросы (оставить самый ранний),
+    чтобы можно было создать уникальный индекс idx_join_requests_pending_unique.
+    """
+    cursor = await db.execute(
+        """
+        SELECT
+            EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'join_requests'),
+            EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_join_requests_pending_unique')
+        """
+    )
+    table_exists, index_exists = await cursor.fetchone()
+    if not table_exists or index_exists:
+        return
+    
+    await db.execute(
+        """
+        UPDATE join_requests
+        SET status = 'rejected'
+        WHERE status = 'pending'
+          AND join_id NOT IN (
+              SELECT MIN(join_id) FROM join_requests
+              WHERE status = 'pending'
+              GROUP BY element_id, requester_id
+          )
+        """
+    )
 
 
 async def init_db():
@@ -7,6 +68,10 @@ async def init_db():
     async with aiosqlite.connect(DB_PATH) as db:
         await db.execute("PRAGMA foreign_keys = ON;")
         
+        # Миграции до схемы: индексы в schema.sql ссылаются на новые колонки
+        await migrate_columns(db)
+        await dedupe_pending_requests(db)
+        
         with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
             schema = f.read()
         
@@ -17,7 +82,43 @@ async def init_db():
 
 async def get_db() -> aiosqlite.Connection:
     """Получить соединение с БД."""
-    db = await aiosqlite.connect(DB_PATH)
+    # Кэш подготовленных запросов рассчитан на весь набор запросов queries.py
+    db = await aiosqlite.connect(DB_PATH, cached_statements=DB_STATEMENT_CACHE_SIZE)
     await db.execute("PRAGMA foreign_keys = ON;")
     db.row_factory = aiosqlite.Row  # доступ к колонкам по имени
     return db
+
+
+# ==================== ПУЛ СОЕДИНЕНИЙ ====================
+# Соединения переиспользуются между апдейтами, поэтому подготовленные
+# запросы остаются в кэше sqlite3, а не компилируются заново каждый раз.
+
+_idle_connections: List[aiosqlite.Connection] = []
+
+
+async def acquire_db() -> aiosqlite.Connection:
+    """Взять соединение из пула (или открыть новое, если свободных нет)."""
+    if _idle_connections:
+        return _idle_connections.pop()
+    return await get_db()
+
+
+async def release_db(db: aiosqlite.Connection) -> None:
+    """Вернуть соединение в пул. Незавершённая транзакция откатывается."""
+    try:
+        if db.in_transaction:
+            await db.rollback()
+    except Exception:
+        await db.close()
+        return
+    
+    if len(_idle_connections) < DB_POOL_SIZE:
+        _idle_connections.append(db)
+    else:
+        await db.close()
+
+
+async def close_pool() -> None:
+    """Закрыть все простаивающие соединения (при остановке бота)."""
+    while _idle_connections:
+        await _idle_connections.pop().close()
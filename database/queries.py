@@ -4,22 +4,30 @@
 """
 
 import aiosqlite
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
 
+from database.cache import open_events_cache, user_stats_cache
+
 
 # ==================== HELPERS ====================
 
+# dict(row) ищет каждую колонку по имени (линейный поиск по описанию курсора),
+# поэтому строим словари через zip с именами колонок, взятыми один раз на выборку.
+
 def row_to_dict(row: aiosqlite.Row) -> Dict[str, Any]:
     """Преобразовать Row в словарь."""
     if row is None:
         return None
-    return dict(row)
+    return dict(zip(row.keys(), row))
 
 
 def rows_to_list(rows: List[aiosqlite.Row]) -> List[Dict[str, Any]]:
-    """Преобразовать список Row в список словарей."""
-    return [dict(row) for row in rows]
+    """Преобразовать список Row в список словарей (все строки одной формы)."""
+    if not rows:
+        return []
+    keys = rows[0].keys()
+    return [dict(zip(keys, row)) for row in rows]
 
 
 # ==================== USERS ====================
@@ -27,7 +35,7 @@ def rows_to_list(rows: List[aiosqlite.Row]) -> List[Dict[str, Any]]:
 async def get_user(db: aiosqlite.Connection, user_id: int) -> Optional[Dict[str, Any]]:
     """Получить пользователя по ID."""
     cursor = await db.execute(
-        "SELECT * FROM users WHERE user_id = ?",
+        "SELECT * FROM users WHERE user_id = ? AND deleted_at IS NULL",
         (user_id,)
     )
     row = await cursor.fetchone()
@@ -36,6 +44,8 @@ async def get_user(db: aiosqlite.Connection, user_id: int) -> Optional[Dict[str,
 
 async def create_user(db: aiosqlite.Connection, user_id: int, telegram_username: Optional[str] = None) -> None:
     """Создать нового пользователя (без данных профиля)."""
+    # Аккаунт, удалённый ранее, дочищаем сразу, иначе INSERT OR IGNORE его не заменит
+    await purge_user(db, user_id)
     await db.execute(
         "INSERT OR IGNORE INTO users (user_id, telegram_username) VALUES (?, ?)",
         (user_id, telegram_username)
@@ -52,6 +62,18 @@ async def update_telegram_username(db: aiosqlite.Connection, user_id: int, teleg
     await db.commit()
 
 
+async def update_telegram_usernames(db: aiosqlite.Connection, usernames: Dict[int, Optional[str]]) -> None:
+    """
+    Обновить Telegram username нескольких пользователей одной транзакцией.
+    Строки, где username не изменился, не перезаписываются.
+    """
+    await db.executemany(
+        "UPDATE users SET telegram_username = ? WHERE user_id = ? AND telegram_username IS NOT ?",
+        [(username, user_id, username) for user_id, username in usernames.items()]
+    )
+    await db.commit()
+
+
 async def update_user_profile(
     db: aiosqlite.Connection,
     user_id: int,
@@ -119,7 +141,7 @@ async def update_gender(db: aiosqlite.Connection, user_id: int, gender: str) ->
 async def is_profile_complete(db: aiosqlite.Connection, user_id: int) -> bool:
     """Проверить, заполнен ли профиль (имя, рейтинг и пол)."""
     cursor = await db.execute(
-        "SELECT username, rating, gender FROM users WHERE user_id = ?",
+        "SELECT username, rating, gender FROM users WHERE user_id = ? AND deleted_at IS NULL",
         (user_id,)
     )
     row = await cursor.fetchone()
@@ -144,7 +166,7 @@ async def get_group_members_with_contacts(db: aiosqlite.Connection, group_id: in
             gm.joined_at
         FROM group_members gm
         JOIN users u ON gm.user_id = u.user_id
-        WHERE gm.group_id = ?
+        WHERE gm.group_id = ? AND u.deleted_at IS NULL
         ORDER BY gm.joined_at ASC
         """,
         (group_id,)
@@ -152,13 +174,113 @@ async def get_group_members_with_contacts(db: aiosqlite.Connection, group_id: in
     rows = await cursor.fetchall()
     return rows_to_list(rows)
 
+async def get_user_footprint(db: aiosqlite.Connection, user_id: int) -> Dict[str, int]:
+    """
+    Посчитать данные пользователя одним запросом (без выборки самих строк).
+    Возвращает словарь: {
+        "events_owned": ...,       # Созданные турниры
+        "active_elements": ...,    # Активные заявки (создатель или участник)
+        "groups": ...,             # Участие в группах
+        "pending_requests": ...,   # Отправленные ожидающие запросы
+        "incoming_requests": ...   # Ожидающие запросы к заявкам пользователя
+    }
+    """
+    cursor = await db.execute(
+        """
+        SELECT
+            (SELECT COUNT(*) FROM events
+             WHERE owner_id = :user_id AND deleted_at IS NULL) as events_owned,
+            (SELECT COUNT(*) FROM elements e
+             JOIN events ev ON e.event_id = ev.event_id
+             WHERE e.is_active = 1
+               AND ev.deleted_at IS NULL
+               AND e.element_id IN (
+                   SELECT element_id FROM elements WHERE creator_id = :user_id
+                   UNION
+                   SELECT element_id FROM element_members WHERE user_id = :user_id
+               )) as active_elements,
+            (SELECT COUNT(*) FROM group_members gm
+             JOIN groups g ON gm.group_id = g.group_id
+             JOIN events ev ON g.event_id = ev.event_id
+             WHERE gm.user_id = :user_id AND ev.deleted_at IS NULL) as groups,
+            (SELECT COUNT(*) FROM join_requests jr
+             JOIN elements e ON jr.element_id = e.element_id
+             JOIN events ev ON e.event_id = ev.event_id
+             WHERE jr.requester_id = :user_id
+               AND jr.status = 'pending'
+               AND ev.deleted_at IS NULL) as pending_requests,
+            (SELECT COUNT(*) FROM join_requests jr
+             JOIN elements e ON jr.element_id = e.element_id
+             JOIN events ev ON e.event_id = ev.event_id
+             WHERE e.creator_id = :user_id
+               AND jr.status = 'pending'
+               AND ev.deleted_at IS NULL) as incoming_requests
+        """,
+        {"user_id": user_id}
+    )
+    row = await cursor.fetchone()
+    return row_to_dict(row)
+
+
+async def get_user_stats(db: aiosqlite.Connection, user_id: int) -> Dict[str, int]:
+    """Счётчики для профиля (get_user_footprint через кэш user_stats_cache)."""
+    stats = user_stats_cache.get(user_id)
+    if stats is not None:
+        return stats
+    
+    version = user_stats_cache.version
+    stats = await get_user_footprint(db, user_id)
+    return user_stats_cache.store(version, user_id, stats)
+
+
+async def _element_users(db: aiosqlite.Connection, where: str, params: tuple) -> List[int]:
+    """
+    Пользователи, чьи счётчики зависят от заявок, выбранных условием where
+    (по алиасу e): создатели, участники и авторы ожидающих запросов.
+    """
+    cursor = await db.execute(
+        f"""
+        SELECT e.creator_id FROM elements e WHERE {where}
+        UNION
+        SELECT em.user_id FROM element_members em
+        JOIN elements e ON em.element_id = e.element_id
+        WHERE {where}
+        UNION
+        SELECT jr.requester_id FROM join_requests jr
+        JOIN elements e ON jr.element_id = e.element_id
+        WHERE {where} AND jr.status = 'pending'
+        """,
+        params * 3
+    )
+    return [row[0] for row in await cursor.fetchall()]
+
+
 async def delete_user(db: aiosqlite.Connection, user_id: int) -> None:
-    """Удалить пользователя и все связанные данные (каскадно)."""
+    """
+    Удалить пользователя: пометить аккаунт и его турниры удалёнными.
+    Связанные данные удаляет фоновая очистка (reap_deleted_users).
+    """
+    await db.execute(
+        "UPDATE users SET deleted_at = datetime('now') WHERE user_id = ? AND deleted_at IS NULL",
+        (user_id,)
+    )
     await db.execute(
-        "DELETE FROM users WHERE user_id = ?",
+        """
+        UPDATE events
+        SET deleted_at = datetime('now'), status = 'closed'
+        WHERE owner_id = ? AND deleted_at IS NULL
+        """,
+        (user_id,)
+    )
+    # Заявки пользователя сразу убираем из поиска
+    await db.execute(
+        "UPDATE elements SET is_active = 0 WHERE creator_id = ? AND is_active = 1",
         (user_id,)
     )
     await db.commit()
+    # Вместе с пользователем удаляются и его турниры
+    open_events_cache.invalidate()
+    user_stats_cache.clear()
 
 
 # ==================== EVENTS ====================
@@ -185,13 +307,15 @@ async def create_event(
         (owner_id, title, event_type, team_size, description, event_date)
     )
     await db.commit()
+    open_events_cache.invalidate()
+    user_stats_cache.invalidate(owner_id)
     return cursor.lastrowid
 
 
 async def get_event(db: aiosqlite.Connection, event_id: int) -> Optional[Dict[str, Any]]:
     """Получить событие по ID."""
     cursor = await db.execute(
-        "SELECT * FROM events WHERE event_id = ?",
+        "SELECT * FROM events WHERE event_id = ? AND deleted_at IS NULL",
         (event_id,)
     )
     row = await cursor.fetchone()
@@ -199,13 +323,21 @@ async def get_event(db: aiosqlite.Connection, event_id: int) -> Optional[Dict[st
 
 
 async def list_open_events(db: aiosqlite.Connection) -> List[Dict[str, Any]]:
-    """Получить список открытых событий, отсортированных по дате."""
+    """
+    Получить список открытых событий, отсортированных по дате.
+    Читает из кэша; у каждого события есть готовый date_badge.
+    """
+    events = open_events_cache.get()
+    if events is not None:
+        return events
+    
+    version = open_events_cache.version
     cursor = await db.execute(
         """
         SELECT e.*, u.username as owner_name
         FROM events e
         LEFT JOIN users u ON e.owner_id = u.user_id
-        WHERE e.status = 'open'
+        WHERE e.status = 'open' AND e.deleted_at IS NULL
         ORDER BY 
             CASE WHEN e.event_date IS NULL THEN 1 ELSE 0 END,
             e.event_date ASC,
@@ -213,7 +345,7 @@ async def list_open_events(db: aiosqlite.Connection) -> List[Dict[str, Any]]:
         """
     )
     rows = await cursor.fetchall()
-    return rows_to_list(rows)
+    return open_events_cache.store(version, rows_to_list(rows))
 
 
 async def list_user_events(db: aiosqlite.Connection, user_id: int) -> List[Dict[str, Any]]:
@@ -221,7 +353,7 @@ async def list_user_events(db: aiosqlite.Connection, user_id: int) -> List[Dict[
     cursor = await db.execute(
         """
         SELECT * FROM events
-        WHERE owner_id = ?
+        WHERE owner_id = ? AND deleted_at IS NULL
         ORDER BY created_at DESC
         """,
         (user_id,)
@@ -241,44 +373,88 @@ async def close_event(db: aiosqlite.Connection, event_id: int, owner_id: int) ->
         (event_id, owner_id)
     )
     await db.commit()
+    open_events_cache.invalidate()
     return cursor.rowcount > 0
 
 
-async def get_expired_events(db: aiosqlite.Connection, current_date: str) -> List[Dict[str, Any]]:
+async def close_expired_events(db: aiosqlite.Connection, current_date: str) -> List[Dict[str, Any]]:
     """
-    Получить события, которые нужно закрыть (дата проведения прошла).
-    current_date в формате YYYY-MM-DD
+    Закрыть все события, дата проведения которых прошла, и записать лог
+    по каждому — одной транзакцией. Возвращает закрытые события.
     """
     cursor = await db.execute(
         """
-        SELECT * FROM events
+        UPDATE events
+        SET status = 'closed'
         WHERE status = 'open'
           AND event_date IS NOT NULL
           AND event_date < ?
+        RETURNING event_id, title, event_date
         """,
         (current_date,)
     )
+    closed = rows_to_list(await cursor.fetchall())
+    if closed:
+        await db.executemany(
+            "INSERT INTO logs (event_type, details) VALUES ('event_auto_closed', ?)",
+            [
+                (f"event_id={e['event_id']}, title={e['title']}, event_date={e['event_date']}",)
+                for e in closed
+            ]
+        )
+    await db.commit()
+    if closed:
+        open_events_cache.invalidate()
+    return closed
+
+
+async def get_open_events_on_date(db: aiosqlite.Connection, event_date: str) -> List[Dict[str, Any]]:
+    """Открытые события, которые проводятся в указанную дату (YYYY-MM-DD)."""
+    cursor = await db.execute(
+        """
+        SELECT event_id, title, event_date FROM events
+        WHERE event_date = ?
+          AND status = 'open'
+          AND deleted_at IS NULL
+        """,
+        (event_date,)
+    )
     rows = await cursor.fetchall()
     return rows_to_list(rows)
 
 
-async def close_expired_events(db: aiosqlite.Connection, current_date: str) -> int:
+async def get_events_participants(db: aiosqlite.Connection, event_ids: List[int]) -> List[Tuple[int, int]]:
     """
-    Закрыть все события, дата проведения которых прошла.
-    Возвращает количество закрытых событий.
+    Участники нескольких событий одним запросом: пары (user_id, event_id)
+    из заявок и сформированных групп, без повторов.
+    Удалённые, заблокированные и заблокировавшие бота пользователи пропускаются.
     """
+    if not event_ids:
+        return []
+    
+    placeholders = ",".join("?" * len(event_ids))
     cursor = await db.execute(
-        """
-        UPDATE events
-        SET status = 'closed'
-        WHERE status = 'open'
-          AND event_date IS NOT NULL
-          AND event_date < ?
+        f"""
+        SELECT p.user_id, p.event_id
+        FROM (
+            SELECT em.user_id, e.event_id
+            FROM element_members em
+            JOIN elements e ON e.element_id = em.element_id
+            WHERE e.event_id IN ({placeholders})
+            UNION
+            SELECT gm.user_id, g.event_id
+            FROM group_members gm
+            JOIN groups g ON g.group_id = gm.group_id
+            WHERE g.event_id IN ({placeholders})
+        ) p
+        JOIN users u ON u.user_id = p.user_id
+        WHERE u.deleted_at IS NULL
+          AND NOT EXISTS (SELECT 1 FROM blacklist b WHERE b.user_id = p.user_id)
+          AND NOT EXISTS (SELECT 1 FROM blocked_recipients br WHERE br.user_id = p.user_id)
         """,
-        (current_date,)
+        tuple(event_ids) * 2
     )
-    await db.commit()
-    return cursor.rowcount
+    return [(row[0], row[1]) for row in await cursor.fetchall()]
 
 
 async def update_event(
@@ -315,6 +491,7 @@ async def update_event(
     
     cursor = await db.execute(query, params)
     await db.commit()
+    open_events_cache.invalidate()
     return cursor.rowcount > 0
 
 
@@ -349,6 +526,7 @@ async def create_element(
         )
     
     await db.commit()
+    user_stats_cache.invalidate(creator_id, *initial_members)
     return element_id
 
 
@@ -360,12 +538,11 @@ async def get_element(db: aiosqlite.Connection, element_id: int) -> Optional[Dic
                ev.title as event_title,
                ev.type as event_type,
                ev.team_size as event_team_size,
-               u.username as creator_name,
-               (SELECT COUNT(*) FROM element_members em WHERE em.element_id = e.element_id) as members_count
+               u.username as creator_name
         FROM elements e
-        LEFT JOIN events ev ON e.event_id = ev.event_id
+        JOIN events ev ON e.event_id = ev.event_id
         LEFT JOIN users u ON e.creator_id = u.user_id
-        WHERE e.element_id = ?
+        WHERE e.element_id = ? AND ev.deleted_at IS NULL
         """,
         (element_id,)
     )
@@ -373,8 +550,17 @@ async def get_element(db: aiosqlite.Connection, element_id: int) -> Optional[Dic
     return row_to_dict(row)
 
 
-async def list_open_elements(db: aiosqlite.Connection, event_id: int) -> List[Dict[str, Any]]:
-    """Получить список открытых элементов в событии с информацией об участниках."""
+async def list_open_elements(
+    db: aiosqlite.Connection,
+    event_id: int,
+    exclude_user_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Получить список открытых элементов в событии с агрегатами по участникам
+    (количество, свободные места, средний рейтинг) одним запросом.
+    Заявки со свободными местами отбираются по индексу idx_elements_open.
+    exclude_user_id — исключить элементы, где этот пользователь уже участник.
+    """
     cursor = await db.execute(
         """
         SELECT 
@@ -387,33 +573,27 @@ async def list_open_elements(db: aiosqlite.Connection, event_id: int) -> List[Di
             u.username as creator_name,
             u.rating as creator_rating,
             u.gender as creator_gender,
-            (SELECT COUNT(*) FROM element_members em WHERE em.element_id = e.element_id) as members_count,
-            (e.target_size - (SELECT COUNT(*) FROM element_members em WHERE em.element_id = e.element_id)) as spots_left
+            e.members_count,
+            e.target_size - e.members_count as spots_left,
+            (SELECT AVG(mu.rating)
+             FROM element_members em
+             JOIN users mu ON em.user_id = mu.user_id
+             WHERE em.element_id = e.element_id) as avg_rating
         FROM elements e
         LEFT JOIN users u ON e.creator_id = u.user_id
         WHERE e.event_id = ?
           AND e.is_active = 1
-          AND (e.target_size - (SELECT COUNT(*) FROM element_members em WHERE em.element_id = e.element_id)) > 0
+          AND e.members_count < e.target_size
+          AND NOT EXISTS (
+              SELECT 1 FROM element_members me
+              WHERE me.element_id = e.element_id AND me.user_id = ?
+          )
         ORDER BY e.created_at DESC
         """,
-        (event_id,)
+        (event_id, exclude_user_id)
     )
     rows = await cursor.fetchall()
-    elements = rows_to_list(rows)
-    
-    # Добавляем информацию об участниках для каждого элемента
-    for elem in elements:
-        members = await get_element_members(db, elem["element_id"])
-        elem["members"] = members
-        # Формируем краткую информацию для отображения
-        if members:
-            ratings = [m["rating"] for m in members if m.get("rating") is not None]
-            avg_rating = sum(ratings) / len(ratings) if ratings else 0
-            elem["members_info"] = f"⭐ {avg_rating:.0f}"
-        else:
-            elem["members_info"] = ""
-    
-    return elements
+    return rows_to_list(rows)
 
 
 async def get_user_elements(db: aiosqlite.Connection, event_id: int, user_id: int) -> List[Dict[str, Any]]:
@@ -428,7 +608,7 @@ async def get_user_elements(db: aiosqlite.Connection, event_id: int, user_id: in
             e.description,
             e.created_at,
             e.is_active,
-            (SELECT COUNT(*) FROM element_members em WHERE em.element_id = e.element_id) as members_count,
+            e.members_count,
             (SELECT COUNT(*) FROM join_requests jr WHERE jr.element_id = e.element_id AND jr.status = 'pending') as pending_requests
         FROM elements e
         LEFT JOIN element_members em ON e.element_id = em.element_id
@@ -445,38 +625,30 @@ async def get_user_elements(db: aiosqlite.Connection, event_id: int, user_id: in
 
 async def get_all_user_active_elements(db: aiosqlite.Connection, user_id: int) -> List[Dict[str, Any]]:
     """Получить все активные элементы пользователя во всех событиях."""
-    cursor = await db.execute(
-        """
-        SELECT DISTINCT e.*, ev.title as event_title
-        FROM elements e
-        LEFT JOIN element_members em ON e.element_id = em.element_id
-        LEFT JOIN events ev ON e.event_id = ev.event_id
-        WHERE e.is_active = 1
-          AND (e.creator_id = ? OR em.user_id = ?)
-        ORDER BY e.created_at DESC
-        """,
-        (user_id, user_id)
-    )
-    rows = await cursor.fetchall()
-    return rows_to_list(rows)
+    dashboard = await get_user_dashboard(db, user_id, open_events_only=False, include_groups=False)
+    return dashboard["active_elements"]
 
 
 async def deactivate_element(db: aiosqlite.Connection, element_id: int) -> None:
     """Деактивировать элемент (is_active = 0)."""
+    affected = await _element_users(db, "e.element_id = ?", (element_id,))
     await db.execute(
         "UPDATE elements SET is_active = 0 WHERE element_id = ?",
         (element_id,)
     )
     await db.commit()
+    user_stats_cache.invalidate(*affected)
 
 
 async def delete_element(db: aiosqlite.Connection, element_id: int, user_id: int) -> bool:
     """Удалить элемент (только если пользователь — создатель)."""
+    affected = await _element_users(db, "e.element_id = ? AND e.creator_id = ?", (element_id, user_id))
     cursor = await db.execute(
         "DELETE FROM elements WHERE element_id = ? AND creator_id = ?",
         (element_id, user_id)
     )
     await db.commit()
+    user_stats_cache.invalidate(*affected)
     return cursor.rowcount > 0
 
 
@@ -492,7 +664,7 @@ async def get_element_members(db: aiosqlite.Connection, element_id: int) -> List
             em.joined_at
         FROM element_members em
         JOIN users u ON em.user_id = u.user_id
-        WHERE em.element_id = ?
+        WHERE em.element_id = ? AND u.deleted_at IS NULL
         ORDER BY em.joined_at ASC
         """,
         (element_id,)
@@ -511,6 +683,7 @@ async def add_element_member(db: aiosqlite.Connection, element_id: int, user_id:
         (element_id, user_id)
     )
     await db.commit()
+    user_stats_cache.invalidate(user_id)
 
 
 async def remove_element_member(db: aiosqlite.Connection, element_id: int, user_id: int) -> bool:
@@ -520,6 +693,7 @@ async def remove_element_member(db: aiosqlite.Connection, element_id: int, user_
         (element_id, user_id)
     )
     await db.commit()
+    user_stats_cache.invalidate(user_id)
     return cursor.rowcount > 0
 
 
@@ -553,14 +727,7 @@ async def check_user_in_element(db: aiosqlite.Connection, element_id: int, user_
 async def get_element_spots_left(db: aiosqlite.Connection, element_id: int) -> int:
     """Получить количество свободных мест в элементе."""
     cursor = await db.execute(
-        """
-        SELECT 
-            e.target_size - COUNT(em.user_id) as spots_left
-        FROM elements e
-        LEFT JOIN element_members em ON e.element_id = em.element_id
-        WHERE e.element_id = ?
-        GROUP BY e.element_id
-        """,
+        "SELECT target_size - members_count FROM elements WHERE element_id = ?",
         (element_id,)
     )
     row = await cursor.fetchone()
@@ -582,8 +749,13 @@ async def create_join_request(
     element_id: int,
     requester_id: int,
     expires_at: Optional[str] = None
-) -> int:
-    """Создать запрос на присоединение. Возвращает join_id."""
+) -> Optional[int]:
+    """
+    Создать запрос на присоединение одним запросом.
+    Запрос не создаётся, если заявка неактивна или заполнена, пользователь
+    уже в ней или у него уже есть ожидающий запрос (уникальный частичный индекс).
+    Возвращает join_id или None, если запрос не создан.
+    """
     if expires_at is None:
         # По умолчанию запрос истекает через 24 часа
         expires_at = (datetime.now() + timedelta(hours=24)).isoformat()
@@ -591,12 +763,29 @@ async def create_join_request(
     cursor = await db.execute(
         """
         INSERT INTO join_requests (element_id, requester_id, status, expires_at)
-        VALUES (?, ?, 'pending', ?)
+        SELECT e.element_id, :requester_id, 'pending', :expires_at
+        FROM elements e
+        WHERE e.element_id = :element_id
+          AND e.is_active = 1
+          AND e.members_count < e.target_size
+          AND NOT EXISTS (
+              SELECT 1 FROM element_members em
+              WHERE em.element_id = e.element_id AND em.user_id = :requester_id
+          )
+        ON CONFLICT DO NOTHING
+        RETURNING join_id
         """,
-        (element_id, requester_id, expires_at)
+        {"element_id": element_id, "requester_id": requester_id, "expires_at": expires_at}
     )
+    row = await cursor.fetchone()
     await db.commit()
-    return cursor.lastrowid
+    if row is None:
+        return None
+    
+    cursor = await db.execute("SELECT creator_id FROM elements WHERE element_id = ?", (element_id,))
+    creator = await cursor.fetchone()
+    user_stats_cache.invalidate(requester_id, *creator)
+    return row[0]
 
 
 async def get_join_request(db: aiosqlite.Connection, join_id: int) -> Optional[Dict[str, Any]]:
@@ -624,11 +813,17 @@ async def get_join_request(db: aiosqlite.Connection, join_id: int) -> Optional[D
 
 async def update_join_request_status(db: aiosqlite.Connection, join_id: int, status: str) -> None:
     """Обновить статус запроса."""
-    await db.execute(
-        "UPDATE join_requests SET status = ? WHERE join_id = ?",
+    cursor = await db.execute(
+        """
+        UPDATE join_requests SET status = ? WHERE join_id = ?
+        RETURNING requester_id, (SELECT creator_id FROM elements e WHERE e.element_id = join_requests.element_id)
+        """,
         (status, join_id)
     )
+    affected = await cursor.fetchone()
     await db.commit()
+    if affected:
+        user_stats_cache.invalidate(*affected)
 
 
 async def get_pending_requests_for_element(db: aiosqlite.Connection, element_id: int) -> List[Dict[str, Any]]:
@@ -652,6 +847,31 @@ async def get_pending_requests_for_element(db: aiosqlite.Connection, element_id:
     return rows_to_list(rows)
 
 
+async def get_pending_requests_for_elements(db: aiosqlite.Connection, element_ids: List[int]) -> List[Dict[str, Any]]:
+    """Получить ожидающие запросы сразу для нескольких элементов одним запросом."""
+    if not element_ids:
+        return []
+    
+    placeholders = ",".join("?" * len(element_ids))
+    cursor = await db.execute(
+        f"""
+        SELECT 
+            jr.*,
+            u.username,
+            u.rating,
+            u.gender
+        FROM join_requests jr
+        JOIN users u ON jr.requester_id = u.user_id
+        WHERE jr.element_id IN ({placeholders})
+          AND jr.status = 'pending'
+        ORDER BY jr.created_at ASC
+        """,
+        tuple(element_ids)
+    )
+    rows = await cursor.fetchall()
+    return rows_to_list(rows)
+
+
 async def get_pending_requests_for_user(db: aiosqlite.Connection, user_id: int) -> List[Dict[str, Any]]:
     """Получить ожидающие запросы, отправленные пользователем."""
     cursor = await db.execute(
@@ -665,6 +885,7 @@ async def get_pending_requests_for_user(db: aiosqlite.Connection, user_id: int)
         JOIN events ev ON e.event_id = ev.event_id
         WHERE jr.requester_id = ?
           AND jr.status = 'pending'
+          AND ev.deleted_at IS NULL
         ORDER BY jr.created_at DESC
         """,
         (user_id,)
@@ -690,6 +911,7 @@ async def get_incoming_requests_for_user(db: aiosqlite.Connection, user_id: int)
         JOIN events ev ON e.event_id = ev.event_id
         WHERE e.creator_id = ?
           AND jr.status = 'pending'
+          AND ev.deleted_at IS NULL
         ORDER BY jr.created_at ASC
         """,
         (user_id,)
@@ -719,26 +941,55 @@ async def reject_all_pending_requests(db: aiosqlite.Connection, element_id: int)
         UPDATE join_requests
         SET status = 'rejected'
         WHERE element_id = ? AND status = 'pending'
+        RETURNING requester_id
         """,
         (element_id,)
     )
+    requesters = [row[0] for row in await cursor.fetchall()]
     await db.commit()
-    return cursor.rowcount
+    
+    if requesters:
+        cursor = await db.execute("SELECT creator_id FROM elements WHERE element_id = ?", (element_id,))
+        creator = await cursor.fetchone()
+        user_stats_cache.invalidate(*requesters, *(creator or ()))
+    return len(requesters)
 
 
-async def expire_old_requests(db: aiosqlite.Connection) -> int:
-    """Пометить просроченные запросы как expired. Возвращает количество."""
+async def expire_old_requests(db: aiosqlite.Connection, limit: int = 500) -> List[Dict[str, Any]]:
+    """
+    Пометить до limit просроченных запросов как expired (самые старые — первыми).
+    Возвращает истёкшие запросы с requester_id, element_id, creator_id и event_title.
+    """
     now = datetime.now().isoformat()
     cursor = await db.execute(
         """
         UPDATE join_requests
         SET status = 'expired'
-        WHERE status = 'pending' AND expires_at < ?
+        WHERE join_id IN (
+            SELECT join_id FROM join_requests
+            WHERE status = 'pending' AND expires_at < ?
+            ORDER BY expires_at
+            LIMIT ?
+        )
+        RETURNING
+            join_id,
+            requester_id,
+            element_id,
+            (SELECT creator_id FROM elements e WHERE e.element_id = join_requests.element_id) as creator_id,
+            (SELECT ev.title FROM elements e JOIN events ev ON ev.event_id = e.event_id
+             WHERE e.element_id = join_requests.element_id) as event_title
         """,
-        (now,)
+        (now, limit)
     )
+    expired = rows_to_list(await cursor.fetchall())
     await db.commit()
-    return cursor.rowcount
+    if expired:
+        # Ожидающие запросы есть в счётчиках профиля отправителя и владельца заявки
+        user_stats_cache.invalidate(
+            *{r["requester_id"] for r in expired},
+            *{r["creator_id"] for r in expired if r["creator_id"] is not None}
+        )
+    return expired
 
 
 async def cancel_user_request(db: aiosqlite.Connection, join_id: int, requester_id: int) -> bool:
@@ -748,11 +999,17 @@ async def cancel_user_request(db: aiosqlite.Connection, join_id: int, requester_
         UPDATE join_requests
         SET status = 'rejected'
         WHERE join_id = ? AND requester_id = ? AND status = 'pending'
+        RETURNING (SELECT creator_id FROM elements e WHERE e.element_id = join_requests.element_id)
         """,
         (join_id, requester_id)
     )
+    creator = await cursor.fetchone()
     await db.commit()
-    return cursor.rowcount > 0
+    if creator is None:
+        return False
+    
+    user_stats_cache.invalidate(requester_id, *creator)
+    return True
 
 
 # ==================== GROUPS ====================
@@ -790,6 +1047,7 @@ async def create_group(
         )
     
     await db.commit()
+    user_stats_cache.invalidate(*member_ids)
     return group_id
 
 
@@ -800,7 +1058,7 @@ async def get_group(db: aiosqlite.Connection, group_id: int) -> Optional[Dict[st
         SELECT g.*, ev.title as event_title, ev.type as event_type
         FROM groups g
         JOIN events ev ON g.event_id = ev.event_id
-        WHERE g.group_id = ?
+        WHERE g.group_id = ? AND ev.deleted_at IS NULL
         """,
         (group_id,)
     )
@@ -820,7 +1078,7 @@ async def get_user_groups(db: aiosqlite.Connection, user_id: int) -> List[Dict[s
         FROM groups g
         JOIN group_members gm ON g.group_id = gm.group_id
         JOIN events ev ON g.event_id = ev.event_id
-        WHERE gm.user_id = ?
+        WHERE gm.user_id = ? AND ev.deleted_at IS NULL
         ORDER BY g.created_at DESC
         """,
         (user_id,)
@@ -841,7 +1099,7 @@ async def get_group_members(db: aiosqlite.Connection, group_id: int) -> List[Dic
             gm.joined_at
         FROM group_members gm
         JOIN users u ON gm.user_id = u.user_id
-        WHERE gm.group_id = ?
+        WHERE gm.group_id = ? AND u.deleted_at IS NULL
         ORDER BY gm.joined_at ASC
         """,
         (group_id,)
@@ -850,30 +1108,103 @@ async def get_group_members(db: aiosqlite.Connection, group_id: int) -> List[Dic
     return rows_to_list(rows)
 
 
-async def get_event_groups(db: aiosqlite.Connection, event_id: int) -> List[Dict[str, Any]]:
-    """Получить все сформированные группы в событии."""
-    cursor = await db.execute(
-        """
+async def get_event_groups(
+    db: aiosqlite.Connection,
+    event_id: int,
+    limit: Optional[int] = None,
+    before_group_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Получить сформированные группы в событии (новые первыми).
+    limit и before_group_id задают страницу: группы с group_id меньше курсора.
+    Участники всех групп страницы загружаются одним запросом.
+    """
+    query = """
         SELECT 
             g.*,
-            (SELECT COUNT(*) FROM group_members gm WHERE gm.group_id = g.group_id) as members_count
+            COUNT(gm.user_id) as members_count
         FROM groups g
+        LEFT JOIN group_members gm ON gm.group_id = g.group_id
         WHERE g.event_id = ?
-        ORDER BY g.created_at DESC
-        """,
-        (event_id,)
-    )
+    """
+    params: List[Any] = [event_id]
+    if before_group_id is not None:
+        query += " AND g.group_id < ?"
+        params.append(before_group_id)
+    query += " GROUP BY g.group_id ORDER BY g.group_id DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    cursor = await db.execute(query, params)
     rows = await cursor.fetchall()
     groups = rows_to_list(rows)
-    
-    # Добавляем информацию об участниках
+    if not groups:
+        return groups
+
+    # Участники всех групп страницы — одним запросом
+    by_id = {group["group_id"]: group for group in groups}
     for group in groups:
-        members = await get_group_members(db, group["group_id"])
-        group["members"] = members
-    
+        group["members"] = []
+
+    placeholders = ",".join("?" * len(by_id))
+    cursor = await db.execute(
+        f"""
+        SELECT 
+            gm.group_id,
+            u.user_id,
+            u.username,
+            u.rating,
+            u.gender,
+            gm.joined_at
+        FROM group_members gm
+        JOIN users u ON gm.user_id = u.user_id
+        WHERE gm.group_id IN ({placeholders})
+        ORDER BY gm.joined_at ASC
+        """,
+        list(by_id)
+    )
+    for member in rows_to_list(await cursor.fetchall()):
+        by_id[member.pop("group_id")]["members"].append(member)
+
     return groups
 
 
+async def count_event_groups(db: aiosqlite.Connection, event_id: int) -> int:
+    """Количество сформированных групп в событии."""
+    cursor = await db.execute(
+        "SELECT COUNT(*) FROM groups WHERE event_id = ?",
+        (event_id,)
+    )
+    row = await cursor.fetchone()
+    return row[0] if row else 0
+
+
+async def get_event_participant_ids(db: aiosqlite.Connection, event_id: int) -> List[int]:
+    """
+    ID всех участников события: из групп и из активных и неактивных заявок.
+    Удалённые пользователи пропускаются.
+    """
+    cursor = await db.execute(
+        """
+        SELECT gm.user_id
+        FROM group_members gm
+        JOIN groups g ON gm.group_id = g.group_id
+        JOIN users u ON u.user_id = gm.user_id
+        WHERE g.event_id = ? AND u.deleted_at IS NULL
+        UNION
+        SELECT em.user_id
+        FROM element_members em
+        JOIN elements e ON em.element_id = e.element_id
+        JOIN users u ON u.user_id = em.user_id
+        WHERE e.event_id = ? AND u.deleted_at IS NULL
+        """,
+        (event_id, event_id)
+    )
+    rows = await cursor.fetchall()
+    return [row[0] for row in rows]
+
+
 async def check_user_in_group(db: aiosqlite.Connection, event_id: int, user_id: int) -> bool:
     """Проверить, состоит ли пользователь в какой-либо группе в событии."""
     cursor = await db.execute(
@@ -1060,66 +1391,201 @@ async def get_event_statistics(db: aiosqlite.Connection, event_id: int) -> Dict[
     }
 
 
-# ==================== ELEMENTS (обновить функцию) ====================
-
-async def get_all_user_elements_and_groups_in_open_events(db: aiosqlite.Connection, user_id: int) -> dict:
+async def get_event_elements_for_balancing(db: aiosqlite.Connection, event_id: int) -> List[Dict[str, Any]]:
     """
-    Получить все заявки и группы пользователя в открытых турнирах.
-    Возвращает словарь: {
-        "active_elements": [...],  # Активные заявки
-        "groups": [...]            # Сформированные группы
-    }
+    Получить участников всех активных заявок турнира одним запросом.
+    Возвращает строки (element_id, user_id, rating).
     """
-    # Активные заявки
     cursor = await db.execute(
         """
-        SELECT DISTINCT
-            e.element_id,
-            e.event_id,
-            e.creator_id,
-            e.target_size,
-            e.description,
-            e.created_at,
-            e.is_active,
-            ev.title as event_title,
-            ev.type as event_type,
-            ev.event_date,
-            (SELECT COUNT(*) FROM element_members em WHERE em.element_id = e.element_id) as members_count,
-            (SELECT COUNT(*) FROM join_requests jr WHERE jr.element_id = e.element_id AND jr.status = 'pending') as pending_requests
+        SELECT e.element_id, em.user_id, u.rating
         FROM elements e
-        LEFT JOIN element_members em ON e.element_id = em.element_id
-        LEFT JOIN events ev ON e.event_id = ev.event_id
-        WHERE e.is_active = 1
-          AND ev.status = 'open'
-          AND (e.creator_id = ? OR em.user_id = ?)
-        ORDER BY ev.event_date ASC NULLS LAST, e.created_at DESC
+        JOIN element_members em ON e.element_id = em.element_id
+        JOIN users u ON em.user_id = u.user_id
+        WHERE e.event_id = ? AND e.is_active = 1
+        ORDER BY e.element_id, em.joined_at
         """,
-        (user_id, user_id)
+        (event_id,)
     )
-    active_elements = rows_to_list(await cursor.fetchall())
-    
-    # Сформированные группы в открытых турнирах
-    cursor = await db.execute(
+    rows = await cursor.fetchall()
+    return rows_to_list(rows)
+
+
+async def create_balanced_groups(
+    db: aiosqlite.Connection,
+    event_id: int,
+    teams: List[Dict[str, Any]]
+) -> List[int]:
+    """
+    Создать группы по результатам балансировки одной транзакцией.
+    teams: [{"element_ids": [...], "member_ids": [...], "rating_avg": float}]
+    Заявки команд деактивируются, их ожидающие запросы и запросы
+    участников в этом турнире отклоняются.
+    Возвращает список group_id.
+    """
+    group_ids = []
+    element_ids = []
+    member_ids = []
+
+    for team in teams:
+        cursor = await db.execute(
+            "INSERT INTO groups (event_id, rating_avg) VALUES (?, ?)",
+            (event_id, team["rating_avg"])
+        )
+        group_id = cursor.lastrowid
+        group_ids.append(group_id)
+
+        await db.executemany(
+            "INSERT INTO group_members (group_id, user_id) VALUES (?, ?)",
+            [(group_id, user_id) for user_id in team["member_ids"]]
+        )
+        element_ids.extend(team["element_ids"])
+        member_ids.extend(team["member_ids"])
+
+    await db.executemany(
+        "UPDATE elements SET is_active = 0 WHERE element_id = ?",
+        [(element_id,) for element_id in element_ids]
+    )
+    await db.executemany(
+        "UPDATE join_requests SET status = 'rejected' WHERE element_id = ? AND status = 'pending'",
+        [(element_id,) for element_id in element_ids]
+    )
+    await db.executemany(
         """
-        SELECT 
-            g.group_id,
-            g.event_id,
-            g.created_at,
-            g.rating_avg,
-            ev.title as event_title,
-            ev.type as event_type,
-            ev.event_date,
-            (SELECT COUNT(*) FROM group_members gm2 WHERE gm2.group_id = g.group_id) as members_count
-        FROM groups g
-        JOIN group_members gm ON g.group_id = gm.group_id
-        JOIN events ev ON g.event_id = ev.event_id
-        WHERE gm.user_id = ?
-          AND ev.status = 'open'
-        ORDER BY ev.event_date ASC NULLS LAST, g.created_at DESC
+        UPDATE join_requests
+        SET status = 'rejected'
+        WHERE requester_id = ?
+          AND status = 'pending'
+          AND element_id IN (SELECT element_id FROM elements WHERE event_id = ?)
         """,
-        (user_id,)
+        [(user_id, event_id) for user_id in member_ids]
     )
-    groups = rows_to_list(await cursor.fetchall())
+
+    await db.commit()
+    # Затронуты все участники турнира и авторы запросов к их заявкам
+    user_stats_cache.clear()
+    return group_ids
+
+
+# ==================== ELEMENTS (обновить функцию) ====================
+
+_DASHBOARD_ELEMENTS_SQL = """
+    SELECT
+        'element' as kind,
+        e.element_id,
+        NULL as group_id,
+        e.event_id,
+        e.creator_id,
+        e.target_size,
+        e.description,
+        e.created_at as created_at,
+        e.is_active,
+        NULL as rating_avg,
+        ev.title as event_title,
+        ev.type as event_type,
+        ev.event_date,
+        e.members_count,
+        COALESCE(pc.pending_requests, 0) as pending_requests
+    FROM elements e
+    JOIN events ev ON e.event_id = ev.event_id
+    LEFT JOIN pending_counts pc ON pc.element_id = e.element_id
+    WHERE e.element_id IN (SELECT element_id FROM my_elements)
+      AND e.is_active = 1
+      {event_filter}
+"""
+
+_DASHBOARD_GROUPS_SQL = """
+    SELECT
+        'group' as kind,
+        NULL as element_id,
+        g.group_id,
+        g.event_id,
+        NULL as creator_id,
+        NULL as target_size,
+        NULL as description,
+        g.created_at as created_at,
+        NULL as is_active,
+        g.rating_avg,
+        ev.title as event_title,
+        ev.type as event_type,
+        ev.event_date,
+        COALESCE(gc.members_count, 0) as members_count,
+        0 as pending_requests
+    FROM groups g
+    JOIN events ev ON g.event_id = ev.event_id
+    LEFT JOIN group_counts gc ON gc.group_id = g.group_id
+    WHERE g.group_id IN (SELECT group_id FROM my_groups)
+      {event_filter}
+"""
+
+# Счётчики считаются только по строкам самого пользователя,
+# поэтому стоимость запроса не зависит от размера турниров
+_DASHBOARD_CTE_SQL = """
+    WITH my_elements AS (
+        SELECT element_id FROM elements WHERE creator_id = :user_id
+        UNION
+        SELECT element_id FROM element_members WHERE user_id = :user_id
+    ),
+    my_groups AS (
+        SELECT group_id FROM group_members WHERE user_id = :user_id
+    ),
+    pending_counts AS (
+        SELECT element_id, COUNT(*) as pending_requests
+        FROM join_requests
+        WHERE status = 'pending'
+          AND element_id IN (SELECT element_id FROM my_elements)
+        GROUP BY element_id
+    ),
+    group_counts AS (
+        SELECT group_id, COUNT(*) as members_count
+        FROM group_members
+        WHERE group_id IN (SELECT group_id FROM my_groups)
+        GROUP BY group_id
+    )
+"""
+
+_ELEMENT_ONLY_KEYS = ("element_id", "creator_id", "target_size", "description", "is_active", "pending_requests")
+_GROUP_ONLY_KEYS = ("group_id", "rating_avg")
+
+
+async def get_user_dashboard(
+    db: aiosqlite.Connection,
+    user_id: int,
+    open_events_only: bool = True,
+    include_groups: bool = True
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Получить заявки и группы пользователя одним запросом.
+    open_events_only — только в открытых турнирах.
+    include_groups — добавить сформированные группы.
+    Возвращает словарь: {
+        "active_elements": [...],  # Активные заявки
+        "groups": [...]            # Сформированные группы
+    }
+    """
+    event_filter = "AND ev.deleted_at IS NULL"
+    if open_events_only:
+        event_filter += " AND ev.status = 'open'"
+    
+    query = _DASHBOARD_CTE_SQL + _DASHBOARD_ELEMENTS_SQL.format(event_filter=event_filter)
+    if include_groups:
+        query += "UNION ALL" + _DASHBOARD_GROUPS_SQL.format(event_filter=event_filter)
+    query += "ORDER BY kind ASC, event_date ASC NULLS LAST, created_at DESC"
+    
+    cursor = await db.execute(query, {"user_id": user_id})
+    rows = rows_to_list(await cursor.fetchall())
+    
+    active_elements = []
+    groups = []
+    for row in rows:
+        if row.pop("kind") == "element":
+            for key in _GROUP_ONLY_KEYS:
+                del row[key]
+            active_elements.append(row)
+        else:
+            for key in _ELEMENT_ONLY_KEYS:
+                del row[key]
+            groups.append(row)
     
     return {
         "active_elements": active_elements,
@@ -1127,11 +1593,23 @@ async def get_all_user_elements_and_groups_in_open_events(db: aiosqlite.Connecti
     }
 
 
+async def get_all_user_elements_and_groups_in_open_events(db: aiosqlite.Connection, user_id: int) -> dict:
+    """
+    Получить все заявки и группы пользователя в открытых турнирах.
+    Возвращает словарь: {
+        "active_elements": [...],  # Активные заявки
+        "groups": [...]            # Сформированные группы
+    }
+    """
+    return await get_user_dashboard(db, user_id)
+
+
 async def delete_user_elements_in_event(db: aiosqlite.Connection, event_id: int, user_id: int) -> int:
     """
     Удалить все заявки пользователя в конкретном событии (где он создатель).
     Возвращает количество удалённых заявок.
     """
+    affected = await _element_users(db, "e.event_id = ? AND e.creator_id = ?", (event_id, user_id))
     cursor = await db.execute(
         """
         DELETE FROM elements
@@ -1140,6 +1618,7 @@ async def delete_user_elements_in_event(db: aiosqlite.Connection, event_id: int,
         (event_id, user_id)
     )
     await db.commit()
+    user_stats_cache.invalidate(*affected)
     return cursor.rowcount
 
 
@@ -1160,6 +1639,13 @@ async def remove_user_from_all_elements_in_event(db: aiosqlite.Connection, event
         (event_id, user_id, user_id)
     )
     elements = await cursor.fetchall()
+    if not elements:
+        return 0
+    
+    placeholders = ",".join("?" for _ in elements)
+    affected = await _element_users(
+        db, f"e.element_id IN ({placeholders})", tuple(row[0] for row in elements)
+    )
     
     count = 0
     for row in elements:
@@ -1174,7 +1660,7 @@ async def remove_user_from_all_elements_in_event(db: aiosqlite.Connection, event
         
         # Проверяем, сколько участников осталось
         cursor = await db.execute(
-            "SELECT COUNT(*) FROM element_members WHERE element_id = ?",
+            "SELECT members_count FROM elements WHERE element_id = ?",
             (element_id,)
         )
         members_left = (await cursor.fetchone())[0]
@@ -1189,6 +1675,7 @@ async def remove_user_from_all_elements_in_event(db: aiosqlite.Connection, event
             )
     
     await db.commit()
+    user_stats_cache.invalidate(*affected)
     return count
 
 
@@ -1280,10 +1767,9 @@ async def get_blacklist(
 
 
 async def get_blacklist_count(db: aiosqlite.Connection) -> int:
-    """Получить количество пользователей в чёрном списке."""
-    cursor = await db.execute("SELECT COUNT(*) FROM blacklist")
-    row = await cursor.fetchone()
-    return row[0] if row else 0
+    """Получить количество пользователей в чёрном списке (из счётчиков stats)."""
+    stats = await get_stats(db)
+    return stats["blacklist"]
 
 
 async def update_ban_reason(db: aiosqlite.Connection, user_id: int, reason: str) -> bool:
@@ -1300,13 +1786,35 @@ async def update_ban_reason(db: aiosqlite.Connection, user_id: int, reason: str)
 async def delete_event(db: aiosqlite.Connection, event_id: int) -> bool:
     """
     Удалить событие (для администратора).
+    Событие помечается удалённым и закрывается, заявки и группы
+    удаляет фоновая очистка (reap_deleted_events).
     Возвращает True если удалён.
     """
     cursor = await db.execute(
-        "DELETE FROM events WHERE event_id = ?",
+        """
+        UPDATE events
+        SET deleted_at = datetime('now'), status = 'closed'
+        WHERE event_id = ? AND deleted_at IS NULL
+        """,
         (event_id,)
     )
     await db.commit()
+    open_events_cache.invalidate()
+    user_stats_cache.clear()
+    return cursor.rowcount > 0
+
+
+async def set_event_status(db: aiosqlite.Connection, event_id: int, status: str) -> bool:
+    """
+    Изменить статус события (для администратора).
+    status: 'open' или 'closed'. Возвращает True если обновлено.
+    """
+    cursor = await db.execute(
+        "UPDATE events SET status = ? WHERE event_id = ? AND deleted_at IS NULL",
+        (status, event_id)
+    )
+    await db.commit()
+    open_events_cache.invalidate()
     return cursor.rowcount > 0
 
 
@@ -1326,7 +1834,7 @@ async def get_all_events(
             SELECT e.*, u.username as owner_name, u.telegram_username as owner_telegram
             FROM events e
             LEFT JOIN users u ON e.owner_id = u.user_id
-            WHERE e.status = ?
+            WHERE e.status = ? AND e.deleted_at IS NULL
             ORDER BY e.created_at DESC
             LIMIT ? OFFSET ?
             """,
@@ -1338,6 +1846,7 @@ async def get_all_events(
             SELECT e.*, u.username as owner_name, u.telegram_username as owner_telegram
             FROM events e
             LEFT JOIN users u ON e.owner_id = u.user_id
+            WHERE e.deleted_at IS NULL
             ORDER BY e.created_at DESC
             LIMIT ? OFFSET ?
             """,
@@ -1348,17 +1857,56 @@ async def get_all_events(
 
 
 async def get_events_count(db: aiosqlite.Connection, status: Optional[str] = None) -> int:
-    """Получить количество событий."""
+    """Получить количество событий (из счётчиков stats)."""
+    stats = await get_stats(db)
     if status:
-        cursor = await db.execute(
-            "SELECT COUNT(*) FROM events WHERE status = ?",
-            (status,)
-        )
-    else:
-        cursor = await db.execute("SELECT COUNT(*) FROM events")
+        return stats[f"events_{status}"]
+    return stats["events_open"] + stats["events_closed"]
+
+
+# Настоящие значения счётчиков stats — для сверки
+_STATS_SOURCES = {
+    "users": "SELECT COUNT(*) FROM users WHERE deleted_at IS NULL",
+    "events_open": "SELECT COUNT(*) FROM events WHERE status = 'open' AND deleted_at IS NULL",
+    "events_closed": "SELECT COUNT(*) FROM events WHERE status = 'closed' AND deleted_at IS NULL",
+    "groups": "SELECT COUNT(*) FROM groups",
+    "blacklist": "SELECT COUNT(*) FROM blacklist",
+}
+
+
+async def get_stats(db: aiosqlite.Connection) -> Dict[str, int]:
+    """
+    Глобальные счётчики для панели администратора.
+    Поддерживаются триггерами, чтение — O(1) без сканирования таблиц.
+    """
+    cursor = await db.execute("SELECT key, value FROM stats")
+    stats = dict.fromkeys(_STATS_SOURCES, 0)
+    stats.update({row[0]: row[1] for row in await cursor.fetchall()})
+    return stats
+
+
+async def reconcile_stats(db: aiosqlite.Connection) -> Dict[str, Tuple[int, int]]:
+    """
+    Сверить счётчики stats с таблицами и исправить расхождения.
+    Возвращает расхождения: {key: (было, стало)}.
+    """
+    cursor = await db.execute("SELECT key, value FROM stats")
+    current = {row[0]: row[1] for row in await cursor.fetchall()}
     
-    row = await cursor.fetchone()
-    return row[0] if row else 0
+    drift = {}
+    for key, query in _STATS_SOURCES.items():
+        cursor = await db.execute(query)
+        actual = (await cursor.fetchone())[0]
+        if current.get(key) != actual:
+            drift[key] = (current.get(key), actual)
+            await db.execute(
+                "INSERT INTO stats (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, actual)
+            )
+    await db.commit()
+    
+    return drift
 
 
 async def get_event_full_info(db: aiosqlite.Connection, event_id: int) -> Optional[Dict[str, Any]]:
@@ -1387,33 +1935,8 @@ async def get_all_user_elements_in_open_events(db: aiosqlite.Connection, user_id
     Получить все заявки пользователя в открытых турнирах.
     Включает заявки где пользователь создатель или участник.
     """
-    cursor = await db.execute(
-        """
-        SELECT DISTINCT
-            e.element_id,
-            e.event_id,
-            e.creator_id,
-            e.target_size,
-            e.description,
-            e.created_at,
-            e.is_active,
-            ev.title as event_title,
-            ev.type as event_type,
-            ev.event_date,
-            (SELECT COUNT(*) FROM element_members em WHERE em.element_id = e.element_id) as members_count,
-            (SELECT COUNT(*) FROM join_requests jr WHERE jr.element_id = e.element_id AND jr.status = 'pending') as pending_requests
-        FROM elements e
-        LEFT JOIN element_members em ON e.element_id = em.element_id
-        LEFT JOIN events ev ON e.event_id = ev.event_id
-        WHERE e.is_active = 1
-          AND ev.status = 'open'
-          AND (e.creator_id = ? OR em.user_id = ?)
-        ORDER BY ev.event_date ASC NULLS LAST, e.created_at DESC
-        """,
-        (user_id, user_id)
-    )
-    rows = await cursor.fetchall()
-    return rows_to_list(rows)
+    dashboard = await get_user_dashboard(db, user_id, include_groups=False)
+    return dashboard["active_elements"]
 
 
 async def leave_element(db: aiosqlite.Connection, element_id: int, user_id: int) -> bool:
@@ -1432,6 +1955,8 @@ async def leave_element(db: aiosqlite.Connection, element_id: int, user_id: int)
     if not is_member:
         return False
     
+    affected = await _element_users(db, "e.element_id = ?", (element_id,))
+    
     # Если пользователь — создатель, удаляем всю заявку
     if element["creator_id"] == user_id:
         cursor = await db.execute(
@@ -1439,6 +1964,7 @@ async def leave_element(db: aiosqlite.Connection, element_id: int, user_id: int)
             (element_id,)
         )
         await db.commit()
+        user_stats_cache.invalidate(*affected)
         return cursor.rowcount > 0
     
     # Иначе просто удаляем пользователя из участников
@@ -1461,4 +1987,303 @@ async def leave_element(db: aiosqlite.Connection, element_id: int, user_id: int)
         )
         await db.commit()
     
+    user_stats_cache.invalidate(*affected)
     return True
+
+
+# ==================== CLEANUP ====================
+# Удалённые турниры и аккаунты сначала только помечаются (deleted_at),
+# а зависимые строки удаляются здесь небольшими порциями с коммитом
+# после каждой, чтобы не держать длинную транзакцию записи.
+
+# Зависимые строки турнира — в порядке удаления (от листьев к корню)
+_EVENT_CHILDREN = [
+    ("group_members", "group_id IN (SELECT group_id FROM groups WHERE event_id = ?)"),
+    ("groups", "event_id = ?"),
+    ("join_requests", "element_id IN (SELECT element_id FROM elements WHERE event_id = ?)"),
+    ("element_members", "element_id IN (SELECT element_id FROM elements WHERE event_id = ?)"),
+    ("elements", "event_id = ?"),
+]
+
+# Зависимые строки пользователя (его турниры удаляются как турниры)
+_USER_CHILDREN = [
+    ("join_requests", "requester_id = ?"),
+    ("join_requests", "element_id IN (SELECT element_id FROM elements WHERE creator_id = ?)"),
+    ("element_members", "user_id = ?"),
+    ("element_members", "element_id IN (SELECT element_id FROM elements WHERE creator_id = ?)"),
+    ("elements", "creator_id = ?"),
+    ("group_members", "user_id = ?"),
+]
+
+
+async def _delete_in_batches(
+    db: aiosqlite.Connection,
+    table: str,
+    where: str,
+    params: tuple,
+    batch_size: int
+) -> int:
+    """Удалить строки порциями по batch_size, коммит после каждой. Возвращает число удалённых."""
+    total = 0
+    while True:
+        cursor = await db.execute(
+            f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT ?)",
+            (*params, batch_size)
+        )
+        await db.commit()
+        total += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            return total
+
+
+async def _reap_event(db: aiosqlite.Connection, event_id: int, batch_size: int) -> int:
+    """Физически удалить помеченный турнир и все его данные."""
+    total = 0
+    for table, where in _EVENT_CHILDREN:
+        total += await _delete_in_batches(db, table, where, (event_id,), batch_size)
+    
+    cursor = await db.execute(
+        "DELETE FROM events WHERE event_id = ? AND deleted_at IS NOT NULL",
+        (event_id,)
+    )
+    await db.commit()
+    return total + cursor.rowcount
+
+
+async def _reap_user(db: aiosqlite.Connection, user_id: int, batch_size: int) -> int:
+    """Физически удалить помеченного пользователя и все его данные."""
+    total = 0
+    cursor = await db.execute(
+        "SELECT event_id FROM events WHERE owner_id = ?",
+        (user_id,)
+    )
+    for row in await cursor.fetchall():
+        total += await _reap_event(db, row[0], batch_size)
+    
+    for table, where in _USER_CHILDREN:
+        total += await _delete_in_batches(db, table, where, (user_id,), batch_size)
+    
+    cursor = await db.execute(
+        "DELETE FROM users WHERE user_id = ? AND deleted_at IS NOT NULL",
+        (user_id,)
+    )
+    await db.commit()
+    return total + cursor.rowcount
+
+
+async def reap_deleted_events(db: aiosqlite.Connection, batch_size: int, limit: int = 10) -> int:
+    """Дочистить до limit помеченных турниров. Возвращает число удалённых строк."""
+    cursor = await db.execute(
+        "SELECT event_id FROM events WHERE deleted_at IS NOT NULL LIMIT ?",
+        (limit,)
+    )
+    total = 0
+    for row in await cursor.fetchall():
+        total += await _reap_event(db, row[0], batch_size)
+    return total
+
+
+async def reap_deleted_users(db: aiosqlite.Connection, batch_size: int, limit: int = 10) -> int:
+    """Дочистить до limit помеченных пользователей. Возвращает число удалённых строк."""
+    cursor = await db.execute(
+        "SELECT user_id FROM users WHERE deleted_at IS NOT NULL LIMIT ?",
+        (limit,)
+    )
+    total = 0
+    for row in await cursor.fetchall():
+        total += await _reap_user(db, row[0], batch_size)
+    if total:
+        # Вместе с пользователем удалены его запросы к чужим заявкам
+        user_stats_cache.clear()
+    return total
+
+
+async def purge_user(db: aiosqlite.Connection, user_id: int, batch_size: int = 500) -> bool:
+    """
+    Сразу дочистить пользователя, если он помечен удалённым
+    (например, перед повторной регистрацией). Возвращает True, если был помечен.
+    """
+    cursor = await db.execute(
+        "SELECT 1 FROM users WHERE user_id = ? AND deleted_at IS NOT NULL",
+        (user_id,)
+    )
+    if await cursor.fetchone() is None:
+        return False
+    await _reap_user(db, user_id, batch_size)
+    user_stats_cache.clear()
+    return True
+
+
+# ==================== BROADCASTS ====================
+
+async def create_broadcast(
+    db: aiosqlite.Connection,
+    admin_id: int,
+    text: str,
+    event_id: Optional[int] = None
+) -> int:
+    """Создать рассылку (всем пользователям или участникам турнира). Возвращает её ID."""
+    cursor = await db.execute(
+        "INSERT INTO broadcasts (admin_id, event_id, text) VALUES (?, ?, ?)",
+        (admin_id, event_id, text)
+    )
+    await db.commit()
+    return cursor.lastrowid
+
+
+async def get_broadcast(db: aiosqlite.Connection, broadcast_id: int) -> Optional[Dict[str, Any]]:
+    """Получить рассылку по ID."""
+    cursor = await db.execute(
+        "SELECT * FROM broadcasts WHERE broadcast_id = ?",
+        (broadcast_id,)
+    )
+    row = await cursor.fetchone()
+    return row_to_dict(row)
+
+
+async def get_running_broadcasts(db: aiosqlite.Connection) -> List[int]:
+    """ID незавершённых рассылок (для продолжения после перезапуска)."""
+    cursor = await db.execute(
+        "SELECT broadcast_id FROM broadcasts WHERE status = 'running' ORDER BY broadcast_id"
+    )
+    return [row[0] for row in await cursor.fetchall()]
+
+
+async def get_recent_broadcasts(db: aiosqlite.Connection, limit: int = 10) -> List[Dict[str, Any]]:
+    """Последние рассылки, новые — первыми."""
+    cursor = await db.execute(
+        "SELECT * FROM broadcasts ORDER BY broadcast_id DESC LIMIT ?",
+        (limit,)
+    )
+    rows = await cursor.fetchall()
+    return rows_to_list(rows)
+
+
+async def get_broadcast_recipients(
+    db: aiosqlite.Connection,
+    event_id: Optional[int],
+    after_user_id: int,
+    limit: int
+) -> List[int]:
+    """
+    Следующая пачка получателей после after_user_id (по возрастанию user_id).
+    Без event_id — все пользователи, с event_id — участники заявок и групп турнира.
+    Удалённые, забаненные и заблокировавшие бота пропускаются.
+    """
+    if event_id is None:
+        cursor = await db.execute(
+            """
+            SELECT u.user_id
+            FROM users u
+            WHERE u.user_id > ?
+              AND u.deleted_at IS NULL
+              AND NOT EXISTS (SELECT 1 FROM blacklist b WHERE b.user_id = u.user_id)
+              AND NOT EXISTS (SELECT 1 FROM blocked_recipients br WHERE br.user_id = u.user_id)
+            ORDER BY u.user_id
+            LIMIT ?
+            """,
+            (after_user_id, limit)
+        )
+    else:
+        cursor = await db.execute(
+            """
+            SELECT p.user_id
+            FROM (
+                SELECT em.user_id
+                FROM element_members em
+                JOIN elements e ON e.element_id = em.element_id
+                WHERE e.event_id = ?
+                UNION
+                SELECT gm.user_id
+                FROM group_members gm
+                JOIN groups g ON g.group_id = gm.group_id
+                WHERE g.event_id = ?
+            ) p
+            JOIN users u ON u.user_id = p.user_id
+            WHERE p.user_id > ?
+              AND u.deleted_at IS NULL
+              AND NOT EXISTS (SELECT 1 FROM blacklist b WHERE b.user_id = p.user_id)
+              AND NOT EXISTS (SELECT 1 FROM blocked_recipients br WHERE br.user_id = p.user_id)
+            ORDER BY p.user_id
+            LIMIT ?
+            """,
+            (event_id, event_id, after_user_id, limit)
+        )
+    return [row[0] for row in await cursor.fetchall()]
+
+
+async def save_broadcast_progress(
+    db: aiosqlite.Connection,
+    broadcast_id: int,
+    last_user_id: int,
+    sent: int,
+    failed: int,
+    blocked_user_ids: List[int]
+) -> bool:
+    """
+    Сохранить прогресс рассылки и отметить заблокировавших бота (одна транзакция).
+    Возвращает True, если рассылка всё ещё должна продолжаться.
+    """
+    if blocked_user_ids:
+        await db.executemany(
+            "INSERT OR IGNORE INTO blocked_recipients (user_id) VALUES (?)",
+            [(user_id,) for user_id in blocked_user_ids]
+        )
+    cursor = await db.execute(
+        """
+        UPDATE broadcasts
+        SET last_user_id = ?,
+            sent_count = sent_count + ?,
+            failed_count = failed_count + ?,
+            blocked_count = blocked_count + ?
+        WHERE broadcast_id = ?
+        RETURNING status
+        """,
+        (last_user_id, sent, failed, len(blocked_user_ids), broadcast_id)
+    )
+    row = await cursor.fetchone()
+    await db.commit()
+    return row is not None and row[0] == "running"
+
+
+async def finish_broadcast(db: aiosqlite.Connection, broadcast_id: int) -> None:
+    """Отметить рассылку завершённой."""
+    await db.execute(
+        """
+        UPDATE broadcasts SET status = 'done', finished_at = datetime('now')
+        WHERE broadcast_id = ? AND status = 'running'
+        """,
+        (broadcast_id,)
+    )
+    await db.commit()
+
+
+async def cancel_broadcast(db: aiosqlite.Connection, broadcast_id: int) -> bool:
+    """Отменить рассылку. Возвращает False, если она уже не выполняется."""
+    cursor = await db.execute(
+        """
+        UPDATE broadcasts SET status = 'cancelled', finished_at = datetime('now')
+        WHERE broadcast_id = ? AND status = 'running'
+        """,
+        (broadcast_id,)
+    )
+    await db.commit()
+    return cursor.rowcount > 0
+
+
+async def mark_blocked_recipients(db: aiosqlite.Connection, user_ids: List[int]) -> None:
+    """Отметить пользователей, заблокировавших бота."""
+    await db.executemany(
+        "INSERT OR IGNORE INTO blocked_recipients (user_id) VALUES (?)",
+        [(user_id,) for user_id in user_ids]
+    )
+    await db.commit()
+
+
+async def unmark_blocked_recipient(db: aiosqlite.Connection, user_id: int) -> None:
+    """Снять отметку о блокировке бота (пользователь снова его запустил)."""
+    await db.execute(
+        "DELETE FROM blocked_recipients WHERE user_id = ?",
+        (user_id,)
+    )
+    await db.commit()
@@ -9,7 +9,8 @@ CREATE TABLE IF NOT EXISTS users (
     telegram_username TEXT,  -- Реальный @username из Telegram
     rating            REAL,
     gender            TEXT CHECK (gender IN ('male', 'female')),
-    created_at        TEXT NOT NULL DEFAULT (datetime('now'))
+    created_at        TEXT NOT NULL DEFAULT (datetime('now')),
+    deleted_at        TEXT   -- Помечен на удаление (данные удаляет фоновая очистка)
 );
 
 -- События/Турниры
@@ -23,6 +24,7 @@ CREATE TABLE IF NOT EXISTS events (
     event_date   TEXT,  -- Дата проведения в формате YYYY-MM-DD
     status       TEXT NOT NULL CHECK (status IN ('open', 'closed')) DEFAULT 'open',
     created_at   TEXT NOT NULL DEFAULT (datetime('now')),
+    deleted_at   TEXT,  -- Помечено на удаление (данные удаляет фоновая очистка)
     FOREIGN KEY (owner_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
@@ -35,6 +37,7 @@ CREATE TABLE IF NOT EXISTS elements (
     description  TEXT,
     created_at   TEXT NOT NULL DEFAULT (datetime('now')),
     is_active    INTEGER NOT NULL DEFAULT 1,
+    members_count INTEGER NOT NULL DEFAULT 0,  -- Поддерживается триггерами element_members
     FOREIGN KEY (event_id)   REFERENCES events(event_id) ON DELETE CASCADE,
     FOREIGN KEY (creator_id) REFERENCES users(user_id)   ON DELETE CASCADE
 );
@@ -97,14 +100,142 @@ CREATE TABLE IF NOT EXISTS blacklist (
     FOREIGN KEY (banned_by) REFERENCES users(user_id) ON DELETE SET NULL
 );
 
+-- Глобальные счётчики для панели администратора (поддерживаются триггерами)
+CREATE TABLE IF NOT EXISTS stats (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO stats (key, value) VALUES
+    ('users', 0),
+    ('events_open', 0),
+    ('events_closed', 0),
+    ('groups', 0),
+    ('blacklist', 0);
+
+-- Рассылки владельцев бота. Получатели обходятся по возрастанию user_id,
+-- last_user_id — сохранённый прогресс: после перезапуска рассылка продолжается с него
+CREATE TABLE IF NOT EXISTS broadcasts (
+    broadcast_id  INTEGER PRIMARY KEY AUTOINCREMENT,
+    admin_id      INTEGER NOT NULL,
+    event_id      INTEGER,  -- NULL — всем пользователям, иначе участникам турнира
+    text          TEXT NOT NULL,
+    status        TEXT NOT NULL CHECK (status IN ('running', 'done', 'cancelled')) DEFAULT 'running',
+    last_user_id  INTEGER NOT NULL DEFAULT 0,
+    sent_count    INTEGER NOT NULL DEFAULT 0,
+    failed_count  INTEGER NOT NULL DEFAULT 0,
+    blocked_count INTEGER NOT NULL DEFAULT 0,
+    created_at    TEXT NOT NULL DEFAULT (datetime('now')),
+    finished_at   TEXT
+);
+
+-- Пользователи, заблокировавшие бота (выявляются при рассылке, снимаются по /start)
+CREATE TABLE IF NOT EXISTS blocked_recipients (
+    user_id    INTEGER PRIMARY KEY,
+    blocked_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
 -- ========================================
 -- Индексы
 -- ========================================
-CREATE INDEX IF NOT EXISTS idx_elements_event_active ON elements(event_id, is_active);
+DROP INDEX IF EXISTS idx_elements_event_active;
+-- Открытые заявки со свободными местами: поиск целиком по индексу
+CREATE INDEX IF NOT EXISTS idx_elements_open ON elements(event_id, is_active, members_count, target_size);
 CREATE INDEX IF NOT EXISTS idx_element_members_elem ON element_members(element_id);
+CREATE INDEX IF NOT EXISTS idx_element_members_user ON element_members(user_id);
+CREATE INDEX IF NOT EXISTS idx_elements_creator ON elements(creator_id);
+CREATE INDEX IF NOT EXISTS idx_group_members_user ON group_members(user_id);
 CREATE INDEX IF NOT EXISTS idx_join_requests_status_elem ON join_requests(element_id, status);
+CREATE INDEX IF NOT EXISTS idx_join_requests_requester ON join_requests(requester_id, status);
+-- Не больше одного ожидающего запроса от пользователя к заявке
+CREATE UNIQUE INDEX IF NOT EXISTS idx_join_requests_pending_unique ON join_requests(element_id, requester_id) WHERE status = 'pending';
+-- Истечение ожидающих запросов: только pending, по сроку
+CREATE INDEX IF NOT EXISTS idx_join_requests_pending_expiry ON join_requests(expires_at) WHERE status = 'pending';
 CREATE INDEX IF NOT EXISTS idx_groups_event ON groups(event_id);
 CREATE INDEX IF NOT EXISTS idx_users_gender ON users(gender);
 CREATE INDEX IF NOT EXISTS idx_users_rating ON users(rating);
 CREATE INDEX IF NOT EXISTS idx_blacklist_user ON blacklist(user_id);
-CREATE INDEX IF NOT EXISTS idx_events_date_status ON events(event_date, status);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_events_date_status ON events(event_date, status);
+CREATE INDEX IF NOT EXISTS idx_events_owner ON events(owner_id);
+CREATE INDEX IF NOT EXISTS idx_events_deleted ON events(deleted_at) WHERE deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_users_deleted ON users(deleted_at) WHERE deleted_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_broadcasts_running ON broadcasts(status) WHERE status = 'running';
+
+-- ========================================
+-- Триггеры
+-- ========================================
+-- Счётчик участников заявки (elements.members_count)
+CREATE TRIGGER IF NOT EXISTS trg_element_members_insert
+AFTER INSERT ON element_members
+BEGIN
+    UPDATE elements SET members_count = members_count + 1 WHERE element_id = NEW.element_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_element_members_delete
+AFTER DELETE ON element_members
+BEGIN
+    UPDATE elements SET members_count = members_count - 1 WHERE element_id = OLD.element_id;
+END;
+
+-- Глобальные счётчики (stats). Помеченные удалёнными строки не считаются.
+CREATE TRIGGER IF NOT EXISTS trg_stats_users_insert
+AFTER INSERT ON users WHEN NEW.deleted_at IS NULL
+BEGIN
+    UPDATE stats SET value = value + 1 WHERE key = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_users_tombstone
+AFTER UPDATE OF deleted_at ON users
+BEGIN
+    UPDATE stats SET value = value - 1 WHERE key = 'users' AND OLD.deleted_at IS NULL AND NEW.deleted_at IS NOT NULL;
+    UPDATE stats SET value = value + 1 WHERE key = 'users' AND OLD.deleted_at IS NOT NULL AND NEW.deleted_at IS NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_users_delete
+AFTER DELETE ON users WHEN OLD.deleted_at IS NULL
+BEGIN
+    UPDATE stats SET value = value - 1 WHERE key = 'users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_events_insert
+AFTER INSERT ON events WHEN NEW.deleted_at IS NULL
+BEGIN
+    UPDATE stats SET value = value + 1 WHERE key = 'events_' || NEW.status;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_events_update
+AFTER UPDATE OF status, deleted_at ON events
+BEGIN
+    UPDATE stats SET value = value - 1 WHERE key = 'events_' || OLD.status AND OLD.deleted_at IS NULL;
+    UPDATE stats SET value = value + 1 WHERE key = 'events_' || NEW.status AND NEW.deleted_at IS NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_events_delete
+AFTER DELETE ON events WHEN OLD.deleted_at IS NULL
+BEGIN
+    UPDATE stats SET value = value - 1 WHERE key = 'events_' || OLD.status;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_groups_insert
+AFTER INSERT ON groups
+BEGIN
+    UPDATE stats SET value = value + 1 WHERE key = 'groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_groups_delete
+AFTER DELETE ON groups
+BEGIN
+    UPDATE stats SET value = value - 1 WHERE key = 'groups';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_blacklist_insert
+AFTER INSERT ON blacklist
+BEGIN
+    UPDATE stats SET value = value + 1 WHERE key = 'blacklist';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_stats_blacklist_delete
+AFTER DELETE ON blacklist
+BEGIN
+    UPDATE stats SET value = value - 1 WHERE key = 'blacklist';
+END;
@@ -2,8 +2,7 @@
 Обработчики администратора: управление чёрным списком и турнирами.
 """
 
-from datetime import datetime
-from aiogram import Router, F, Bot
+from aiogram import Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
@@ -22,8 +21,15 @@ from keyboards.inline import (
     admin_event_detail_kb
 )
 from database import queries as db_queries
+from broadcast import start_broadcast, stop_broadcast
+from utils.dates import format_date_ru
+from utils.render import (
+    ADMIN_PANEL, BROADCAST_LINE, USER_CHECK_HEADER, USER_CHECK_PROFILE, USER_CHECK_BANNED
+)
+from utils.callbacks import CallbackRouter, CallbackPrefix
+from utils.messages import edit_text
 
-router = Router()
+router = CallbackRouter()
 
 
 # ==================== FSM ====================
@@ -41,23 +47,6 @@ class DeleteEventFSM(StatesGroup):
     waiting_event_id = State()
 
 
-# ==================== HELPERS ====================
-
-def format_date_ru(date_str: str) -> str:
-    """Форматировать дату в русский формат."""
-    if not date_str:
-        return "Не указана"
-    try:
-        dt = datetime.strptime(date_str, "%Y-%m-%d")
-        months = [
-            "", "января", "февраля", "марта", "апреля", "мая", "июня",
-            "июля", "августа", "сентября", "октября", "ноября", "декабря"
-        ]
-        return f"{dt.day} {months[dt.month]} {dt.year}"
-    except:
-        return date_str
-
-
 # ==================== ФИЛЬТР ВЛАДЕЛЬЦА ====================
 
 def owner_filter(message: Message) -> bool:
@@ -75,27 +64,10 @@ def owner_callback_filter(callback: CallbackQuery) -> bool:
 @router.message(Command("admin"), owner_filter)
 async def cmd_admin(message: Message, db: aiosqlite.Connection):
     """Панель администратора."""
-    # Получаем статистику
-    blacklist_count = await db_queries.get_blacklist_count(db)
-    
-    # Общая статистика
-    cursor = await db.execute("SELECT COUNT(*) FROM users")
-    users_count = (await cursor.fetchone())[0]
-    
-    events_open = await db_queries.get_events_count(db, "open")
-    events_closed = await db_queries.get_events_count(db, "closed")
-    events_total = events_open + events_closed
-    
-    cursor = await db.execute("SELECT COUNT(*) FROM groups")
-    groups_count = (await cursor.fetchone())[0]
+    stats = await db_queries.get_stats(db)
     
     await message.answer(
-        "🔐 <b>Панель администратора</b>\n\n"
-        f"📊 <b>Статистика:</b>\n"
-        f"• Пользователей: {users_count}\n"
-        f"• Турниров: {events_total} (открытых: {events_open}, закрытых: {events_closed})\n"
-        f"• Сформированных групп: {groups_count}\n"
-        f"• В чёрном списке: {blacklist_count}\n",
+        ADMIN_PANEL(events_total=stats["events_open"] + stats["events_closed"], **stats),
         reply_markup=admin_menu_kb(),
         parse_mode="HTML"
     )
@@ -283,8 +255,7 @@ async def cmd_check_user(message: Message, db: aiosqlite.Connection):
         return
     
     # Формируем информацию
-    text = f"🔍 <b>Информация о пользователе</b>\n\n"
-    text += f"🆔 ID: <code>{user_id}</code>\n"
+    parts = [USER_CHECK_HEADER(user_id=user_id)]
     
     if user:
         username = user.get("username") or "Не указано"
@@ -295,26 +266,20 @@ async def cmd_check_user(message: Message, db: aiosqlite.Connection):
         gender = GENDER_LABELS.get(user.get("gender"), "Не указан")
         created_at = user.get("created_at", "?")[:10]
         
-        text += (
-            f"👤 Имя: {username}\n"
-            f"📱 Telegram: {telegram_text}\n"
-            f"🚻 Пол: {gender}\n"
-            f"📊 Рейтинг: {rating_text}\n"
-            f"📅 Регистрация: {created_at}\n"
-        )
-        
         # Статистика
-        groups = await db_queries.get_user_groups(db, user_id)
-        elements = await db_queries.get_all_user_active_elements(db, user_id)
-        events = await db_queries.list_user_events(db, user_id)
-        text += (
-            f"\n📈 <b>Статистика:</b>\n"
-            f"• Создано турниров: {len(events)}\n"
-            f"• Активных элементов: {len(elements)}\n"
-            f"• Сформированных групп: {len(groups)}\n"
-        )
+        footprint = await db_queries.get_user_footprint(db, user_id)
+        parts.append(USER_CHECK_PROFILE(
+            username=username,
+            telegram_text=telegram_text,
+            gender=gender,
+            rating_text=rating_text,
+            created_at=created_at,
+            events_owned=footprint["events_owned"],
+            active_elements=footprint["active_elements"],
+            groups=footprint["groups"]
+        ))
     else:
-        text += "👤 Пользователь не зарегистрирован\n"
+        parts.append("👤 Пользователь не зарегистрирован\n")
     
     # Информация о бане
     if is_banned:
@@ -322,16 +287,11 @@ async def cmd_check_user(message: Message, db: aiosqlite.Connection):
         banned_at = ban_info.get("banned_at", "?")[:10]
         admin_name = ban_info.get("admin_name") or "Неизвестный"
         
-        text += (
-            f"\n🚫 <b>ЗАБЛОКИРОВАН</b>\n"
-            f"📝 Причина: {reason}\n"
-            f"📅 Дата: {banned_at}\n"
-            f"👮 Заблокировал: {admin_name}\n"
-        )
+        parts.append(USER_CHECK_BANNED(reason=reason, banned_at=banned_at, admin_name=admin_name))
     else:
-        text += "\n✅ Не заблокирован\n"
+        parts.append("\n✅ Не заблокирован\n")
     
-    await message.answer(text, parse_mode="HTML")
+    await message.answer("".join(parts), parse_mode="HTML")
 
 
 @router.message(Command("delete_event"), owner_filter)
@@ -564,14 +524,15 @@ async def fsm_delete_event_id(message: Message, state: FSMContext, db: aiosqlite
 
 # ==================== CALLBACKS ====================
 
-@router.callback_query(F.data == "admin_blacklist", owner_callback_filter)
+@router.callback_query(CallbackPrefix("admin_blacklist"), owner_callback_filter)
 async def cb_admin_blacklist(callback: CallbackQuery, db: aiosqlite.Connection):
     """Кнопка «Чёрный список»."""
     blacklist = await db_queries.get_blacklist(db, limit=10)
     total = await db_queries.get_blacklist_count(db)
     
     if not blacklist:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "📋 <b>Чёрный список</b>\n\n"
             "Список пуст.",
             reply_markup=admin_menu_kb(),
@@ -592,7 +553,8 @@ async def cb_admin_blacklist(callback: CallbackQuery, db: aiosqlite.Connection):
     
     text += "\nИспользуйте /blacklist для полного списка"
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         text,
         reply_markup=blacklist_kb(),
         parse_mode="HTML"
@@ -600,11 +562,12 @@ async def cb_admin_blacklist(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data == "admin_add_ban", owner_callback_filter)
+@router.callback_query(CallbackPrefix("admin_add_ban"), owner_callback_filter)
 async def cb_admin_add_ban(callback: CallbackQuery, state: FSMContext):
     """Кнопка «Добавить в ЧС»."""
     await state.set_state(BanUserFSM.waiting_user_id)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "🚫 <b>Блокировка пользователя</b>\n\n"
         "Введите ID пользователя для блокировки:\n\n"
         "<i>Вы можете узнать ID, переслав сообщение пользователя боту @userinfobot</i>",
@@ -614,11 +577,12 @@ async def cb_admin_add_ban(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data == "admin_remove_ban", owner_callback_filter)
+@router.callback_query(CallbackPrefix("admin_remove_ban"), owner_callback_filter)
 async def cb_admin_remove_ban(callback: CallbackQuery, state: FSMContext):
     """Кнопка «Убрать из ЧС»."""
     await state.set_state(UnbanUserFSM.waiting_user_id)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "✅ <b>Разблокировка пользователя</b>\n\n"
         "Введите ID пользователя для разблокировки:",
         reply_markup=cancel_kb(),
@@ -629,10 +593,11 @@ async def cb_admin_remove_ban(callback: CallbackQuery, state: FSMContext):
 
 # ==================== УПРАВЛЕНИЕ ТУРНИРАМИ ====================
 
-@router.callback_query(F.data == "admin_events", owner_callback_filter)
+@router.callback_query(CallbackPrefix("admin_events"), owner_callback_filter)
 async def cb_admin_events(callback: CallbackQuery, db: aiosqlite.Connection):
     """Кнопка «Турниры»."""
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "🏆 <b>Управление турнирами</b>\n\n"
         "Выберите действие:",
         reply_markup=admin_events_menu_kb(),
@@ -641,14 +606,15 @@ async def cb_admin_events(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data == "admin_all_events", owner_callback_filter)
+@router.callback_query(CallbackPrefix("admin_all_events"), owner_callback_filter)
 async def cb_admin_all_events(callback: CallbackQuery, db: aiosqlite.Connection):
     """Показать все турниры."""
     events = await db_queries.get_all_events(db, status=None, limit=15)
     total = await db_queries.get_events_count(db)
     
     if not events:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "📋 <b>Все турниры</b>\n\n"
             "Турниров нет.",
             reply_markup=admin_events_menu_kb(),
@@ -657,7 +623,8 @@ async def cb_admin_all_events(callback: CallbackQuery, db: aiosqlite.Connection)
         await callback.answer()
         return
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📋 <b>Все турниры ({total})</b>\n\n"
         "Выберите турнир для просмотра:",
         reply_markup=admin_events_list_kb(events),
@@ -666,14 +633,15 @@ async def cb_admin_all_events(callback: CallbackQuery, db: aiosqlite.Connection)
     await callback.answer()
 
 
-@router.callback_query(F.data == "admin_open_events", owner_callback_filter)
+@router.callback_query(CallbackPrefix("admin_open_events"), owner_callback_filter)
 async def cb_admin_open_events(callback: CallbackQuery, db: aiosqlite.Connection):
     """Показать открытые турниры."""
     events = await db_queries.get_all_events(db, status="open", limit=15)
     total = await db_queries.get_events_count(db, "open")
     
     if not events:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "📋 <b>Открытые турниры</b>\n\n"
             "Нет открытых турниров.",
             reply_markup=admin_events_menu_kb(),
@@ -682,7 +650,8 @@ async def cb_admin_open_events(callback: CallbackQuery, db: aiosqlite.Connection
         await callback.answer()
         return
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🟢 <b>Открытые турниры ({total})</b>\n\n"
         "Выберите турнир для просмотра:",
         reply_markup=admin_events_list_kb(events),
@@ -691,14 +660,15 @@ async def cb_admin_open_events(callback: CallbackQuery, db: aiosqlite.Connection
     await callback.answer()
 
 
-@router.callback_query(F.data == "admin_closed_events", owner_callback_filter)
+@router.callback_query(CallbackPrefix("admin_closed_events"), owner_callback_filter)
 async def cb_admin_closed_events(callback: CallbackQuery, db: aiosqlite.Connection):
     """Показать закрытые турниры."""
     events = await db_queries.get_all_events(db, status="closed", limit=15)
     total = await db_queries.get_events_count(db, "closed")
     
     if not events:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "📋 <b>Закрытые турниры</b>\n\n"
             "Нет закрытых турниров.",
             reply_markup=admin_events_menu_kb(),
@@ -707,7 +677,8 @@ async def cb_admin_closed_events(callback: CallbackQuery, db: aiosqlite.Connecti
         await callback.answer()
         return
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🔴 <b>Закрытые турниры ({total})</b>\n\n"
         "Выберите турнир для просмотра:",
         reply_markup=admin_events_list_kb(events),
@@ -716,16 +687,12 @@ async def cb_admin_closed_events(callback: CallbackQuery, db: aiosqlite.Connecti
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("admin_view_event:"), owner_callback_filter)
-async def cb_admin_view_event(callback: CallbackQuery, db: aiosqlite.Connection):
-    """Просмотр турнира администратором."""
-    event_id = int(callback.data.split(":")[1])
-    
+async def show_admin_event(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int) -> bool:
+    """Показать карточку турнира администратору. Возвращает False, если турнир не найден."""
     # Получаем полную информацию о турнире
     event_info = await db_queries.get_event_full_info(db, event_id)
     if not event_info:
-        await callback.answer("❌ Турнир не найден", show_alert=True)
-        return
+        return False
     
     event = event_info
     owner = event_info.get("owner")
@@ -743,7 +710,8 @@ async def cb_admin_view_event(callback: CallbackQuery, db: aiosqlite.Connection)
     
     created_at = event.get("created_at", "?")[:10]
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🔍 <b>Детали турнира (Админ)</b>\n\n"
         f"📌 <b>{event['title']}</b>\n\n"
         f"🎯 Тип: {type_label}\n"
@@ -762,14 +730,21 @@ async def cb_admin_view_event(callback: CallbackQuery, db: aiosqlite.Connection)
         reply_markup=admin_event_detail_kb(event_id),
         parse_mode="HTML"
     )
+    return True
+
+
+@router.callback_query(CallbackPrefix("admin_view_event", event_id=int), owner_callback_filter)
+async def cb_admin_view_event(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
+    """Просмотр турнира администратором."""
+    if not await show_admin_event(callback, db, event_id):
+        await callback.answer("❌ Турнир не найден", show_alert=True)
+        return
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("admin_confirm_delete_event:"), owner_callback_filter)
-async def cb_admin_confirm_delete_event(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("admin_confirm_delete_event", event_id=int), owner_callback_filter)
+async def cb_admin_confirm_delete_event(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
     """Показать подтверждение удаления турнира."""
-    event_id = int(callback.data.split(":")[1])
-    
     # Получаем информацию о турнире
     event_info = await db_queries.get_event_full_info(db, event_id)
     if not event_info:
@@ -784,7 +759,8 @@ async def cb_admin_confirm_delete_event(callback: CallbackQuery, db: aiosqlite.C
     date_text = format_date_ru(event.get("event_date"))
     owner_name = owner.get("username", "Неизвестный") if owner else "Неизвестный"
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🗑️ <b>Удаление турнира</b>\n\n"
         f"📌 Название: {event['title']}\n"
         f"🎯 Тип: {type_label}\n"
@@ -804,11 +780,9 @@ async def cb_admin_confirm_delete_event(callback: CallbackQuery, db: aiosqlite.C
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("confirm:admin_delete_event:"), owner_callback_filter)
-async def cb_confirm_admin_delete_event(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot):
+@router.callback_query(CallbackPrefix("confirm:admin_delete_event", event_id=int), owner_callback_filter, flags={"background": True})
+async def cb_confirm_admin_delete_event(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot, event_id: int):
     """Подтверждение удаления турнира."""
-    event_id = int(callback.data.split(":")[2])
-    
     # Получаем информацию перед удалением
     event = await db_queries.get_event(db, event_id)
     if not event:
@@ -818,27 +792,8 @@ async def cb_confirm_admin_delete_event(callback: CallbackQuery, db: aiosqlite.C
     event_title = event["title"]
     owner_id = event["owner_id"]
     
-    # Получаем всех участников групп для уведомления
-    groups = await db_queries.get_event_groups(db, event_id)
-    all_members = set()
-    for group in groups:
-        members = await db_queries.get_group_members(db, group["group_id"])
-        for member in members:
-            all_members.add(member["user_id"])
-    
-    # Получаем всех участников элементов
-    cursor = await db.execute(
-        """
-        SELECT DISTINCT em.user_id
-        FROM element_members em
-        JOIN elements e ON em.element_id = e.element_id
-        WHERE e.event_id = ?
-        """,
-        (event_id,)
-    )
-    rows = await cursor.fetchall()
-    for row in rows:
-        all_members.add(row[0])
+    # Получаем всех участников групп и элементов для уведомления
+    all_members = set(await db_queries.get_event_participant_ids(db, event_id))
     
     # Удаляем турнир
     success = await db_queries.delete_event(db, event_id)
@@ -878,7 +833,8 @@ async def cb_confirm_admin_delete_event(callback: CallbackQuery, db: aiosqlite.C
                 except Exception:
                     pass
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"✅ <b>Турнир удалён</b>\n\n"
             f"📌 {event_title}\n"
             f"🆔 ID: {event_id}\n\n"
@@ -891,11 +847,12 @@ async def cb_confirm_admin_delete_event(callback: CallbackQuery, db: aiosqlite.C
         await callback.answer("❌ Не удалось удалить турнир", show_alert=True)
 
 
-@router.callback_query(F.data == "admin_delete_event_start", owner_callback_filter)
+@router.callback_query(CallbackPrefix("admin_delete_event_start"), owner_callback_filter)
 async def cb_admin_delete_event_start(callback: CallbackQuery, state: FSMContext):
     """Начать процесс удаления турнира."""
     await state.set_state(DeleteEventFSM.waiting_event_id)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "🗑️ <b>Удаление турнира</b>\n\n"
         "Введите ID турнира для удаления:\n\n"
         "<i>ID можно найти в списке турниров или использовать команду /check_event</i>",
@@ -905,11 +862,9 @@ async def cb_admin_delete_event_start(callback: CallbackQuery, state: FSMContext
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("admin_close_event:"), owner_callback_filter)
-async def cb_admin_close_event(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("admin_close_event", event_id=int), owner_callback_filter)
+async def cb_admin_close_event(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
     """Закрыть турнир (администратор)."""
-    event_id = int(callback.data.split(":")[1])
-    
     event = await db_queries.get_event(db, event_id)
     if not event:
         await callback.answer("❌ Турнир не найден", show_alert=True)
@@ -920,11 +875,7 @@ async def cb_admin_close_event(callback: CallbackQuery, db: aiosqlite.Connection
         return
     
     # Закрываем от имени владельца (но логируем что это админ)
-    await db.execute(
-        "UPDATE events SET status = 'closed' WHERE event_id = ?",
-        (event_id,)
-    )
-    await db.commit()
+    await db_queries.set_event_status(db, event_id, "closed")
     
     # Логируем
     await db_queries.create_log(
@@ -936,14 +887,12 @@ async def cb_admin_close_event(callback: CallbackQuery, db: aiosqlite.Connection
     await callback.answer("✅ Турнир закрыт", show_alert=True)
     
     # Обновляем информацию
-    await cb_admin_view_event.__wrapped__(callback, db)
+    await show_admin_event(callback, db, event_id)
 
 
-@router.callback_query(F.data.startswith("admin_open_event:"), owner_callback_filter)
-async def cb_admin_open_event(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("admin_open_event", event_id=int), owner_callback_filter)
+async def cb_admin_open_event(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
     """Открыть турнир (администратор)."""
-    event_id = int(callback.data.split(":")[1])
-    
     event = await db_queries.get_event(db, event_id)
     if not event:
         await callback.answer("❌ Турнир не найден", show_alert=True)
@@ -954,11 +903,7 @@ async def cb_admin_open_event(callback: CallbackQuery, db: aiosqlite.Connection)
         return
     
     # Открываем
-    await db.execute(
-        "UPDATE events SET status = 'open' WHERE event_id = ?",
-        (event_id,)
-    )
-    await db.commit()
+    await db_queries.set_event_status(db, event_id, "open")
     
     # Логируем
     await db_queries.create_log(
@@ -970,14 +915,12 @@ async def cb_admin_open_event(callback: CallbackQuery, db: aiosqlite.Connection)
     await callback.answer("✅ Турнир открыт", show_alert=True)
     
     # Обновляем информацию
-    await cb_admin_view_event.__wrapped__(callback, db)
+    await show_admin_event(callback, db, event_id)
 
 
-@router.callback_query(F.data.startswith("admin_view_owner:"), owner_callback_filter)
-async def cb_admin_view_owner(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("admin_view_owner", event_id=int), owner_callback_filter)
+async def cb_admin_view_owner(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
     """Просмотр профиля владельца турнира."""
-    event_id = int(callback.data.split(":")[1])
-    
     event = await db_queries.get_event(db, event_id)
     if not event:
         await callback.answer("❌ Турнир не найден", show_alert=True)
@@ -1001,13 +944,12 @@ async def cb_admin_view_owner(callback: CallbackQuery, db: aiosqlite.Connection)
     gender = GENDER_LABELS.get(user.get("gender"), "Не указан")
     
     # Статистика
-    groups = await db_queries.get_user_groups(db, owner_id)
-    elements = await db_queries.get_all_user_active_elements(db, owner_id)
-    events = await db_queries.list_user_events(db, owner_id)
+    footprint = await db_queries.get_user_footprint(db, owner_id)
     
     banned_text = "\n\n🚫 <b>ЗАБЛОКИРОВАН</b>" if is_banned else ""
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"👤 <b>Профиль владельца турнира</b>\n\n"
         f"🆔 ID: <code>{owner_id}</code>\n"
         f"📛 Имя: {username}\n"
@@ -1015,9 +957,9 @@ async def cb_admin_view_owner(callback: CallbackQuery, db: aiosqlite.Connection)
         f"🚻 Пол: {gender}\n"
         f"📊 Рейтинг: {rating_text}\n\n"
         f"📈 <b>Статистика:</b>\n"
-        f"• Создано турниров: {len(events)}\n"
-        f"• Активных элементов: {len(elements)}\n"
-        f"• Сформированных групп: {len(groups)}"
+        f"• Создано турниров: {footprint['events_owned']}\n"
+        f"• Активных элементов: {footprint['active_elements']}\n"
+        f"• Сформированных групп: {footprint['groups']}"
         f"{banned_text}",
         reply_markup=admin_event_detail_kb(event_id),
         parse_mode="HTML"
@@ -1025,35 +967,140 @@ async def cb_admin_view_owner(callback: CallbackQuery, db: aiosqlite.Connection)
     await callback.answer()
 
 
-@router.callback_query(F.data == "back_admin", owner_callback_filter)
+@router.callback_query(CallbackPrefix("back_admin"), owner_callback_filter)
 async def cb_back_admin(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Возврат в админ-панель."""
     await state.clear()
     
-    # Получаем статистику
-    blacklist_count = await db_queries.get_blacklist_count(db)
+    stats = await db_queries.get_stats(db)
     
-    cursor = await db.execute("SELECT COUNT(*) FROM users")
-    users_count = (await cursor.fetchone())[0]
+    await edit_text(
+        callback.message,
+        ADMIN_PANEL(events_total=stats["events_open"] + stats["events_closed"], **stats),
+        reply_markup=admin_menu_kb(),
+        parse_mode="HTML"
+    )
+    await callback.answer()
+
+
+# ==================== РАССЫЛКИ ====================
+
+BROADCAST_STATUS_LABELS = {
+    "running": "⏳ идёт",
+    "done": "✅ завершена",
+    "cancelled": "⛔ отменена"
+}
+
+
+@router.message(Command("broadcast"), owner_filter)
+async def cmd_broadcast(message: Message, db: aiosqlite.Connection, bot: Bot):
+    """Рассылка всем пользователям: /broadcast <текст>."""
+    args = message.html_text.split(maxsplit=1)
     
-    events_open = await db_queries.get_events_count(db, "open")
-    events_closed = await db_queries.get_events_count(db, "closed")
-    events_total = events_open + events_closed
+    if len(args) < 2:
+        await message.answer(
+            "📣 <b>Рассылка всем пользователям</b>\n\n"
+            "Формат: /broadcast &lt;текст&gt;\n"
+            "Участникам турнира: /broadcast_event &lt;event_id&gt; &lt;текст&gt;\n"
+            "Ход рассылок: /broadcasts",
+            parse_mode="HTML"
+        )
+        return
     
-    cursor = await db.execute("SELECT COUNT(*) FROM groups")
-    groups_count = (await cursor.fetchone())[0]
+    broadcast_id = await db_queries.create_broadcast(db, message.from_user.id, args[1])
+    await db_queries.create_log(db, "broadcast_created", f"broadcast_id={broadcast_id}, admin_id={message.from_user.id}")
+    start_broadcast(bot, broadcast_id)
     
-    await callback.message.edit_text(
-        "🔐 <b>Панель администратора</b>\n\n"
-        f"📊 <b>Статистика:</b>\n"
-        f"• Пользователей: {users_count}\n"
-        f"• Турниров: {events_total} (открытых: {events_open}, закрытых: {events_closed})\n"
-        f"• Сформированных групп: {groups_count}\n"
-        f"• В чёрном списке: {blacklist_count}\n",
-        reply_markup=admin_menu_kb(),
+    await message.answer(
+        f"📣 Рассылка <b>#{broadcast_id}</b> запущена.\n"
+        f"По окончании придёт отчёт. Отмена: /broadcast_cancel {broadcast_id}",
         parse_mode="HTML"
     )
-    await callback.answer()
+
+
+@router.message(Command("broadcast_event"), owner_filter)
+async def cmd_broadcast_event(message: Message, db: aiosqlite.Connection, bot: Bot):
+    """Рассылка участникам турнира: /broadcast_event <event_id> <текст>."""
+    args = message.html_text.split(maxsplit=2)
+    
+    if len(args) < 3:
+        await message.answer(
+            "📣 <b>Рассылка участникам турнира</b>\n\n"
+            "Формат: /broadcast_event &lt;event_id&gt; &lt;текст&gt;\n"
+            "Пример: <code>/broadcast_event 123 Начало в 10:00</code>",
+            parse_mode="HTML"
+        )
+        return
+    
+    try:
+        event_id = int(args[1])
+    except ValueError:
+        await message.answer("❌ ID турнира должен быть числом.")
+        return
+    
+    event = await db_queries.get_event(db, event_id)
+    if not event:
+        await message.answer("❌ Турнир не найден.")
+        return
+    
+    broadcast_id = await db_queries.create_broadcast(db, message.from_user.id, args[2], event_id=event_id)
+    await db_queries.create_log(
+        db,
+        "broadcast_created",
+        f"broadcast_id={broadcast_id}, admin_id={message.from_user.id}, event_id={event_id}"
+    )
+    start_broadcast(bot, broadcast_id)
+    
+    await message.answer(
+        f"📣 Рассылка <b>#{broadcast_id}</b> участникам турнира «{event['title']}» запущена.\n"
+        f"По окончании придёт отчёт. Отмена: /broadcast_cancel {broadcast_id}",
+        parse_mode="HTML"
+    )
+
+
+@router.message(Command("broadcasts"), owner_filter)
+async def cmd_broadcasts(message: Message, db: aiosqlite.Connection):
+    """Последние рассылки и их прогресс."""
+    broadcasts = await db_queries.get_recent_broadcasts(db)
+    
+    if not broadcasts:
+        await message.answer("📣 Рассылок ещё не было.")
+        return
+    
+    lines = [
+        BROADCAST_LINE(
+            status_label=BROADCAST_STATUS_LABELS.get(b["status"], b["status"]),
+            audience=f"турнир {b['event_id']}" if b["event_id"] else "все пользователи",
+            **b
+        )
+        for b in broadcasts
+    ]
+    await message.answer(
+        "📣 <b>Последние рассылки</b>\n\n" + "\n\n".join(lines),
+        parse_mode="HTML"
+    )
+
+
+@router.message(Command("broadcast_cancel"), owner_filter)
+async def cmd_broadcast_cancel(message: Message, db: aiosqlite.Connection):
+    """Отменить рассылку: /broadcast_cancel <broadcast_id>."""
+    args = message.text.split(maxsplit=1)
+    
+    if len(args) < 2 or not args[1].strip().isdigit():
+        await message.answer(
+            "Формат: /broadcast_cancel &lt;broadcast_id&gt;",
+            parse_mode="HTML"
+        )
+        return
+    
+    broadcast_id = int(args[1].strip())
+    if not await db_queries.cancel_broadcast(db, broadcast_id):
+        await message.answer("❌ Рассылка не найдена или уже завершена.")
+        return
+    
+    stop_broadcast(broadcast_id)
+    await db_queries.create_log(db, "broadcast_cancelled", f"broadcast_id={broadcast_id}")
+    await message.answer(f"⛔ Рассылка #{broadcast_id} отменена.")
 
 
 # ==================== ОБРАБОТКА НЕ-ВЛАДЕЛЬЦЕВ ====================
@@ -1092,3 +1139,9 @@ async def cmd_check_user_denied(message: Message):
 async def cmd_delete_event_denied(message: Message):
     """Попытка удаления турнира не-владельцем."""
     await message.answer("🚫 У вас нет доступа к этой команде.")
+
+
+@router.message(Command("broadcast", "broadcast_event", "broadcasts", "broadcast_cancel"))
+async def cmd_broadcast_denied(message: Message):
+    """Попытка рассылки не-владельцем."""
+    await message.answer("🚫 У вас нет доступа к этой команде.")
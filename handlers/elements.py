@@ -2,7 +2,7 @@
 Обработчики: /add_solo, /add_partial, /my_elements.
 """
 
-from aiogram import Router, F, Bot
+from aiogram import Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
@@ -26,8 +26,12 @@ from keyboards.inline import (
 
 
 from database import queries as db_queries
+from utils.dates import format_date_ru, get_days_until
+from utils.render import bullet_list, member_contact_line, GROUP_PAIR_DETAILS, GROUP_TEAM_DETAILS
+from utils.callbacks import CallbackRouter, CallbackPrefix
+from utils.messages import edit_text
 
-router = Router()
+router = CallbackRouter()
 
 
 # ==================== FSM ====================
@@ -40,14 +44,6 @@ class AddElementFSM(StatesGroup):
 
 # ==================== HELPERS ====================
 
-def format_member_info(member: dict) -> str:
-    """Форматировать информацию об участнике."""
-    gender_icon = "👨" if member.get("gender") == "male" else "👩" if member.get("gender") == "female" else "👤"
-    username = member.get("username", "Без имени")
-    rating = int(member.get("rating", 0))
-    return f"{gender_icon} {username} — рейтинг: {rating}"
-
-
 async def find_users_by_telegram_username(db: aiosqlite.Connection, usernames: list) -> dict:
     """
     Найти пользователей по их Telegram username.
@@ -66,7 +62,7 @@ async def find_users_by_telegram_username(db: aiosqlite.Connection, usernames: l
         cursor = await db.execute(
             """
             SELECT * FROM users 
-            WHERE LOWER(telegram_username) = ?
+            WHERE LOWER(telegram_username) = ? AND deleted_at IS NULL
             """,
             (clean_username,)
         )
@@ -358,10 +354,9 @@ async def cmd_my_groups(message: Message, db: aiosqlite.Connection):
 
 # ==================== CALLBACKS ====================
 
-@router.callback_query(F.data.startswith("add_element:"))
-async def cb_add_element(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("add_element", event_id=int))
+async def cb_add_element(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection, event_id: int):
     """Кнопка «Добавить себя»."""
-    event_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Проверяем регистрацию
@@ -404,7 +399,8 @@ async def cb_add_element(callback: CallbackQuery, state: FSMContext, db: aiosqli
         await state.update_data(add_type="solo", initial_members=[user_id])
         await state.set_state(AddElementFSM.waiting_description)
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"➕ <b>Добавление в турнир «{event['title']}»</b>\n\n"
             f"Вы ищете пару.\n\n"
             f"Введите описание/комментарий к вашей заявке:\n"
@@ -416,7 +412,8 @@ async def cb_add_element(callback: CallbackQuery, state: FSMContext, db: aiosqli
         # Для командного турнира предлагаем выбрать тип
         await state.set_state(AddElementFSM.waiting_type)
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"➕ <b>Добавление в турнир «{event['title']}»</b>\n\n"
             f"👥 Размер команды: {event['team_size']}\n\n"
             f"Выберите тип добавления:",
@@ -429,7 +426,7 @@ async def cb_add_element(callback: CallbackQuery, state: FSMContext, db: aiosqli
 
 # ==================== FSM: Выбор типа добавления ====================
 
-@router.callback_query(AddElementFSM.waiting_type, F.data == "add_type_solo")
+@router.callback_query(AddElementFSM.waiting_type, CallbackPrefix("add_type_solo"))
 async def fsm_add_type_solo(callback: CallbackQuery, state: FSMContext):
     """Выбрали добавление себя одного."""
     user_id = callback.from_user.id
@@ -438,7 +435,8 @@ async def fsm_add_type_solo(callback: CallbackQuery, state: FSMContext):
     await state.update_data(add_type="solo", initial_members=[user_id])
     await state.set_state(AddElementFSM.waiting_description)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"➕ <b>Добавление в турнир «{data['event_title']}»</b>\n\n"
         f"Вы ищете команду ({data['target_size']} чел.).\n\n"
         f"Введите описание/комментарий к вашей заявке:\n"
@@ -449,7 +447,7 @@ async def fsm_add_type_solo(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(AddElementFSM.waiting_type, F.data == "add_type_team")
+@router.callback_query(AddElementFSM.waiting_type, CallbackPrefix("add_type_team"))
 async def fsm_add_type_team(callback: CallbackQuery, state: FSMContext):
     """Выбрали добавление неполной команды."""
     data = await state.get_data()
@@ -457,7 +455,8 @@ async def fsm_add_type_team(callback: CallbackQuery, state: FSMContext):
     await state.update_data(add_type="team")
     await state.set_state(AddElementFSM.waiting_teammates)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"➕ <b>Добавление команды в турнир «{data['event_title']}»</b>\n\n"
         f"👥 Размер команды: {data['target_size']}\n\n"
         f"Введите Telegram username ваших тиммейтов через пробел или запятую.\n\n"
@@ -589,7 +588,7 @@ async def fsm_teammates_input(message: Message, state: FSMContext, db: aiosqlite
     )
 
 
-@router.callback_query(AddElementFSM.waiting_description, F.data == "skip")
+@router.callback_query(AddElementFSM.waiting_description, CallbackPrefix("skip"))
 async def fsm_skip_description(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection, bot: Bot):
     """Пропустить ввод описания."""
     # Вызываем обработчик с пустым описанием
@@ -606,7 +605,8 @@ async def fsm_skip_description(callback: CallbackQuery, state: FSMContext, db: a
     # Ещё раз проверяем, что пользователь не добавлен (на случай race condition)
     has_element = await db_queries.check_user_has_element(db, event_id, user_id)
     if has_element:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "❌ Вы уже добавлены в этот турнир.",
             reply_markup=main_menu_kb()
         )
@@ -632,7 +632,7 @@ async def fsm_skip_description(callback: CallbackQuery, state: FSMContext, db: a
     
     # Получаем всех участников для отображения
     members = await db_queries.get_element_members(db, element_id)
-    members_text = "\n".join([f"• {format_member_info(m)}" for m in members])
+    members_text = bullet_list(members)
     
     # Уведомляем добавленных участников (кроме создателя)
     for member_id in initial_members:
@@ -651,7 +651,8 @@ async def fsm_skip_description(callback: CallbackQuery, state: FSMContext, db: a
             except Exception:
                 pass
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✅ <b>{'Команда' if len(initial_members) > 1 else 'Вы'} добавлена в турнир!</b>\n\n"
         f"📌 Турнир: {event_title}\n"
         f"📦 Заявка: #{element_id}\n\n"
@@ -717,7 +718,7 @@ async def fsm_element_description(message: Message, state: FSMContext, db: aiosq
     
     # Получаем всех участников для отображения
     members = await db_queries.get_element_members(db, element_id)
-    members_text = "\n".join([f"• {format_member_info(m)}" for m in members])
+    members_text = bullet_list(members)
     
     # Уведомляем добавленных участников (кроме создателя)
     for member_id in initial_members:
@@ -752,10 +753,9 @@ async def fsm_element_description(message: Message, state: FSMContext, db: aiosq
 
 # ==================== Остальные callbacks без изменений ====================
 
-@router.callback_query(F.data.startswith("my_elements:"))
-async def cb_my_elements(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("my_elements", event_id=int))
+async def cb_my_elements(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
     """Кнопка «Мои заявки»."""
-    event_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Проверяем существование события
@@ -767,7 +767,8 @@ async def cb_my_elements(callback: CallbackQuery, db: aiosqlite.Connection):
     # Получаем элементы пользователя
     elements = await db_queries.get_user_elements(db, event_id, user_id)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📦 <b>Мои заявки в турнире «{event['title']}»</b>",
         reply_markup=my_elements_kb(elements, event_id),
         parse_mode="HTML"
@@ -775,10 +776,9 @@ async def cb_my_elements(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("manage_element:"))
-async def cb_manage_element(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("manage_element", element_id=int))
+async def cb_manage_element(callback: CallbackQuery, db: aiosqlite.Connection, element_id: int):
     """Управление своей заявкой."""
-    element_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Получаем заявку
@@ -806,7 +806,7 @@ async def cb_manage_element(callback: CallbackQuery, db: aiosqlite.Connection):
     spots_left = target_size - len(members)
     description = element.get("description") or "—"
     
-    members_text = "\n".join([f"• {format_member_info(m)}" for m in members]) if members else "Никого"
+    members_text = bullet_list(members, empty="Никого")
     
     # Рассчитываем средний рейтинг (целое число)
     if members:
@@ -819,7 +819,8 @@ async def cb_manage_element(callback: CallbackQuery, db: aiosqlite.Connection):
     is_creator = element["creator_id"] == user_id
     creator_text = " (вы создатель)" if is_creator else ""
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"⚙️ <b>Заявка #{element_id}</b>{creator_text}\n\n"
         f"📝 Описание: {description}\n"
         f"👥 Участники ({len(members)}/{target_size}):\n{members_text}"
@@ -832,11 +833,9 @@ async def cb_manage_element(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("element_members:"))
-async def cb_element_members(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("element_members", element_id=int))
+async def cb_element_members(callback: CallbackQuery, db: aiosqlite.Connection, element_id: int):
     """Показать участников заявки."""
-    element_id = int(callback.data.split(":")[1])
-    
     # Получаем элемент
     element = await db_queries.get_element(db, element_id)
     if not element:
@@ -850,9 +849,10 @@ async def cb_element_members(callback: CallbackQuery, db: aiosqlite.Connection):
         await callback.answer("📭 В заявке пока нет участников", show_alert=True)
         return
     
-    members_text = "\n".join([f"• {format_member_info(m)}" for m in members])
+    members_text = bullet_list(members)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"👥 <b>Участники заявки #{element_id}</b>\n\n"
         f"{members_text}",
         reply_markup=manage_element_kb(element_id, element["event_id"]),
@@ -861,10 +861,9 @@ async def cb_element_members(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("delete_element:"))
-async def cb_delete_element(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("delete_element", element_id=int))
+async def cb_delete_element(callback: CallbackQuery, db: aiosqlite.Connection, element_id: int):
     """Удаление заявки — показать подтверждение."""
-    element_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Получаем элемент
@@ -882,7 +881,8 @@ async def cb_delete_element(callback: CallbackQuery, db: aiosqlite.Connection):
     members = await db_queries.get_element_members(db, element_id)
     pending_requests = await db_queries.get_pending_requests_for_element(db, element_id)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🗑 <b>Удаление заявки #{element_id}</b>\n\n"
         f"⚠️ <b>Внимание!</b>\n"
         f"Будут удалены:\n"
@@ -896,10 +896,9 @@ async def cb_delete_element(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("confirm:delete_element:"))
-async def cb_confirm_delete_element(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot):
+@router.callback_query(CallbackPrefix("confirm:delete_element", element_id=int))
+async def cb_confirm_delete_element(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot, element_id: int):
     """Подтверждение удаления заявки."""
-    element_id = int(callback.data.split(":")[2])
     user_id = callback.from_user.id
     
     # Получаем элемент
@@ -944,7 +943,8 @@ async def cb_confirm_delete_element(callback: CallbackQuery, db: aiosqlite.Conne
                 except Exception:
                     pass
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"✅ <b>Заявка #{element_id} удалёна</b>\n\n"
             f"Все участники были уведомлены.",
             reply_markup=event_menu_kb(event_id, is_owner=(event["owner_id"] == user_id)),
@@ -955,7 +955,7 @@ async def cb_confirm_delete_element(callback: CallbackQuery, db: aiosqlite.Conne
         await callback.answer("❌ Не удалось удалить заявку", show_alert=True)
 
 
-@router.callback_query(F.data == "back_my_elements")
+@router.callback_query(CallbackPrefix("back_my_elements"))
 async def cb_back_my_elements(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Возврат к списку своих заявок."""
     # Пытаемся получить event_id из state или показываем все элементы
@@ -967,7 +967,8 @@ async def cb_back_my_elements(callback: CallbackQuery, state: FSMContext, db: ai
         event = await db_queries.get_event(db, event_id)
         if event:
             elements = await db_queries.get_user_elements(db, event_id, user_id)
-            await callback.message.edit_text(
+            await edit_text(
+                callback.message,
                 f"📦 <b>Мои заявки в турнире «{event['title']}»</b>",
                 reply_markup=my_elements_kb(elements, event_id),
                 parse_mode="HTML"
@@ -976,7 +977,8 @@ async def cb_back_my_elements(callback: CallbackQuery, state: FSMContext, db: ai
             return
     
     # Если event_id неизвестен, показываем главное меню
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "🏠 <b>Главное меню</b>\n\n"
         "Выберите действие:",
         reply_markup=main_menu_kb(),
@@ -1031,7 +1033,7 @@ async def cmd_my_applications(message: Message, db: aiosqlite.Connection):
     )
 
 
-@router.callback_query(F.data == "my_applications")
+@router.callback_query(CallbackPrefix("my_applications"))
 async def cb_my_applications(callback: CallbackQuery, db: aiosqlite.Connection):
     """Кнопка «Мои заявки»."""
     user_id = callback.from_user.id
@@ -1047,7 +1049,8 @@ async def cb_my_applications(callback: CallbackQuery, db: aiosqlite.Connection):
     groups = data["groups"]
     
     if not elements and not groups:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "📦 <b>Мои заявки</b>\n\n"
             "У вас пока нет активных заявок и сформированных групп в открытых турнирах.\n\n"
             "Найдите турнир и добавьте себя!",
@@ -1060,7 +1063,8 @@ async def cb_my_applications(callback: CallbackQuery, db: aiosqlite.Connection):
     # Формируем статистику
     total_pending = sum(elem.get("pending_requests", 0) for elem in elements)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📦 <b>Мои заявки</b>\n\n"
         f"📋 Активных заявок: {len(elements)}\n"
         f"✅ Сформированных групп: {len(groups)}\n"
@@ -1072,10 +1076,9 @@ async def cb_my_applications(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("view_my_group:"))
-async def cb_view_my_group(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("view_my_group", group_id=int))
+async def cb_view_my_group(callback: CallbackQuery, db: aiosqlite.Connection, group_id: int):
     """Просмотр сформированной группы."""
-    group_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Получаем группу
@@ -1101,7 +1104,6 @@ async def cb_view_my_group(callback: CallbackQuery, db: aiosqlite.Connection):
     event_date = event.get("event_date")
     
     # Дата турнира
-    from handlers.events import format_date_ru, get_days_until
     date_text = format_date_ru(event_date) if event_date else "Не указана"
     days_until = get_days_until(event_date) if event_date else ""
     date_line = f"📅 Дата турнира: {date_text}"
@@ -1109,68 +1111,31 @@ async def cb_view_my_group(callback: CallbackQuery, db: aiosqlite.Connection):
         date_line += f" ({days_until})"
     
     # Формируем список участников с контактами
-    def format_member_with_contact_full(member: dict, is_current_user: bool = False) -> str:
-        """Форматировать участника с полной информацией."""
-        gender_icon = "👨" if member.get("gender") == "male" else "👩" if member.get("gender") == "female" else "👤"
-        username = member.get("username", "Без имени")
-        rating = int(member.get("rating", 0))
-        telegram_username = member.get("telegram_username")
-        
-        info = f"{gender_icon} <b>{username}</b> — рейтинг: {rating}"
-        
-        if is_current_user:
-            info += " (вы)"
-        else:
-            # Добавляем контакт
-            if telegram_username:
-                contact = f"@{telegram_username}"
-            else:
-                contact = f"<a href='tg://user?id={member['user_id']}'>написать</a>"
-            info += f"\n   📱 Контакт: {contact}"
-        
-        return info
-    
-    members_text = ""
-    for m in members:
-        is_current = m["user_id"] == user_id
-        members_text += f"\n• {format_member_with_contact_full(m, is_current)}"
+    members_text = bullet_list(
+        members,
+        lambda m: member_contact_line(m, is_current_user=(m["user_id"] == user_id))
+    )
     
-    if event_type == "pair":
-        # Для пары
-        await callback.message.edit_text(
-            f"✅ <b>Сформированная пара</b>\n\n"
-            f"📌 Турнир: {event_title}\n"
-            f"{date_line}\n\n"
-            f"⭐ Средний рейтинг: {avg_rating}\n\n"
-            f"👥 <b>Участники:</b>"
-            f"{members_text}\n\n"
-            f"💬 Свяжитесь с партнёром для координации!\n"
-            f"🆔 Группа: <code>{group_id}</code>",
-            reply_markup=group_detail_kb(group_id, event_id),
-            parse_mode="HTML"
-        )
-    else:
-        # Для команды
-        await callback.message.edit_text(
-            f"✅ <b>Сформированная команда</b>\n\n"
-            f"📌 Турнир: {event_title}\n"
-            f"{date_line}\n\n"
-            f"⭐ Средний рейтинг команды: {avg_rating}\n"
-            f"👥 Участников: {len(members)}\n\n"
-            f"<b>Участники:</b>"
-            f"{members_text}\n\n"
-            f"💬 Свяжитесь с командой для координации!\n"
-            f"🆔 Группа: <code>{group_id}</code>",
-            reply_markup=group_detail_kb(group_id, event_id),
-            parse_mode="HTML"
-        )
+    template = GROUP_PAIR_DETAILS if event_type == "pair" else GROUP_TEAM_DETAILS
+    await edit_text(
+        callback.message,
+        template(
+            event_title=event_title,
+            date_line=date_line,
+            avg_rating=avg_rating,
+            members_count=len(members),
+            members_text=members_text,
+            group_id=group_id
+        ),
+        reply_markup=group_detail_kb(group_id, event_id),
+        parse_mode="HTML"
+    )
     
     await callback.answer()
 
-@router.callback_query(F.data.startswith("view_my_application:"))
-async def cb_view_my_application(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("view_my_application", element_id=int))
+async def cb_view_my_application(callback: CallbackQuery, db: aiosqlite.Connection, element_id: int):
     """Просмотр детальной информации о заявке."""
-    element_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Получаем заявку
@@ -1206,7 +1171,6 @@ async def cb_view_my_application(callback: CallbackQuery, db: aiosqlite.Connecti
     event_type = element.get("event_type", "pair")
     
     # Дата турнира
-    from handlers.events import format_date_ru, get_days_until
     date_text = format_date_ru(event_date) if event_date else "Не указана"
     days_until = get_days_until(event_date) if event_date else ""
     date_line = f"📅 Дата турнира: {date_text}"
@@ -1225,7 +1189,8 @@ async def cb_view_my_application(callback: CallbackQuery, db: aiosqlite.Connecti
             username = member.get("username", "Без имени")
             rating = int(member.get("rating", 0))
             
-            await callback.message.edit_text(
+            await edit_text(
+                callback.message,
                 f"👥 <b>Заявка на пару #{element_id}</b>\n\n"
                 f"📌 Турнир: {event_title}\n"
                 f"{date_line}\n"
@@ -1240,7 +1205,8 @@ async def cb_view_my_application(callback: CallbackQuery, db: aiosqlite.Connecti
                 parse_mode="HTML"
             )
         else:
-            await callback.message.edit_text(
+            await edit_text(
+                callback.message,
                 f"👥 <b>Заявка на пару #{element_id}</b>\n\n"
                 f"📌 Турнир: {event_title}\n"
                 f"{date_line}\n"
@@ -1254,7 +1220,7 @@ async def cb_view_my_application(callback: CallbackQuery, db: aiosqlite.Connecti
     else:
         # Для команд показываем количество и средний рейтинг
         members_count = len(members)
-        members_text = "\n".join([f"• {format_member_info(m)}" for m in members]) if members else "Никого"
+        members_text = bullet_list(members, empty="Никого")
         
         # Рассчитываем средний рейтинг (целое число)
         if members:
@@ -1264,7 +1230,8 @@ async def cb_view_my_application(callback: CallbackQuery, db: aiosqlite.Connecti
         else:
             avg_rating_text = ""
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"👨‍👩‍👧‍👦 <b>Командная заявка #{element_id}</b>\n\n"
             f"📌 Турнир: {event_title}\n"
             f"{date_line}\n"
@@ -1281,10 +1248,9 @@ async def cb_view_my_application(callback: CallbackQuery, db: aiosqlite.Connecti
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("leave_element:"))
-async def cb_leave_element(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot):
+@router.callback_query(CallbackPrefix("leave_element", element_id=int))
+async def cb_leave_element(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot, element_id: int):
     """Покинуть заявку (для участников, не создателей)."""
-    element_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Получаем заявку
@@ -1340,7 +1306,8 @@ async def cb_leave_element(callback: CallbackQuery, db: aiosqlite.Connection, bo
         except Exception:
             pass
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"✅ <b>Вы покинули заявку</b>\n\n"
             f"📌 Турнир: {event['title']}\n"
             f"📦 Заявка: #{element_id}\n\n"
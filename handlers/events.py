@@ -2,9 +2,9 @@
 Обработчики: /create_event, /list_events, /close_event.
 """
 
-from datetime import datetime, date
+from datetime import date
 
-from aiogram import Router, F
+from aiogram import Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
@@ -25,8 +25,17 @@ from keyboards.inline import (
     skip_kb
 )
 from database import queries as db_queries
+from utils.dates import format_date_ru, get_days_until
+from utils.render import EVENT_DETAILS, GROUP_LIST_LINE
+from balancing import form_balanced_teams
+from handlers.requests import notify_group_formed
+from utils.callbacks import CallbackRouter, CallbackPrefix
+from utils.messages import edit_text, edit_reply_markup
 
-router = Router()
+router = CallbackRouter()
+
+# Сколько групп показывать в списке сформированных групп
+GROUPS_PAGE_SIZE = 10
 
 
 # ==================== FSM для создания события ====================
@@ -46,48 +55,6 @@ class EditEventFSM(StatesGroup):
 
 # ==================== HELPERS ====================
 
-def format_date_ru(date_str: str) -> str:
-    """Форматировать дату в русский формат."""
-    if not date_str:
-        return "Не указана"
-    try:
-        dt = datetime.strptime(date_str, "%Y-%m-%d")
-        months = [
-            "", "января", "февраля", "марта", "апреля", "мая", "июня",
-            "июля", "августа", "сентября", "октября", "ноября", "декабря"
-        ]
-        return f"{dt.day} {months[dt.month]} {dt.year}"
-    except:
-        return date_str
-
-
-def get_days_until(date_str: str) -> str:
-    """Получить текст о количестве дней до события (компактный формат)."""
-    if not date_str:
-        return ""
-    try:
-        event_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-        today = date.today()
-        delta = (event_date - today).days
-        
-        if delta == 0:
-            return "Сегодня"
-        elif delta == 1:
-            return "Завтра"
-        elif delta < 0:
-            return "Прошёл"
-        elif delta <= 7:
-            return f"Через {delta}д"
-        elif delta <= 30:
-            return f"{delta}д"
-        else:
-            # Для дальних дат показываем саму дату
-            dt = datetime.strptime(date_str, "%Y-%m-%d")
-            return f"{dt.day:02d}.{dt.month:02d}"
-    except:
-        return ""
-
-
 def format_event_info(event: dict, include_stats: bool = False) -> str:
     """Форматировать информацию о событии."""
     type_label = "👥 Пары" if event["type"] == "pair" else f"👨‍👩‍👧‍👦 Команды ({event.get('team_size', '?')} чел.)"
@@ -140,23 +107,24 @@ async def show_event_details(callback: CallbackQuery, db: aiosqlite.Connection,
     if days_until:
         date_line += f" <b>{days_until}</b>"
     
-    text = (
-        f"📌 <b>{event['title']}</b>{owner_text}\n\n"
-        f"🎯 Тип: {type_label}\n"
-        f"{date_line}\n"
-        f"📝 Описание: {description}\n"
-        f"📊 Статус: {status_label}\n\n"
-        f"📈 <b>Статистика:</b>\n"
-        f"• Активных заявок: {stats['active_elements']}\n"
-        f"• Сформированных групп: {stats['total_groups']}\n"
-        f"• Участников в группах: {stats['users_in_groups']}\n"
-        f"• Ожидающих запросов: {stats['pending_requests']}\n\n"
-        f"🆔 ID: <code>{event_id}</code>"
+    text = EVENT_DETAILS(
+        title=event["title"],
+        owner_text=owner_text,
+        type_label=type_label,
+        date_line=date_line,
+        description=description,
+        status_label=status_label,
+        active_elements=stats["active_elements"],
+        total_groups=stats["total_groups"],
+        users_in_groups=stats["users_in_groups"],
+        pending_requests=stats["pending_requests"],
+        event_id=event_id
     )
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         text,
-        reply_markup=event_menu_kb(event_id, is_owner=is_owner),
+        reply_markup=event_menu_kb(event_id, is_owner=is_owner, is_team=(event["type"] == "team")),
         parse_mode="HTML"
     )
 
@@ -210,15 +178,6 @@ async def cmd_list_events(message: Message, db: aiosqlite.Connection):
         )
         return
     
-    # Добавляем информацию о дате к каждому событию
-    for event in events:
-        event_date = event.get("event_date")
-        if event_date:
-            days_until = get_days_until(event_date)
-            event["date_badge"] = days_until
-        else:
-            event["date_badge"] = ""
-    
     await message.answer(
         f"📋 <b>Открытые турниры ({len(events)})</b>\n\n"
         "Выберите турнир для просмотра:",
@@ -325,7 +284,7 @@ async def cmd_my_events(message: Message, db: aiosqlite.Connection):
 
 # ==================== CALLBACKS ====================
 
-@router.callback_query(F.data == "create_event")
+@router.callback_query(CallbackPrefix("create_event"))
 async def cb_create_event(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Кнопка «Создать турнир»."""
     user_id = callback.from_user.id
@@ -335,7 +294,8 @@ async def cb_create_event(callback: CallbackQuery, state: FSMContext, db: aiosql
         return
     
     await state.set_state(CreateEventFSM.waiting_title)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "🏆 <b>Создание турнира</b>\n\n"
         "Шаг 1/5: Введите название турнира:",
         reply_markup=cancel_kb(),
@@ -344,7 +304,7 @@ async def cb_create_event(callback: CallbackQuery, state: FSMContext, db: aiosql
     await callback.answer()
 
 
-@router.callback_query(F.data == "search_events")
+@router.callback_query(CallbackPrefix("search_events"))
 async def cb_search_events(callback: CallbackQuery, db: aiosqlite.Connection):
     """Кнопка «Поиск турниров»."""
     user_id = callback.from_user.id
@@ -356,7 +316,8 @@ async def cb_search_events(callback: CallbackQuery, db: aiosqlite.Connection):
     events = await db_queries.list_open_events(db)
     
     if not events:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "🔎 <b>Поиск турниров</b>\n\n"
             "Пока нет открытых турниров.\n"
             "Создайте первый!",
@@ -364,16 +325,8 @@ async def cb_search_events(callback: CallbackQuery, db: aiosqlite.Connection):
             parse_mode="HTML"
         )
     else:
-        # Добавляем информацию о дате
-        for event in events:
-            event_date = event.get("event_date")
-            if event_date:
-                days_until = get_days_until(event_date)
-                event["date_badge"] = days_until
-            else:
-                event["date_badge"] = ""
-        
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"🔎 <b>Открытые турниры ({len(events)})</b>\n\n"
             "Выберите турнир:",
             reply_markup=events_list_kb(events, action="view"),
@@ -382,7 +335,7 @@ async def cb_search_events(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data == "my_events")
+@router.callback_query(CallbackPrefix("my_events"))
 async def cb_my_events(callback: CallbackQuery, db: aiosqlite.Connection):
     """Кнопка «Мои турниры»."""
     user_id = callback.from_user.id
@@ -394,7 +347,8 @@ async def cb_my_events(callback: CallbackQuery, db: aiosqlite.Connection):
     events = await db_queries.list_user_events(db, user_id)
     
     if not events:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "📋 <b>Мои турниры</b>\n\n"
             "У вас пока нет созданных турниров.\n"
             "Создайте первый!",
@@ -411,7 +365,8 @@ async def cb_my_events(callback: CallbackQuery, db: aiosqlite.Connection):
             else:
                 event["date_badge"] = ""
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"📋 <b>Мои турниры ({len(events)})</b>\n\n"
             "Выберите турнир для управления:",
             reply_markup=events_list_kb(events, action="manage"),
@@ -420,30 +375,27 @@ async def cb_my_events(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("event:view:"))
-async def cb_view_event(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("event:view", event_id=int))
+async def cb_view_event(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
     """Просмотр конкретного турнира."""
-    event_id = int(callback.data.split(":")[2])
     user_id = callback.from_user.id
     
     await show_event_details(callback, db, event_id, user_id)
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("event:manage:"))
-async def cb_manage_event(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("event:manage", event_id=int))
+async def cb_manage_event(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
     """Управление турниром (для владельца)."""
-    event_id = int(callback.data.split(":")[2])
     user_id = callback.from_user.id
     
     await show_event_details(callback, db, event_id, user_id)
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("close_event:"))
-async def cb_close_event(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("close_event", event_id=int))
+async def cb_close_event(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
     """Закрыть турнир (кнопка) — показать подтверждение."""
-    event_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     event = await db_queries.get_event(db, event_id)
@@ -461,7 +413,8 @@ async def cb_close_event(callback: CallbackQuery, db: aiosqlite.Connection):
     
     stats = await db_queries.get_event_statistics(db, event_id)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🔒 <b>Закрытие турнира «{event['title']}»</b>\n\n"
         f"⚠️ <b>Внимание!</b>\n"
         f"После закрытия новые заявки и запросы не будут приниматься.\n\n"
@@ -476,10 +429,9 @@ async def cb_close_event(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("confirm:close_event:"))
-async def cb_confirm_close_event(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("confirm:close_event", event_id=int))
+async def cb_confirm_close_event(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
     """Подтверждение закрытия турнира."""
-    event_id = int(callback.data.split(":")[2])
     user_id = callback.from_user.id
     
     success = await db_queries.close_event(db, event_id, user_id)
@@ -488,7 +440,8 @@ async def cb_confirm_close_event(callback: CallbackQuery, db: aiosqlite.Connecti
         event = await db_queries.get_event(db, event_id)
         await db_queries.create_log(db, "event_closed", f"event_id={event_id}, owner_id={user_id}")
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"✅ <b>Турнир «{event['title']}» закрыт</b>\n\n"
             f"Новые заявки и запросы больше не принимаются.\n"
             f"Уже сформированные группы сохранены.",
@@ -500,45 +453,120 @@ async def cb_confirm_close_event(callback: CallbackQuery, db: aiosqlite.Connecti
         await callback.answer("❌ Не удалось закрыть турнир", show_alert=True)
 
 
-@router.callback_query(F.data.startswith("event_groups:"))
-async def cb_event_groups(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("event_groups", event_id=int))
+async def cb_event_groups(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
     """Показать сформированные группы в турнире."""
-    event_id = int(callback.data.split(":")[1])
-    
     event = await db_queries.get_event(db, event_id)
     if not event:
         await callback.answer("❌ Турнир не найден", show_alert=True)
         return
     
-    groups = await db_queries.get_event_groups(db, event_id)
+    # Загружаем только показываемую страницу, общее число — отдельным COUNT
+    groups = await db_queries.get_event_groups(db, event_id, limit=GROUPS_PAGE_SIZE)
     
     if not groups:
         await callback.answer("📭 Пока нет сформированных групп", show_alert=True)
         return
     
     # Формируем текст со списком групп
-    groups_text = ""
-    for i, group in enumerate(groups[:10], 1):  # Показываем максимум 10
-        members = group.get("members", [])
-        members_names = ", ".join([m.get("username", "?") for m in members])
-        avg_rating = int(group.get("rating_avg", 0))
-        groups_text += f"\n{i}. ⭐ {avg_rating} — {members_names}"
-    
-    total = len(groups)
-    shown = min(total, 10)
+    groups_text = "".join([
+        "\n" + GROUP_LIST_LINE(
+            index=i,
+            avg_rating=int(group.get("rating_avg") or 0),
+            names=", ".join([m.get("username") or "?" for m in group.get("members", [])])
+        )
+        for i, group in enumerate(groups, 1)
+    ])
+    
+    total = await db_queries.count_event_groups(db, event_id)
+    shown = len(groups)
     more_text = f"\n\n... и ещё {total - shown}" if total > shown else ""
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✅ <b>Сформированные группы</b>\n"
         f"Турнир: {event['title']}\n"
         f"Всего групп: {total}\n"
         f"{groups_text}{more_text}",
-        reply_markup=event_menu_kb(event_id, is_owner=(event["owner_id"] == callback.from_user.id)),
+        reply_markup=event_menu_kb(
+            event_id,
+            is_owner=(event["owner_id"] == callback.from_user.id),
+            is_team=(event["type"] == "team")
+        ),
+        parse_mode="HTML"
+    )
+    await callback.answer()
+
+
+@router.callback_query(CallbackPrefix("balance_teams", event_id=int))
+async def cb_balance_teams(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
+    """Собрать команды из всех открытых заявок — показать подтверждение."""
+    user_id = callback.from_user.id
+
+    event = await db_queries.get_event(db, event_id)
+    if not event:
+        await callback.answer("❌ Турнир не найден", show_alert=True)
+        return
+
+    if event["owner_id"] != user_id:
+        await callback.answer("❌ Вы не являетесь владельцем этого турнира", show_alert=True)
+        return
+
+    if event["type"] != "team" or event["status"] != "open":
+        await callback.answer("❌ Балансировка доступна только для открытых командных турниров", show_alert=True)
+        return
+
+    stats = await db_queries.get_event_statistics(db, event_id)
+
+    await edit_text(
+        callback.message,
+        f"⚖️ <b>Сборка команд «{event['title']}»</b>\n\n"
+        f"Все открытые заявки (соло и неполные команды) будут разложены "
+        f"по командам из {event['team_size']} чел. с близким средним рейтингом.\n\n"
+        f"• Активных заявок: {stats['active_elements']}\n\n"
+        f"Участники, которым не хватит места, останутся в поиске.\n"
+        f"Продолжить?",
+        reply_markup=confirm_kb("balance_teams", event_id),
         parse_mode="HTML"
     )
     await callback.answer()
 
 
+@router.callback_query(CallbackPrefix("confirm:balance_teams", event_id=int), flags={"background": True})
+async def cb_confirm_balance_teams(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot, event_id: int):
+    """Подтверждение сборки команд."""
+    user_id = callback.from_user.id
+
+    event = await db_queries.get_event(db, event_id)
+    if not event or event["owner_id"] != user_id or event["type"] != "team" or event["status"] != "open":
+        await callback.answer("❌ Не удалось собрать команды", show_alert=True)
+        return
+
+    group_ids = await form_balanced_teams(db, event_id, event["team_size"])
+
+    if not group_ids:
+        await callback.answer("📭 Недостаточно заявок, чтобы собрать хотя бы одну команду", show_alert=True)
+        return
+
+    await db_queries.create_log(
+        db, "teams_balanced", f"event_id={event_id}, owner_id={user_id}, groups={len(group_ids)}"
+    )
+
+    await edit_text(
+        callback.message,
+        f"✅ <b>Команды собраны</b>\n\n"
+        f"Турнир: {event['title']}\n"
+        f"Сформировано команд: {len(group_ids)}\n\n"
+        f"Участники получат уведомления с контактами тиммейтов.",
+        reply_markup=event_menu_kb(event_id, is_owner=True, is_team=True),
+        parse_mode="HTML"
+    )
+    await callback.answer("Команды собраны")
+
+    for group_id in group_ids:
+        await notify_group_formed(bot, db, group_id, event["title"])
+
+
 # ==================== FSM HANDLERS ====================
 
 @router.message(CreateEventFSM.waiting_title)
@@ -571,15 +599,15 @@ async def fsm_event_title(message: Message, state: FSMContext):
     )
 
 
-@router.callback_query(CreateEventFSM.waiting_type, F.data.startswith("event_type:"))
-async def fsm_event_type(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(CreateEventFSM.waiting_type, CallbackPrefix("event_type", event_type=str))
+async def fsm_event_type(callback: CallbackQuery, state: FSMContext, event_type: str):
     """Выбрали тип турнира."""
-    event_type = callback.data.split(":")[1]
     await state.update_data(type=event_type)
     
     if event_type == "team":
         await state.set_state(CreateEventFSM.waiting_team_size)
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "Шаг 3/5: Выберите размер команды:",
             reply_markup=team_size_kb()
         )
@@ -590,7 +618,8 @@ async def fsm_event_type(callback: CallbackQuery, state: FSMContext):
         # Показываем календарь
         from datetime import date
         today = date.today()
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "✅ Тип: <b>👥 Пары (2 человека)</b>\n\n"
             "Шаг 3/5: Выберите дату начала проведения турнира:\n\n"
             "<i>Турнир автоматически закроется на следующий день после указанной даты</i>",
@@ -601,17 +630,17 @@ async def fsm_event_type(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(CreateEventFSM.waiting_team_size, F.data.startswith("team_size:"))
-async def fsm_team_size(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(CreateEventFSM.waiting_team_size, CallbackPrefix("team_size", team_size=int))
+async def fsm_team_size(callback: CallbackQuery, state: FSMContext, team_size: int):
     """Выбрали размер команды."""
-    team_size = int(callback.data.split(":")[1])
     await state.update_data(team_size=team_size)
     await state.set_state(CreateEventFSM.waiting_date)
     
     # Показываем календарь
     from datetime import date
     today = date.today()
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✅ Размер команды: <b>{team_size} человек</b>\n\n"
         "Шаг 4/5: Выберите дату начала проведения турнира:\n\n"
         "<i>Турнир автоматически закроется на следующий день после указанной даты</i>",
@@ -623,28 +652,25 @@ async def fsm_team_size(callback: CallbackQuery, state: FSMContext):
 
 # ==================== КАЛЕНДАРЬ ====================
 
-@router.callback_query(CreateEventFSM.waiting_date, F.data.startswith("cal_nav:"))
-async def fsm_calendar_nav(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(CreateEventFSM.waiting_date, CallbackPrefix("cal_nav", year=int, month=int), flags={"throttling_key": "calendar"})
+async def fsm_calendar_nav(callback: CallbackQuery, state: FSMContext, year: int, month: int):
     """Навигация по календарю."""
-    _, year, month = callback.data.split(":")
-    year, month = int(year), int(month)
-    
-    await callback.message.edit_reply_markup(
+    await edit_reply_markup(
+        callback.message,
         reply_markup=date_picker_kb(year, month)
     )
     await callback.answer()
 
 
-@router.callback_query(CreateEventFSM.waiting_date, F.data.startswith("cal_select:"))
-async def fsm_calendar_select(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(CreateEventFSM.waiting_date, CallbackPrefix("cal_select", date_str=str))
+async def fsm_calendar_select(callback: CallbackQuery, state: FSMContext, date_str: str):
     """Выбрали дату."""
-    date_str = callback.data.split(":")[1]
-    
     await state.update_data(event_date=date_str)
     
     date_formatted = format_date_ru(date_str)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📅 Выбранная дата: <b>{date_formatted}</b>\n\n"
         "Подтвердите выбор:",
         reply_markup=date_confirm_kb(date_str),
@@ -653,16 +679,16 @@ async def fsm_calendar_select(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(CreateEventFSM.waiting_date, F.data.startswith("cal_confirm:"))
-async def fsm_calendar_confirm(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(CreateEventFSM.waiting_date, CallbackPrefix("cal_confirm", date_str=str))
+async def fsm_calendar_confirm(callback: CallbackQuery, state: FSMContext, date_str: str):
     """Подтвердили дату."""
-    date_str = callback.data.split(":")[1]
     await state.update_data(event_date=date_str)
     await state.set_state(CreateEventFSM.waiting_description)
     
     date_formatted = format_date_ru(date_str)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✅ Дата: <b>{date_formatted}</b>\n\n"
         "Шаг 5/5: Введите описание турнира\n"
         "(или отправьте <code>-</code> чтобы пропустить):",
@@ -672,24 +698,26 @@ async def fsm_calendar_confirm(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(CreateEventFSM.waiting_date, F.data == "cal_change")
+@router.callback_query(CreateEventFSM.waiting_date, CallbackPrefix("cal_change"))
 async def fsm_calendar_change(callback: CallbackQuery, state: FSMContext):
     """Изменить дату."""
     today = date.today()
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "📅 Выберите дату начала проведения турнира:",
         reply_markup=date_picker_kb(today.year, today.month)
     )
     await callback.answer()
 
 
-@router.callback_query(CreateEventFSM.waiting_date, F.data == "cal_skip")
+@router.callback_query(CreateEventFSM.waiting_date, CallbackPrefix("cal_skip"))
 async def fsm_calendar_skip(callback: CallbackQuery, state: FSMContext):
     """Пропустить выбор даты."""
     await state.update_data(event_date=None)
     await state.set_state(CreateEventFSM.waiting_description)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "⏭ Дата не указана\n\n"
         "Шаг 5/5: Введите описание турнира\n"
         "(или отправьте <code>-</code> чтобы пропустить):",
@@ -699,7 +727,7 @@ async def fsm_calendar_skip(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(CreateEventFSM.waiting_date, F.data == "cal_ignore")
+@router.callback_query(CreateEventFSM.waiting_date, CallbackPrefix("cal_ignore"))
 async def fsm_calendar_ignore(callback: CallbackQuery):
     """Игнорировать клик на неактивную кнопку календаря."""
     await callback.answer()
@@ -761,10 +789,9 @@ async def fsm_event_description(message: Message, state: FSMContext, db: aiosqli
 
 # ==================== РЕДАКТИРОВАНИЕ ТУРНИРА ====================
 
-@router.callback_query(F.data.startswith("edit_event:"))
-async def cb_edit_event(callback: CallbackQuery, db: aiosqlite.Connection, state: FSMContext):
+@router.callback_query(CallbackPrefix("edit_event", event_id=int))
+async def cb_edit_event(callback: CallbackQuery, db: aiosqlite.Connection, state: FSMContext, event_id: int):
     """Начать редактирование турнира."""
-    event_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Получаем событие
@@ -787,7 +814,8 @@ async def cb_edit_event(callback: CallbackQuery, db: aiosqlite.Connection, state
     date_text = format_date_ru(event_date) if event_date else "Не указана"
     description = event.get("description") or "Не указано"
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✏️ <b>Редактирование турнира</b>\n\n"
         f"📌 <b>Текущие данные:</b>\n\n"
         f"<b>Название:</b> {event['title']}\n"
@@ -802,7 +830,7 @@ async def cb_edit_event(callback: CallbackQuery, db: aiosqlite.Connection, state
 
 # ==================== ВЫБОР ПОЛЯ ДЛЯ РЕДАКТИРОВАНИЯ ====================
 
-@router.callback_query(EditEventFSM.waiting_field_choice, F.data == "edit_event_title")
+@router.callback_query(EditEventFSM.waiting_field_choice, CallbackPrefix("edit_event_title"))
 async def cb_edit_event_title(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Редактировать название."""
     data = await state.get_data()
@@ -812,7 +840,8 @@ async def cb_edit_event_title(callback: CallbackQuery, state: FSMContext, db: ai
     
     await state.set_state(EditEventFSM.waiting_new_title)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✏️ <b>Изменение названия</b>\n\n"
         f"Текущее название: <b>{event['title']}</b>\n\n"
         f"Введите новое название турнира:",
@@ -822,7 +851,7 @@ async def cb_edit_event_title(callback: CallbackQuery, state: FSMContext, db: ai
     await callback.answer()
 
 
-@router.callback_query(EditEventFSM.waiting_field_choice, F.data == "edit_event_date")
+@router.callback_query(EditEventFSM.waiting_field_choice, CallbackPrefix("edit_event_date"))
 async def cb_edit_event_date(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Редактировать дату."""
     data = await state.get_data()
@@ -837,7 +866,8 @@ async def cb_edit_event_date(callback: CallbackQuery, state: FSMContext, db: aio
     # Показываем календарь
     today = date.today()
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✏️ <b>Изменение даты</b>\n\n"
         f"Текущая дата: <b>{date_text}</b>\n\n"
         f"Выберите новую дату начала проведения турнира:\n\n"
@@ -848,7 +878,7 @@ async def cb_edit_event_date(callback: CallbackQuery, state: FSMContext, db: aio
     await callback.answer()
 
 
-@router.callback_query(EditEventFSM.waiting_field_choice, F.data == "edit_event_description")
+@router.callback_query(EditEventFSM.waiting_field_choice, CallbackPrefix("edit_event_description"))
 async def cb_edit_event_description(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Редактировать описание."""
     data = await state.get_data()
@@ -859,7 +889,8 @@ async def cb_edit_event_description(callback: CallbackQuery, state: FSMContext,
     
     await state.set_state(EditEventFSM.waiting_new_description)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✏️ <b>Изменение описания</b>\n\n"
         f"Текущее описание:\n{description}\n\n"
         f"Введите новое описание турнира:",
@@ -927,7 +958,7 @@ async def fsm_edit_title(message: Message, state: FSMContext, db: aiosqlite.Conn
         )
 
 
-@router.callback_query(EditEventFSM.waiting_new_description, F.data == "skip")
+@router.callback_query(EditEventFSM.waiting_new_description, CallbackPrefix("skip"))
 async def fsm_edit_description_skip(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Пропустить/удалить описание."""
     data = await state.get_data()
@@ -953,7 +984,8 @@ async def fsm_edit_description_skip(callback: CallbackQuery, state: FSMContext,
             f"event_id={event_id}"
         )
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"✅ <b>Описание удалено</b>",
             reply_markup=event_menu_kb(event_id, is_owner=True),
             parse_mode="HTML"
@@ -1013,28 +1045,25 @@ async def fsm_edit_description(message: Message, state: FSMContext, db: aiosqlit
 
 # ==================== FSM: ОБРАБОТКА НОВОЙ ДАТЫ ====================
 
-@router.callback_query(EditEventFSM.waiting_new_date, F.data.startswith("cal_nav:"))
-async def fsm_edit_date_nav(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(EditEventFSM.waiting_new_date, CallbackPrefix("cal_nav", year=int, month=int), flags={"throttling_key": "calendar"})
+async def fsm_edit_date_nav(callback: CallbackQuery, state: FSMContext, year: int, month: int):
     """Навигация по календарю при редактировании."""
-    _, year, month = callback.data.split(":")
-    year, month = int(year), int(month)
-    
-    await callback.message.edit_reply_markup(
+    await edit_reply_markup(
+        callback.message,
         reply_markup=date_picker_kb(year, month)
     )
     await callback.answer()
 
 
-@router.callback_query(EditEventFSM.waiting_new_date, F.data.startswith("cal_select:"))
-async def fsm_edit_date_select(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(EditEventFSM.waiting_new_date, CallbackPrefix("cal_select", date_str=str))
+async def fsm_edit_date_select(callback: CallbackQuery, state: FSMContext, date_str: str):
     """Выбрали новую дату."""
-    date_str = callback.data.split(":")[1]
-    
     await state.update_data(new_date=date_str)
     
     date_formatted = format_date_ru(date_str)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📅 Выбранная дата: <b>{date_formatted}</b>\n\n"
         "Подтвердите выбор:",
         reply_markup=date_confirm_kb(date_str),
@@ -1043,11 +1072,9 @@ async def fsm_edit_date_select(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(EditEventFSM.waiting_new_date, F.data.startswith("cal_confirm:"))
-async def fsm_edit_date_confirm(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
+@router.callback_query(EditEventFSM.waiting_new_date, CallbackPrefix("cal_confirm", date_str=str))
+async def fsm_edit_date_confirm(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection, date_str: str):
     """Подтвердили новую дату."""
-    date_str = callback.data.split(":")[1]
-    
     data = await state.get_data()
     await state.clear()
     
@@ -1077,7 +1104,8 @@ async def fsm_edit_date_confirm(callback: CallbackQuery, state: FSMContext, db:
         
         date_formatted = format_date_ru(date_str)
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"✅ <b>Дата обновлена</b>\n\n"
             f"Было: {old_date_text}\n"
             f"Стало: {date_formatted}",
@@ -1089,18 +1117,19 @@ async def fsm_edit_date_confirm(callback: CallbackQuery, state: FSMContext, db:
         await callback.answer("❌ Не удалось обновить дату", show_alert=True)
 
 
-@router.callback_query(EditEventFSM.waiting_new_date, F.data == "cal_change")
+@router.callback_query(EditEventFSM.waiting_new_date, CallbackPrefix("cal_change"))
 async def fsm_edit_date_change(callback: CallbackQuery, state: FSMContext):
     """Изменить дату (вернуться к календарю)."""
     today = date.today()
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "📅 Выберите новую дату проведения турнира:",
         reply_markup=date_picker_kb(today.year, today.month)
     )
     await callback.answer()
 
 
-@router.callback_query(EditEventFSM.waiting_new_date, F.data == "cal_skip")
+@router.callback_query(EditEventFSM.waiting_new_date, CallbackPrefix("cal_skip"))
 async def fsm_edit_date_skip(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Удалить дату (установить NULL)."""
     data = await state.get_data()
@@ -1130,7 +1159,8 @@ async def fsm_edit_date_skip(callback: CallbackQuery, state: FSMContext, db: aio
             f"event_id={event_id}, old_date={old_date}"
         )
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"✅ <b>Дата удалена</b>\n\n"
             f"Было: {old_date_text}\n"
             f"Стало: Не указана",
@@ -1142,7 +1172,7 @@ async def fsm_edit_date_skip(callback: CallbackQuery, state: FSMContext, db: aio
         await callback.answer("❌ Не удалось удалить дату", show_alert=True)
 
 
-@router.callback_query(EditEventFSM.waiting_new_date, F.data == "cal_ignore")
+@router.callback_query(EditEventFSM.waiting_new_date, CallbackPrefix("cal_ignore"))
 async def fsm_edit_date_ignore(callback: CallbackQuery):
     """Игнорировать клик на неактивную кнопку календаря."""
     await callback.answer()
@@ -1150,10 +1180,9 @@ async def fsm_edit_date_ignore(callback: CallbackQuery):
 
 # ==================== ВОЗВРАТ К РЕДАКТИРОВАНИЮ ====================
 
-@router.callback_query(F.data.startswith("back_edit_event:"))
-async def cb_back_edit_event(callback: CallbackQuery, db: aiosqlite.Connection, state: FSMContext):
+@router.callback_query(CallbackPrefix("back_edit_event", event_id=int))
+async def cb_back_edit_event(callback: CallbackQuery, db: aiosqlite.Connection, state: FSMContext, event_id: int):
     """Вернуться к выбору поля для редактирования."""
-    event_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Получаем событие
@@ -1176,7 +1205,8 @@ async def cb_back_edit_event(callback: CallbackQuery, db: aiosqlite.Connection,
     date_text = format_date_ru(event_date) if event_date else "Не указана"
     description = event.get("description") or "Не указано"
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✏️ <b>Редактирование турнира</b>\n\n"
         f"📌 <b>Текущие данные:</b>\n\n"
         f"<b>Название:</b> {event['title']}\n"
@@ -1189,7 +1219,7 @@ async def cb_back_edit_event(callback: CallbackQuery, db: aiosqlite.Connection,
     await callback.answer()
 
 
-@router.callback_query(CreateEventFSM.waiting_description, F.data == "skip")
+@router.callback_query(CreateEventFSM.waiting_description, CallbackPrefix("skip"))
 async def fsm_event_description_skip(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Пропустить описание турнира."""
     data = await state.get_data()
@@ -1222,7 +1252,8 @@ async def fsm_event_description_skip(callback: CallbackQuery, state: FSMContext,
     date_text = format_date_ru(event_date) if event_date else "Не указана"
     auto_close_text = "\n\n<i>⏰ Турнир автоматически закроется на следующий день после указанной даты</i>" if event_date else ""
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🎉 <b>Турнир создан!</b>\n\n"
         f"📌 Название: {data['title']}\n"
         f"🎯 Тип: {type_label}\n"
@@ -2,7 +2,6 @@
 Обработчики: /my_profile, /set_username, /set_rating, /set_gender.
 """
 
-from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
@@ -12,8 +11,10 @@ import aiosqlite
 from config import GENDER_LABELS
 from keyboards.inline import profile_menu_kb, gender_with_cancel_kb, main_menu_kb, cancel_kb
 from database import queries as db_queries
+from utils.callbacks import CallbackRouter, CallbackPrefix
+from utils.messages import edit_text, send_text
 
-router = Router()
+router = CallbackRouter()
 
 
 # ==================== FSM ====================
@@ -36,7 +37,7 @@ async def show_profile(message_or_callback, db: aiosqlite.Connection, user_id: i
             "Используйте /start для регистрации."
         )
         if edit and hasattr(message_or_callback, 'message'):
-            await message_or_callback.message.edit_text(text)
+            await edit_text(message_or_callback.message, text)
         else:
             await message_or_callback.answer(text)
         return
@@ -46,11 +47,8 @@ async def show_profile(message_or_callback, db: aiosqlite.Connection, user_id: i
     rating_text = str(int(rating)) if rating is not None else "Не указан"
     gender = GENDER_LABELS.get(user.get("gender"), "Не указан")
     
-    # Получаем статистику
-    user_groups = await db_queries.get_user_groups(db, user_id)
-    user_elements = await db_queries.get_all_user_active_elements(db, user_id)
-    pending_sent = await db_queries.get_pending_requests_for_user(db, user_id)
-    pending_incoming = await db_queries.get_incoming_requests_for_user(db, user_id)
+    # Получаем статистику (счётчики одним запросом, с кэшем)
+    stats = await db_queries.get_user_stats(db, user_id)
     
     text = (
         "👤 <b>Ваш профиль</b>\n\n"
@@ -58,20 +56,22 @@ async def show_profile(message_or_callback, db: aiosqlite.Connection, user_id: i
         f"🚻 Пол: {gender}\n"
         f"📊 Рейтинг: <b>{rating_text}</b>\n\n"
         f"📈 <b>Статистика:</b>\n"
-        f"• Активные заявки: {len(user_elements)}\n"
-        f"• Сформированные группы: {len(user_groups)}\n"
-        f"• Отправленные запросы: {len(pending_sent)}\n"
-        f"• Входящие запросы: {len(pending_incoming)}"
+        f"• Активные заявки: {stats['active_elements']}\n"
+        f"• Сформированные группы: {stats['groups']}\n"
+        f"• Отправленные запросы: {stats['pending_requests']}\n"
+        f"• Входящие запросы: {stats['incoming_requests']}"
     )
     
     if edit and hasattr(message_or_callback, 'message'):
-        await message_or_callback.message.edit_text(
+        await edit_text(
+            message_or_callback.message,
             text,
             reply_markup=profile_menu_kb(),
             parse_mode="HTML"
         )
     else:
-        await message_or_callback.answer(
+        await send_text(
+            message_or_callback,
             text,
             reply_markup=profile_menu_kb(),
             parse_mode="HTML"
@@ -217,14 +217,14 @@ async def cmd_set_gender(message: Message, state: FSMContext, db: aiosqlite.Conn
 
 # ==================== CALLBACKS ====================
 
-@router.callback_query(F.data == "my_profile")
+@router.callback_query(CallbackPrefix("my_profile"))
 async def cb_my_profile(callback: CallbackQuery, db: aiosqlite.Connection):
     """Кнопка «Мой профиль»."""
-    await show_profile(callback, db, callback.from_user.id, edit=True)
     await callback.answer()
+    await show_profile(callback, db, callback.from_user.id, edit=True)
 
 
-@router.callback_query(F.data == "change_username")
+@router.callback_query(CallbackPrefix("change_username"))
 async def cb_change_username(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Кнопка «Изменить имя»."""
     user_id = callback.from_user.id
@@ -238,7 +238,8 @@ async def cb_change_username(callback: CallbackQuery, state: FSMContext, db: aio
     current_name = user.get("username", "не указано")
     
     await state.set_state(ProfileFSM.waiting_new_username)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📛 <b>Изменение имени</b>\n\n"
         f"Текущее имя: <b>{current_name}</b>\n\n"
         "Введите новое имя (никнейм):",
@@ -248,7 +249,7 @@ async def cb_change_username(callback: CallbackQuery, state: FSMContext, db: aio
     await callback.answer()
 
 
-@router.callback_query(F.data == "change_rating")
+@router.callback_query(CallbackPrefix("change_rating"))
 async def cb_change_rating(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Кнопка «Изменить рейтинг»."""
     user_id = callback.from_user.id
@@ -263,7 +264,8 @@ async def cb_change_rating(callback: CallbackQuery, state: FSMContext, db: aiosq
     rating_text = f"{current_rating:.1f}" if current_rating is not None else "не указан"
     
     await state.set_state(ProfileFSM.waiting_new_rating)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📊 <b>Изменение рейтинга</b>\n\n"
         f"Текущий рейтинг: <b>{rating_text}</b>\n\n"
         "Введите новое значение рейтинга (число):",
@@ -273,7 +275,7 @@ async def cb_change_rating(callback: CallbackQuery, state: FSMContext, db: aiosq
     await callback.answer()
 
 
-@router.callback_query(F.data == "change_gender")
+@router.callback_query(CallbackPrefix("change_gender"))
 async def cb_change_gender(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Кнопка «Изменить пол»."""
     user_id = callback.from_user.id
@@ -287,7 +289,8 @@ async def cb_change_gender(callback: CallbackQuery, state: FSMContext, db: aiosq
     current_gender = GENDER_LABELS.get(user.get("gender"), "не указан")
     
     await state.set_state(ProfileFSM.waiting_new_gender)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"🚻 <b>Изменение пола</b>\n\n"
         f"Текущий пол: <b>{current_gender}</b>\n\n"
         "Выберите новое значение:",
@@ -383,10 +386,9 @@ async def fsm_new_rating(message: Message, state: FSMContext, db: aiosqlite.Conn
     )
 
 
-@router.callback_query(ProfileFSM.waiting_new_gender, F.data.startswith("set_gender:"))
-async def fsm_new_gender(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
+@router.callback_query(ProfileFSM.waiting_new_gender, CallbackPrefix("set_gender", gender=str))
+async def fsm_new_gender(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection, gender: str):
     """Выбрали новый пол."""
-    gender = callback.data.split(":")[1]
     user_id = callback.from_user.id
     
     await state.clear()
@@ -397,7 +399,8 @@ async def fsm_new_gender(callback: CallbackQuery, state: FSMContext, db: aiosqli
     # Логируем
     await db_queries.create_log(db, "gender_updated", f"user_id={user_id}, new_gender={gender}")
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✅ Пол обновлён: <b>{GENDER_LABELS[gender]}</b>",
         reply_markup=profile_menu_kb(),
         parse_mode="HTML"
@@ -2,7 +2,7 @@
 Обработчики: /accept, /reject запросов на присоединение.
 """
 
-from aiogram import Router, F, Bot
+from aiogram import Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 import aiosqlite
@@ -16,36 +16,15 @@ from keyboards.inline import (
     manage_element_kb
 )
 from database import queries as db_queries
+from utils.render import bullet_list, member_contact_line, contact_text
+from utils.callbacks import CallbackRouter, CallbackPrefix
+from utils.messages import edit_text
 
-router = Router()
+router = CallbackRouter()
 
 
 # ==================== HELPERS ====================
 
-def format_member_info(member: dict) -> str:
-    """Форматировать информацию об участнике."""
-    gender_icon = "👨" if member.get("gender") == "male" else "👩" if member.get("gender") == "female" else "👤"
-    username = member.get("username", "Без имени")
-    rating = member.get("rating", "?")
-    return f"{gender_icon} {username} — рейтинг: {rating}"
-
-
-def format_member_with_contact(member: dict) -> str:
-    """Форматировать информацию об участнике с контактом."""
-    gender_icon = "👨" if member.get("gender") == "male" else "👩" if member.get("gender") == "female" else "👤"
-    username = member.get("username", "Без имени")
-    rating = int(member.get("rating", 0))
-    telegram_username = member.get("telegram_username")
-    
-    # Формируем контакт
-    if telegram_username:
-        contact = f"@{telegram_username}"
-    else:
-        contact = f"<a href='tg://user?id={member['user_id']}'>написать</a>"
-    
-    return f"{gender_icon} <b>{username}</b> — рейтинг: {rating}\n   📱 Контакт: {contact}"
-
-
 async def notify_group_formed(bot: Bot, db: aiosqlite.Connection, group_id: int, event_title: str):
     """Уведомить всех участников о сформированной группе с контактами."""
     # Получаем участников с контактной информацией
@@ -62,16 +41,14 @@ async def notify_group_formed(bot: Bot, db: aiosqlite.Connection, group_id: int,
         recipient_id = recipient["user_id"]
         
         # Формируем список других участников (для текущего получателя)
-        other_members_text = ""
-        for m in members:
-            if m["user_id"] != recipient_id:
-                other_members_text += f"\n• {format_member_with_contact(m)}"
+        others = [m for m in members if m["user_id"] != recipient_id]
+        other_members_text = "\n" + bullet_list(others, member_contact_line) if others else ""
         
         try:
             if len(members) == 2:
                 # Для пары — особое сообщение
                 partner = [m for m in members if m["user_id"] != recipient_id][0]
-                partner_contact = f"@{partner['telegram_username']}" if partner.get('telegram_username') else f"<a href='tg://user?id={partner['user_id']}'>написать</a>"
+                partner_contact = contact_text(partner)
                 partner_gender = GENDER_LABELS.get(partner.get("gender"), "Не указан")
                 partner_rating = int(partner.get("rating", 0))
                 
@@ -115,9 +92,6 @@ async def cmd_accept(message: Message, db: aiosqlite.Connection, bot: Bot):
     """Принять запрос: /accept 456."""
     user_id = message.from_user.id
     
-    # Обновляем telegram_username
-    await db_queries.update_telegram_username(db, user_id, message.from_user.username)
-    
     # Проверяем регистрацию
     if not await db_queries.is_profile_complete(db, user_id):
         await message.answer(
@@ -335,10 +309,9 @@ async def cmd_my_requests(message: Message, db: aiosqlite.Connection):
 
 # ==================== CALLBACKS ====================
 
-@router.callback_query(F.data.startswith("view_requests:"))
-async def cb_view_requests(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("view_requests", element_id=int))
+async def cb_view_requests(callback: CallbackQuery, db: aiosqlite.Connection, element_id: int):
     """Просмотр входящих запросов к заявке."""
-    element_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Получаем элемент
@@ -357,7 +330,8 @@ async def cb_view_requests(callback: CallbackQuery, db: aiosqlite.Connection):
     # Получаем запросы
     requests = await db_queries.get_pending_requests_for_element(db, element_id)
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📥 <b>Входящие запросы</b>\n\n"
         f"Заявка: #{element_id}\n"
         f"Ожидающих: {len(requests)}",
@@ -367,10 +341,9 @@ async def cb_view_requests(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("view_request:"))
-async def cb_view_request(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("view_request", join_id=int))
+async def cb_view_request(callback: CallbackQuery, db: aiosqlite.Connection, join_id: int):
     """Просмотр деталей запроса."""
-    join_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Получаем запрос
@@ -391,7 +364,8 @@ async def cb_view_request(callback: CallbackQuery, db: aiosqlite.Connection):
     element_id = request["element_id"]
     gender_label = GENDER_LABELS.get(request.get("gender"), "👤 Не указан")
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📨 <b>Запрос #{join_id}</b>\n\n"
         f"👤 От: <b>{request.get('username', 'Без имени')}</b>\n"
         f"🚻 Пол: {gender_label}\n"
@@ -403,15 +377,11 @@ async def cb_view_request(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("accept_request:"))
-async def cb_accept_request(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot):
+@router.callback_query(CallbackPrefix("accept_request", join_id=int), flags={"background": True})
+async def cb_accept_request(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot, join_id: int):
     """Кнопка «Принять» запрос."""
-    join_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
-    # Обновляем telegram_username
-    await db_queries.update_telegram_username(db, user_id, callback.from_user.username)
-    
     # Получаем запрос
     request = await db_queries.get_join_request(db, join_id)
     if not request:
@@ -462,13 +432,14 @@ async def cb_accept_request(callback: CallbackQuery, db: aiosqlite.Connection, b
     except Exception:
         pass
     
-    await callback.answer("✅ Запрос принят!", show_alert=True)
+    await callback.answer("✅ Запрос принят!")
     
     # Если группа сформирована, уведомляем всех с контактами
     if result["group_created"]:
         await notify_group_formed(bot, db, result["group_id"], event["title"])
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"✅ <b>Запрос #{join_id} принят!</b>\n\n"
             f"🎉 Группа полностью сформирована!\n"
             f"Все участники получили уведомление с контактами друг друга.\n\n"
@@ -485,7 +456,8 @@ async def cb_accept_request(callback: CallbackQuery, db: aiosqlite.Connection, b
         if result["deleted_user_elements"] > 0:
             deleted_text = f"\n\n<i>Автоматически удалено заявок игрока: {result['deleted_user_elements']}</i>"
         
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"✅ <b>Запрос #{join_id} принят!</b>\n\n"
             f"👤 {requester.get('username', 'Пользователь')} добавлен в заявку.\n"
             f"🪑 Осталось мест: {spots_left}"
@@ -495,10 +467,9 @@ async def cb_accept_request(callback: CallbackQuery, db: aiosqlite.Connection, b
         )
 
 
-@router.callback_query(F.data.startswith("reject_request:"))
-async def cb_reject_request(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot):
+@router.callback_query(CallbackPrefix("reject_request", join_id=int), flags={"background": True})
+async def cb_reject_request(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot, join_id: int):
     """Кнопка «Отклонить» запрос."""
-    join_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Получаем запрос
@@ -542,12 +513,13 @@ async def cb_reject_request(callback: CallbackQuery, db: aiosqlite.Connection, b
     except Exception:
         pass
     
-    await callback.answer("❌ Запрос отклонён", show_alert=True)
+    await callback.answer("❌ Запрос отклонён")
     
     # Возвращаемся к списку запросов
     remaining_requests = await db_queries.get_pending_requests_for_element(db, request["element_id"])
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"❌ <b>Запрос #{join_id} отклонён</b>\n\n"
         f"Осталось запросов: {len(remaining_requests)}",
         reply_markup=manage_element_kb(request["element_id"], request["event_id"]),
@@ -2,71 +2,108 @@
 Обработчики: /search, просмотр и присоединение к заявкам.
 """
 
-from aiogram import Router, F, Bot
+import heapq
+
+from aiogram import Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 import aiosqlite
 
-from config import GENDER_LABELS
+from config import GENDER_LABELS, SEARCH_TOP_K
 from keyboards.inline import elements_list_kb, element_detail_kb, main_menu_kb, event_menu_kb
 from database import queries as db_queries
+from notifications import join_request_digest
+from utils.render import bullet_list
+from utils.callbacks import CallbackRouter, CallbackPrefix
+from utils.messages import edit_text
 
-router = Router()
-
-
-# ==================== HELPERS ====================
+router = CallbackRouter()
 
-def format_member_info(member: dict) -> str:
-    """Форматировать информацию об участнике."""
-    gender_icon = "👨" if member.get("gender") == "male" else "👩" if member.get("gender") == "female" else "👤"
-    username = member.get("username", "Без имени")
-    rating = member.get("rating", 0)
-    return f"{gender_icon} {username} — рейтинг: {int(rating)}"
+# Веса компонентов оценки совместимости в поиске
+WEIGHT_RATING = 1.0
+WEIGHT_GENDER = 0.5
+WEIGHT_SPOTS = 0.3
+# Разница в рейтинге, при которой его вклад падает вдвое
+RATING_GAP_SCALE = 200.0
 
 
-def format_members_list(members: list) -> str:
-    """Форматировать список участников."""
-    if not members:
-        return "Пока никого нет"
-    return "\n".join([f"• {format_member_info(m)}" for m in members])
-
+# ==================== HELPERS ====================
 
-def format_element_preview(element: dict) -> str:
+def format_element_preview(element: dict, event_type: str) -> str:
     """
     Форматировать краткую информацию о заявке для списка.
     Для пар: пол, имя, рейтинг
     Для команд: количество участников, средний рейтинг
     """
-    members = element.get("members", [])
-    event_type = element.get("event_type", "pair")
-    
     if event_type == "pair":
-        # Для пар показываем информацию о единственном участнике
-        if members:
-            member = members[0]
-            gender_icon = "👨" if member.get("gender") == "male" else "👩" if member.get("gender") == "female" else "👤"
-            username = member.get("username", "Без имени")
-            rating = member.get("rating", 0)
-            return f"{gender_icon} {username}, ⭐{int(rating)}"
-        else:
-            return "Нет данных"
+        # Для пар показываем информацию о создателе (единственном участнике)
+        gender = element.get("creator_gender")
+        gender_icon = "👨" if gender == "male" else "👩" if gender == "female" else "👤"
+        username = element.get("creator_name") or "Без имени"
+        rating = element.get("creator_rating") or 0
+        return f"{gender_icon} {username}, ⭐{int(rating)}"
     else:
         # Для команд показываем количество участников и средний рейтинг
-        members_count = len(members)
+        members_count = element.get("members_count", 0)
         target_size = element.get("target_size", 0)
+        avg_rating = element.get("avg_rating")
         
-        if members:
-            ratings = [m["rating"] for m in members if m.get("rating") is not None]
-            avg_rating = sum(ratings) / len(ratings) if ratings else 0
+        if avg_rating is not None:
             return f"{members_count}/{target_size} чел., ⭐{int(avg_rating)}"
         else:
             return f"{members_count}/{target_size} чел."
 
 
+def compatibility_score(element: dict, searcher: dict, event_type: str) -> float:
+    """
+    Оценка совместимости заявки с пользователем (чем больше, тем лучше):
+    близость рейтинга, разный пол для пар, почти собранная команда.
+    """
+    avg_rating = element.get("avg_rating")
+    searcher_rating = searcher.get("rating")
+    if avg_rating is None or searcher_rating is None:
+        rating_score = 0.0
+    else:
+        rating_score = 1.0 / (1.0 + abs(searcher_rating - avg_rating) / RATING_GAP_SCALE)
+    
+    gender_score = 0.0
+    if event_type == "pair" and element.get("creator_gender") and searcher.get("gender"):
+        gender_score = 1.0 if element["creator_gender"] != searcher["gender"] else 0.0
+    
+    target_size = element.get("target_size") or 1
+    spots_score = 1.0 - (element.get("spots_left", 1) - 1) / target_size
+    
+    return (
+        WEIGHT_RATING * rating_score
+        + WEIGHT_GENDER * gender_score
+        + WEIGHT_SPOTS * spots_score
+    )
+
+
+async def find_ranked_elements(db: aiosqlite.Connection, event: dict, user_id: int) -> tuple:
+    """
+    Найти свободные заявки и отобрать top-K по совместимости.
+    Возвращает (лучшие заявки, общее количество найденных).
+    """
+    searcher = await db_queries.get_user(db, user_id) or {}
+    elements = await db_queries.list_open_elements(db, event["event_id"], exclude_user_id=user_id)
+    
+    # Ограниченная куча: O(n log K) вместо полной сортировки
+    best = heapq.nlargest(
+        SEARCH_TOP_K,
+        elements,
+        key=lambda elem: compatibility_score(elem, searcher, event["type"])
+    )
+    for elem in best:
+        elem["preview_info"] = format_element_preview(elem, event["type"])
+    
+    return best, len(elements)
+
+
 # ==================== КОМАНДЫ ====================
 
-@router.message(Command("search"))
+@router.message(Command("search"), flags={"throttling_key": "search"})
 async def cmd_search(message: Message, db: aiosqlite.Connection):
     """Поиск свободных заявок: /search 123."""
     user_id = message.from_user.id
@@ -107,19 +144,11 @@ async def cmd_search(message: Message, db: aiosqlite.Connection):
         await message.answer("❌ Этот турнир закрыт.")
         return
     
-    # Получаем открытые заявки
-    elements = await db_queries.list_open_elements(db, event_id)
-    
-    # Фильтруем заявки, где пользователь уже является участником
-    filtered_elements = []
-    for elem in elements:
-        is_member = await db_queries.check_user_in_element(db, elem["element_id"], user_id)
-        if not is_member:
-            # Добавляем информацию для отображения
-            elem["preview_info"] = format_element_preview(elem)
-            filtered_elements.append(elem)
+    # Получаем открытые заявки, лучшие по совместимости — первыми
+    filtered_elements, total = await find_ranked_elements(db, event, user_id)
     
     type_label = "👥 Пары" if event["type"] == "pair" else f"👨‍👩‍👧‍👦 Команды ({event['team_size']} чел.)"
+    shown_text = f" (показаны {len(filtered_elements)} самых подходящих)" if total > len(filtered_elements) else ""
     
     if not filtered_elements:
         await message.answer(
@@ -135,7 +164,7 @@ async def cmd_search(message: Message, db: aiosqlite.Connection):
     await message.answer(
         f"🔎 <b>Свободные места в турнире «{event['title']}»</b>\n\n"
         f"🎯 Тип: {type_label}\n"
-        f"📊 Найдено заявок: {len(filtered_elements)}",
+        f"📊 Найдено заявок: {total}{shown_text}",
         reply_markup=elements_list_kb(filtered_elements, event_id),
         parse_mode="HTML"
     )
@@ -143,10 +172,9 @@ async def cmd_search(message: Message, db: aiosqlite.Connection):
 
 # ==================== CALLBACKS ====================
 
-@router.callback_query(F.data.startswith("search_elements:"))
-async def cb_search_elements(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("search_elements", event_id=int), flags={"throttling_key": "search"})
+async def cb_search_elements(callback: CallbackQuery, db: aiosqlite.Connection, event_id: int):
     """Кнопка «Поиск свободных»."""
-    event_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Проверяем регистрацию
@@ -164,22 +192,17 @@ async def cb_search_elements(callback: CallbackQuery, db: aiosqlite.Connection):
         await callback.answer("❌ Этот турнир закрыт", show_alert=True)
         return
     
-    # Получаем открытые заявки
-    elements = await db_queries.list_open_elements(db, event_id)
-    
-    # Фильтруем заявки, где пользователь уже является участником
-    filtered_elements = []
-    for elem in elements:
-        is_member = await db_queries.check_user_in_element(db, elem["element_id"], user_id)
-        if not is_member:
-            # Добавляем информацию для отображения
-            elem["preview_info"] = format_element_preview(elem)
-            filtered_elements.append(elem)
+    # Получаем открытые заявки, лучшие по совместимости — первыми
+    filtered_elements, total = await find_ranked_elements(db, event, user_id)
     
     type_label = "👥 Пары" if event["type"] == "pair" else f"👨‍👩‍👧‍👦 Команды ({event['team_size']} чел.)"
+    shown_text = f" (показаны {len(filtered_elements)} самых подходящих)" if total > len(filtered_elements) else ""
     
+    # Отвечаем сразу: если список не изменился, правки не будет
+    await callback.answer()
     if not filtered_elements:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"🔎 <b>Поиск в турнире «{event['title']}»</b>\n\n"
             f"🎯 Тип: {type_label}\n\n"
             "📭 Свободных мест пока нет.\n"
@@ -188,21 +211,20 @@ async def cb_search_elements(callback: CallbackQuery, db: aiosqlite.Connection):
             parse_mode="HTML"
         )
     else:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             f"🔎 <b>Свободные места в турнире «{event['title']}»</b>\n\n"
             f"🎯 Тип: {type_label}\n"
-            f"📊 Найдено заявок: {len(filtered_elements)}\n\n"
+            f"📊 Найдено заявок: {total}{shown_text}\n\n"
             "Выберите заявку для просмотра:",
             reply_markup=elements_list_kb(filtered_elements, event_id),
             parse_mode="HTML"
         )
-    await callback.answer()
 
 
-@router.callback_query(F.data.startswith("view_element:"))
-async def cb_view_element(callback: CallbackQuery, db: aiosqlite.Connection):
+@router.callback_query(CallbackPrefix("view_element", element_id=int), flags={"throttling_key": "view"})
+async def cb_view_element(callback: CallbackQuery, db: aiosqlite.Connection, element_id: int):
     """Просмотр деталей заявки."""
-    element_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
     # Получаем заявку
@@ -248,7 +270,8 @@ async def cb_view_element(callback: CallbackQuery, db: aiosqlite.Connection):
             username = member.get("username", "Без имени")
             rating = int(member.get("rating", 0))
             
-            await callback.message.edit_text(
+            await edit_text(
+                callback.message,
                 f"👥 <b>Заявка на пару #{element_id}</b>\n\n"
                 f"📝 Описание: {description}\n\n"
                 f"👤 <b>Игрок:</b>\n"
@@ -260,7 +283,8 @@ async def cb_view_element(callback: CallbackQuery, db: aiosqlite.Connection):
                 parse_mode="HTML"
             )
         else:
-            await callback.message.edit_text(
+            await edit_text(
+                callback.message,
                 f"👥 <b>Заявка на пару #{element_id}</b>\n\n"
                 f"📝 Описание: {description}\n\n"
                 f"👤 Участников пока нет\n"
@@ -277,9 +301,10 @@ async def cb_view_element(callback: CallbackQuery, db: aiosqlite.Connection):
             avg_rating = int(sum(ratings) / len(ratings)) if ratings else 0
             
             # Список участников
-            members_text = format_members_list(members)
+            members_text = bullet_list(members, empty="Пока никого нет")
             
-            await callback.message.edit_text(
+            await edit_text(
+                callback.message,
                 f"👨‍👩‍👧‍👦 <b>Командная заявка #{element_id}</b>\n\n"
                 f"📝 Описание: {description}\n\n"
                 f"👥 <b>Участники ({members_count}/{target_size}):</b>\n"
@@ -291,7 +316,8 @@ async def cb_view_element(callback: CallbackQuery, db: aiosqlite.Connection):
                 parse_mode="HTML"
             )
         else:
-            await callback.message.edit_text(
+            await edit_text(
+                callback.message,
                 f"👨‍👩‍👧‍👦 <b>Командная заявка #{element_id}</b>\n\n"
                 f"📝 Описание: {description}\n\n"
                 f"👥 Участников: {members_count}/{target_size}\n"
@@ -304,15 +330,11 @@ async def cb_view_element(callback: CallbackQuery, db: aiosqlite.Connection):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("join_element:"))
-async def cb_join_element(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot):
+@router.callback_query(CallbackPrefix("join_element", element_id=int), flags={"background": True})
+async def cb_join_element(callback: CallbackQuery, db: aiosqlite.Connection, bot: Bot, element_id: int):
     """Кнопка «Присоединиться» к заявке."""
-    element_id = int(callback.data.split(":")[1])
     user_id = callback.from_user.id
     
-    # Обновляем telegram_username
-    await db_queries.update_telegram_username(db, user_id, callback.from_user.username)
-    
     # Проверяем регистрацию
     if not await db_queries.is_profile_complete(db, user_id):
         await callback.answer("❌ Сначала завершите регистрацию (/start)", show_alert=True)
@@ -336,27 +358,21 @@ async def cb_join_element(callback: CallbackQuery, db: aiosqlite.Connection, bot
         await callback.answer("❌ Турнир закрыт", show_alert=True)
         return
     
-    # Проверяем, что пользователь не в этой заявке
-    is_member = await db_queries.check_user_in_element(db, element_id, user_id)
-    if is_member:
-        await callback.answer("❌ Вы уже в этой заявке", show_alert=True)
-        return
-    
-    # Проверяем, что нет активного запроса
-    has_pending_request = await db_queries.check_existing_request(db, element_id, user_id)
-    if has_pending_request:
-        await callback.answer("❌ Вы уже отправили запрос к этой заявке", show_alert=True)
-        return
+    # Создаём запрос одним запросом: места, членство и повторы проверяет БД
+    join_id = await db_queries.create_join_request(db, element_id, user_id)
     
-    # Проверяем, есть ли свободные места
-    spots_left = await db_queries.get_element_spots_left(db, element_id)
-    if spots_left <= 0:
-        await callback.answer("❌ В этой заявке больше нет свободных мест", show_alert=True)
+    if join_id is None:
+        # Запрос не создан — выясняем причину для пользователя
+        if await db_queries.check_user_in_element(db, element_id, user_id):
+            await callback.answer("❌ Вы уже в этой заявке", show_alert=True)
+        elif await db_queries.check_existing_request(db, element_id, user_id):
+            await callback.answer("❌ Вы уже отправили запрос к этой заявке", show_alert=True)
+        elif await db_queries.get_element_spots_left(db, element_id) <= 0:
+            await callback.answer("❌ В этой заявке больше нет свободных мест", show_alert=True)
+        else:
+            await callback.answer("❌ Эта заявка уже неактивна", show_alert=True)
         return
     
-    # Создаём запрос на присоединение
-    join_id = await db_queries.create_join_request(db, element_id, user_id)
-    
     # Получаем данные для уведомления
     requester = await db_queries.get_user(db, user_id)
     creator_id = element["creator_id"]
@@ -368,33 +384,35 @@ async def cb_join_element(callback: CallbackQuery, db: aiosqlite.Connection, bot
         f"join_id={join_id}, element_id={element_id}, requester_id={user_id}"
     )
     
-    # Уведомляем владельца заявки
-    try:
-        gender_icon = "👨" if requester.get("gender") == "male" else "👩" if requester.get("gender") == "female" else "👤"
-        gender_label = GENDER_LABELS.get(requester.get("gender"), "Не указан")
-        rating = int(requester.get("rating", 0))
-        
-        from keyboards.inline import join_request_kb
-        await bot.send_message(
-            creator_id,
-            f"📨 <b>Новый запрос на присоединение!</b>\n\n"
-            f"К вашей заявке в турнире «{event['title']}»\n\n"
-            f"👤 <b>Игрок:</b>\n"
-            f"• {gender_icon} Имя: <b>{requester.get('username', 'Без имени')}</b>\n"
-            f"• 🚻 Пол: {gender_label}\n"
-            f"• 📊 Рейтинг: <b>{rating}</b>\n\n"
-            f"Принять этого участника?",
-            reply_markup=join_request_kb(join_id),
-            parse_mode="HTML"
-        )
-    except Exception as e:
-        # Если не удалось отправить уведомление, всё равно создаём запрос
-        pass
+    # Уведомляем владельца заявки: первый запрос сразу, следующие в окне — дайджестом
+    if join_request_digest.add(bot, creator_id, element_id, event_id, event["title"]):
+        try:
+            gender_icon = "👨" if requester.get("gender") == "male" else "👩" if requester.get("gender") == "female" else "👤"
+            gender_label = GENDER_LABELS.get(requester.get("gender"), "Не указан")
+            rating = int(requester.get("rating", 0))
+            
+            from keyboards.inline import join_request_kb
+            await bot.send_message(
+                creator_id,
+                f"📨 <b>Новый запрос на присоединение!</b>\n\n"
+                f"К вашей заявке в турнире «{event['title']}»\n\n"
+                f"👤 <b>Игрок:</b>\n"
+                f"• {gender_icon} Имя: <b>{requester.get('username', 'Без имени')}</b>\n"
+                f"• 🚻 Пол: {gender_label}\n"
+                f"• 📊 Рейтинг: <b>{rating}</b>\n\n"
+                f"Принять этого участника?",
+                reply_markup=join_request_kb(join_id),
+                parse_mode="HTML"
+            )
+        except Exception as e:
+            # Если не удалось отправить уведомление, всё равно создаём запрос
+            pass
     
-    await callback.answer("✅ Запрос отправлен!", show_alert=True)
+    await callback.answer("✅ Запрос отправлен!")
     
     # Обновляем сообщение
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"📨 <b>Запрос отправлен!</b>\n\n"
         f"Заявка: #{element_id}\n"
         f"Турнир: {event['title']}\n\n"
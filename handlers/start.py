@@ -2,9 +2,8 @@
 Обработчики: /start, /help, главное меню, регистрация.
 """
 
-from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
-from aiogram.filters import CommandStart, Command
+from aiogram.filters import CommandStart, Command, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import aiosqlite
@@ -12,8 +11,10 @@ import aiosqlite
 from config import GENDER_LABELS
 from keyboards.inline import main_menu_kb, gender_kb, cancel_kb
 from database import queries as db_queries
+from utils.callbacks import CallbackRouter, CallbackPrefix
+from utils.messages import edit_text
 
-router = Router()
+router = CallbackRouter()
 
 
 # ==================== FSM для регистрации ====================
@@ -35,6 +36,9 @@ async def cmd_start(message: Message, db: aiosqlite.Connection, state: FSMContex
     # Очищаем возможное предыдущее состояние
     await state.clear()
     
+    # Пользователь снова запустил бота — он больше не считается заблокировавшим
+    await db_queries.unmark_blocked_recipient(db, user_id)
+    
     # Проверяем, есть ли пользователь в БД
     user = await db_queries.get_user(db, user_id)
     
@@ -52,11 +56,8 @@ async def cmd_start(message: Message, db: aiosqlite.Connection, state: FSMContex
             parse_mode="HTML"
         )
     else:
-        # Существующий пользователь — обновляем telegram_username (мог измениться)
-        if user.get("telegram_username") != telegram_username:
-            await db_queries.update_telegram_username(db, user_id, telegram_username)
-        
-        # Проверяем, заполнен ли профиль
+        # Существующий пользователь — проверяем, заполнен ли профиль
+        # (telegram_username обновляет UsernameMiddleware)
         profile_complete = await db_queries.is_profile_complete(db, user_id)
         
         if not profile_complete:
@@ -289,17 +290,17 @@ async def fsm_registration_username(message: Message, state: FSMContext, db: aio
     )
 
 
-@router.callback_query(RegistrationFSM.waiting_gender, F.data.startswith("set_gender:"))
-async def fsm_registration_gender(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
+@router.callback_query(RegistrationFSM.waiting_gender, CallbackPrefix("set_gender", gender=str))
+async def fsm_registration_gender(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection, gender: str):
     """Пользователь выбрал пол при регистрации."""
-    gender = callback.data.split(":")[1]
     user_id = callback.from_user.id
     
     # Сохраняем пол в БД
     await db_queries.update_gender(db, user_id, gender)
     
     await state.set_state(RegistrationFSM.waiting_rating)
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         f"✅ Пол: <b>{GENDER_LABELS[gender]}</b>\n\n"
         "📊 <b>Шаг 3/3:</b> Введите ваш текущий рейтинг (число):",
         parse_mode="HTML"
@@ -354,7 +355,7 @@ async def fsm_registration_rating(message: Message, state: FSMContext, db: aiosq
 
 # ==================== CALLBACKS ====================
 
-@router.callback_query(F.data == "help")
+@router.callback_query(CallbackPrefix("help"))
 async def cb_help(callback: CallbackQuery):
     """Кнопка помощи (краткая справка)."""
     help_text = """
@@ -379,7 +380,8 @@ async def cb_help(callback: CallbackQuery):
 
 <b>Полная инструкция:</b> /help
 """
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         help_text,
         reply_markup=main_menu_kb(),
         parse_mode="HTML"
@@ -387,30 +389,27 @@ async def cb_help(callback: CallbackQuery):
     await callback.answer()
 
 
-@router.callback_query(F.data == "back_main")
+@router.callback_query(CallbackPrefix("back_main"))
 async def cb_back_main(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Возврат в главное меню."""
     await state.clear()
     
     user = await db_queries.get_user(db, callback.from_user.id)
     
-    # Обновляем telegram_username при каждом взаимодействии
-    telegram_username = callback.from_user.username
-    if user and user.get("telegram_username") != telegram_username:
-        await db_queries.update_telegram_username(db, callback.from_user.id, telegram_username)
-    
     username = user.get("username", "Пользователь") if user else "Пользователь"
     
-    await callback.message.edit_text(
+    # Отвечаем сразу: если экран не изменился, правки не будет
+    await callback.answer()
+    await edit_text(
+        callback.message,
         f"🏠 <b>Главное меню</b>\n\n"
         f"Привет, <b>{username}</b>! Выберите действие:",
         reply_markup=main_menu_kb(),
         parse_mode="HTML"
     )
-    await callback.answer()
 
 
-@router.callback_query(F.data == "cancel")
+@router.callback_query(CallbackPrefix("cancel"))
 async def cb_cancel(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Connection):
     """Отмена текущего действия."""
     await state.clear()
@@ -420,14 +419,16 @@ async def cb_cancel(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Co
     profile_complete = await db_queries.is_profile_complete(db, user_id)
     
     if profile_complete:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "❌ Действие отменено.\n\n"
             "🏠 <b>Главное меню</b>",
             reply_markup=main_menu_kb(),
             parse_mode="HTML"
         )
     else:
-        await callback.message.edit_text(
+        await edit_text(
+            callback.message,
             "❌ Действие отменено.\n\n"
             "⚠️ Ваш профиль не заполнен до конца.\n"
             "Используйте /start чтобы продолжить регистрацию.",
@@ -436,14 +437,14 @@ async def cb_cancel(callback: CallbackQuery, state: FSMContext, db: aiosqlite.Co
     await callback.answer()
 
 
-@router.callback_query(F.data == "noop")
+@router.callback_query(CallbackPrefix("noop"))
 async def cb_noop(callback: CallbackQuery):
     """Пустой callback (ничего не делает)."""
     await callback.answer()
 
 # Добавить в конец файла обработчик универсальной кнопки skip (если её нажали вне FSM)
 
-@router.callback_query(F.data == "skip")
+@router.callback_query(StateFilter(None), CallbackPrefix("skip"))
 async def cb_skip_fallback(callback: CallbackQuery):
     """Обработка кнопки пропустить вне FSM."""
     await callback.answer("❌ Нечего пропускать", show_alert=True)
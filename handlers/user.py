@@ -2,7 +2,7 @@
 Обработчики: /delete_me — удаление пользовательских данных.
 """
 
-from aiogram import Router, F, Bot
+from aiogram import Bot
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
@@ -10,8 +10,10 @@ import aiosqlite
 
 from keyboards.inline import confirm_kb, main_menu_kb
 from database import queries as db_queries
+from utils.callbacks import CallbackRouter, CallbackPrefix
+from utils.messages import edit_text
 
-router = Router()
+router = CallbackRouter()
 
 
 @router.message(Command("delete_me"))
@@ -28,31 +30,27 @@ async def cmd_delete_me(message: Message, db: aiosqlite.Connection):
         )
         return
     
-    # Получаем статистику для отображения
-    user_groups = await db_queries.get_user_groups(db, user_id)
-    user_elements = await db_queries.get_all_user_active_elements(db, user_id)
-    pending_requests = await db_queries.get_pending_requests_for_user(db, user_id)
-    incoming_requests = await db_queries.get_incoming_requests_for_user(db, user_id)
+    # Получаем статистику для отображения (одним запросом)
+    footprint = await db_queries.get_user_footprint(db, user_id)
     
     await message.answer(
         "⚠️ <b>Вы уверены, что хотите удалить аккаунт?</b>\n\n"
         "Будут удалены:\n"
         f"• Ваш профиль ({user.get('username', 'Без имени')})\n"
-        f"• Активные элементы: {len(user_elements)}\n"
-        f"• Участие в группах: {len(user_groups)}\n"
-        f"• Отправленные запросы: {len(pending_requests)}\n"
-        f"• Входящие запросы: {len(incoming_requests)}\n\n"
+        f"• Созданные турниры: {footprint['events_owned']}\n"
+        f"• Активные элементы: {footprint['active_elements']}\n"
+        f"• Участие в группах: {footprint['groups']}\n"
+        f"• Отправленные запросы: {footprint['pending_requests']}\n"
+        f"• Входящие запросы: {footprint['incoming_requests']}\n\n"
         "Это действие <b>необратимо</b>!",
         reply_markup=confirm_kb("delete_user", user_id),
         parse_mode="HTML"
     )
 
 
-@router.callback_query(F.data.startswith("confirm:delete_user:"))
-async def cb_confirm_delete(callback: CallbackQuery, db: aiosqlite.Connection, state: FSMContext):
+@router.callback_query(CallbackPrefix("confirm:delete_user", user_id=int))
+async def cb_confirm_delete(callback: CallbackQuery, db: aiosqlite.Connection, state: FSMContext, user_id: int):
     """Подтверждение удаления."""
-    user_id = int(callback.data.split(":")[2])
-    
     # Проверяем, что удаляет сам себя
     if callback.from_user.id != user_id:
         await callback.answer("❌ Вы не можете удалить чужой аккаунт!", show_alert=True)
@@ -61,13 +59,14 @@ async def cb_confirm_delete(callback: CallbackQuery, db: aiosqlite.Connection, s
     # Очищаем FSM state
     await state.clear()
     
-    # Удаляем пользователя из БД (каскадно удалятся все связанные данные)
+    # Помечаем пользователя удалённым (связанные данные удалит фоновая очистка)
     await db_queries.delete_user(db, user_id)
     
     # Логируем действие
     await db_queries.create_log(db, "user_deleted", f"user_id={user_id}")
     
-    await callback.message.edit_text(
+    await edit_text(
+        callback.message,
         "✅ <b>Ваши данные успешно удалены.</b>\n\n"
         "Спасибо, что пользовались ботом!\n"
         "Чтобы начать заново, введите /start",
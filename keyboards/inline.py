@@ -1,15 +1,33 @@
 """
 Inline‑клавиатуры для бота.
+
+Клавиатуры собираются один раз и переиспользуются: статические — без
+ограничения кэша, параметризованные — через LRU по аргументам.
+
+Важно: кэшированные функции возвращают один и тот же объект на все вызовы,
+а модели aiogram не заморожены. Возвращённую клавиатуру нельзя изменять
+(добавлять ряды, менять кнопки) — это изменит её для всех последующих
+сообщений. Нужна другая клавиатура — соберите новую.
 """
 
+import calendar
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 from config import GENDER_MALE, GENDER_FEMALE, GENDER_LABELS
+from utils.dates import format_date_short
+
+# Размер LRU для клавиатур с параметрами (ID турниров, заявок и т. п.)
+KEYBOARD_CACHE_SIZE = 1024
 
 
 # ==================== ГЛАВНОЕ МЕНЮ ====================
 
+@lru_cache(maxsize=None)
 def main_menu_kb() -> InlineKeyboardMarkup:
     """Главное меню после /start."""
     builder = InlineKeyboardBuilder()
@@ -32,6 +50,7 @@ def main_menu_kb() -> InlineKeyboardMarkup:
 
 # ==================== ВЫБОР ПОЛА ====================
 
+@lru_cache(maxsize=None)
 def gender_kb() -> InlineKeyboardMarkup:
     """Выбор пола."""
     builder = InlineKeyboardBuilder()
@@ -42,6 +61,7 @@ def gender_kb() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def gender_with_cancel_kb() -> InlineKeyboardMarkup:
     """Выбор пола с кнопкой отмены."""
     builder = InlineKeyboardBuilder()
@@ -55,6 +75,7 @@ def gender_with_cancel_kb() -> InlineKeyboardMarkup:
 
 # ==================== ПРОФИЛЬ ====================
 
+@lru_cache(maxsize=None)
 def profile_menu_kb() -> InlineKeyboardMarkup:
     """Меню профиля."""
     builder = InlineKeyboardBuilder()
@@ -71,6 +92,7 @@ def profile_menu_kb() -> InlineKeyboardMarkup:
 
 # ==================== ВЫБОР ТИПА СОБЫТИЯ ====================
 
+@lru_cache(maxsize=None)
 def event_type_kb() -> InlineKeyboardMarkup:
     """Выбор типа события: пара или команда."""
     builder = InlineKeyboardBuilder()
@@ -84,6 +106,7 @@ def event_type_kb() -> InlineKeyboardMarkup:
 
 # ==================== ВЫБОР РАЗМЕРА КОМАНДЫ ====================
 
+@lru_cache(maxsize=None)
 def team_size_kb() -> InlineKeyboardMarkup:
     """Выбор размера команды."""
     builder = InlineKeyboardBuilder()
@@ -96,11 +119,26 @@ def team_size_kb() -> InlineKeyboardMarkup:
 
 # ==================== ВЫБОР ДАТЫ ====================
 
+# День, для которого построены закэшированные календари
+_calendar_day = None
+
+
 def date_picker_kb(year: int, month: int) -> InlineKeyboardMarkup:
     """Простой выбор даты (календарь на месяц)."""
-    import calendar
-    from datetime import date
+    global _calendar_day
+    
+    # С переходом на новый день прошедшие даты меняются — сбрасываем кэш
+    today = date.today()
+    if today != _calendar_day:
+        _build_date_picker.cache_clear()
+        _calendar_day = today
     
+    return _build_date_picker(year, month, today)
+
+
+@lru_cache(maxsize=64)
+def _build_date_picker(year: int, month: int, today: date) -> InlineKeyboardMarkup:
+    """Собрать календарь на месяц относительно дня today."""
     builder = InlineKeyboardBuilder()
     
     # Заголовок с месяцем и годом
@@ -129,7 +167,6 @@ def date_picker_kb(year: int, month: int) -> InlineKeyboardMarkup:
     
     # Дни месяца
     cal = calendar.Calendar(firstweekday=0)  # Понедельник первый
-    today = date.today()
     
     for week in cal.monthdayscalendar(year, month):
         row_buttons = []
@@ -157,6 +194,7 @@ def date_picker_kb(year: int, month: int) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def date_confirm_kb(date_str: str) -> InlineKeyboardMarkup:
     """Подтверждение выбранной даты."""
     builder = InlineKeyboardBuilder()
@@ -175,8 +213,6 @@ def events_list_kb(events: list, action: str = "view") -> InlineKeyboardMarkup:
     Список турниров с кнопками.
     action: 'view' — просмотр, 'join' — присоединение, 'manage' — управление.
     """
-    from datetime import datetime
-    
     builder = InlineKeyboardBuilder()
     for event in events:
         event_id = event.get("event_id") or event.get("id")
@@ -189,21 +225,9 @@ def events_list_kb(events: list, action: str = "view") -> InlineKeyboardMarkup:
         status_icon = "" if status == "open" else "🔒 "
         
         # Форматируем дату проведения
-        event_date = event.get("event_date")
-        if event_date:
-            try:
-                dt = datetime.strptime(event_date, "%Y-%m-%d")
-                # Короткий формат даты: ДД.ММ
-                date_text = f" • {dt.day:02d}.{dt.month:02d}"
-                
-                # Добавляем бейдж с количеством дней до события
-                date_badge = event.get("date_badge", "")
-                if date_badge:
-                    date_text = f" • {date_badge}"
-            except:
-                date_text = ""
-        else:
-            date_text = ""
+        # Бейдж с количеством дней до события, иначе короткая дата ДД.ММ
+        date_label = event.get("date_badge") or format_date_short(event.get("event_date"))
+        date_text = f" • {date_label}" if date_label else ""
         
         button_text = f"{status_icon}{type_icon} {title}{date_text}"
         
@@ -226,7 +250,8 @@ def events_list_kb(events: list, action: str = "view") -> InlineKeyboardMarkup:
 
 # ==================== МЕНЮ ТУРНИРА ====================
 
-def event_menu_kb(event_id: int, is_owner: bool = False) -> InlineKeyboardMarkup:
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
+def event_menu_kb(event_id: int, is_owner: bool = False, is_team: bool = False) -> InlineKeyboardMarkup:
     """Меню конкретного турнира."""
     builder = InlineKeyboardBuilder()
     builder.row(
@@ -242,12 +267,17 @@ def event_menu_kb(event_id: int, is_owner: bool = False) -> InlineKeyboardMarkup
             InlineKeyboardButton(text="🔒 Закрыть турнир", callback_data=f"close_event:{event_id}"),
             InlineKeyboardButton(text="✏️ Редактировать", callback_data=f"edit_event:{event_id}")
         )
+        if is_team:
+            builder.row(
+                InlineKeyboardButton(text="⚖️ Собрать команды", callback_data=f"balance_teams:{event_id}")
+            )
     builder.row(InlineKeyboardButton(text="🔙 Назад", callback_data="back_main"))
     return builder.as_markup()
 
 
 # ==================== РЕДАКТИРОВАНИЕ ТУРНИРА ====================
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def edit_event_kb(event_id: int) -> InlineKeyboardMarkup:
     """Меню редактирования турнира."""
     builder = InlineKeyboardBuilder()
@@ -295,6 +325,7 @@ def elements_list_kb(elements: list, event_id: int) -> InlineKeyboardMarkup:
 
 # ==================== ДЕТАЛИ ЭЛЕМЕНТА ====================
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def element_detail_kb(element_id: int, event_id: int, can_join: bool = True) -> InlineKeyboardMarkup:
     """Детали заявки с кнопкой присоединения."""
     builder = InlineKeyboardBuilder()
@@ -308,6 +339,7 @@ def element_detail_kb(element_id: int, event_id: int, can_join: bool = True) ->
 
 # ==================== ДЕТАЛИ ГРУППЫ ====================
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def group_detail_kb(group_id: int, event_id: int) -> InlineKeyboardMarkup:
     """Детали сформированной группы."""
     builder = InlineKeyboardBuilder()
@@ -322,6 +354,7 @@ def group_detail_kb(group_id: int, event_id: int) -> InlineKeyboardMarkup:
 
 # ==================== УПРАВЛЕНИЕ ЗАПРОСОМ ====================
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def join_request_kb(join_id: int) -> InlineKeyboardMarkup:
     """Кнопки принять/отклонить запрос на присоединение."""
     builder = InlineKeyboardBuilder()
@@ -362,6 +395,7 @@ def my_elements_kb(elements: list, event_id: int) -> InlineKeyboardMarkup:
 
 # ==================== ПРОПУСК ====================
 
+@lru_cache(maxsize=None)
 def skip_kb() -> InlineKeyboardMarkup:
     """Кнопка пропустить и отмена."""
     builder = InlineKeyboardBuilder()
@@ -439,6 +473,7 @@ def my_applications_kb(elements: list, groups: list) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def application_detail_kb(element_id: int, event_id: int, is_creator: bool = True) -> InlineKeyboardMarkup:
     """Детали заявки с действиями."""
     builder = InlineKeyboardBuilder()
@@ -468,6 +503,7 @@ def application_detail_kb(element_id: int, event_id: int, is_creator: bool = Tru
 
 # ==================== УПРАВЛЕНИЕ ЭЛЕМЕНТОМ ====================
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def manage_element_kb(element_id: int, event_id: int) -> InlineKeyboardMarkup:
     """Меню управления собственными заявками."""
     builder = InlineKeyboardBuilder()
@@ -484,8 +520,12 @@ def manage_element_kb(element_id: int, event_id: int) -> InlineKeyboardMarkup:
 
 # ==================== СПИСОК ЗАПРОСОВ ====================
 
-def requests_list_kb(requests: list, element_id: int, event_id: int) -> InlineKeyboardMarkup:
-    """Список входящих запросов к заявке."""
+def requests_list_kb(requests: list, element_id: Optional[int], event_id: Optional[int]) -> InlineKeyboardMarkup:
+    """
+    Список входящих запросов к заявке.
+    element_id=None — запросы к нескольким заявкам: у каждой кнопки
+    номер заявки, возврат — в главное меню.
+    """
     builder = InlineKeyboardBuilder()
     for req in requests:
         join_id = req.get("join_id")
@@ -493,9 +533,10 @@ def requests_list_kb(requests: list, element_id: int, event_id: int) -> InlineKe
         rating = req.get("rating", "?")
         gender = req.get("gender", "")
         gender_icon = "👨" if gender == "male" else "👩" if gender == "female" else "👤"
+        prefix = f"#{req.get('element_id')} · " if element_id is None else ""
         builder.row(
             InlineKeyboardButton(
-                text=f"{gender_icon} {username} (рейтинг: {rating})",
+                text=f"{prefix}{gender_icon} {username} (рейтинг: {rating})",
                 callback_data=f"view_request:{join_id}"
             )
         )
@@ -503,12 +544,16 @@ def requests_list_kb(requests: list, element_id: int, event_id: int) -> InlineKe
         builder.row(
             InlineKeyboardButton(text="📭 Нет входящих запросов", callback_data="noop")
         )
-    builder.row(InlineKeyboardButton(text="🔙 К заявке", callback_data=f"manage_element:{element_id}"))
+    if element_id is None:
+        builder.row(InlineKeyboardButton(text="🔙 В меню", callback_data="back_main"))
+    else:
+        builder.row(InlineKeyboardButton(text="🔙 К заявке", callback_data=f"manage_element:{element_id}"))
     return builder.as_markup()
 
 
 # ==================== ДЕТАЛИ ЗАПРОСА ====================
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def request_detail_kb(join_id: int, element_id: int) -> InlineKeyboardMarkup:
     """Детали запроса с кнопками принять/отклонить."""
     builder = InlineKeyboardBuilder()
@@ -522,6 +567,7 @@ def request_detail_kb(join_id: int, element_id: int) -> InlineKeyboardMarkup:
 
 # ==================== АДМИН-ПАНЕЛЬ ====================
 
+@lru_cache(maxsize=None)
 def admin_menu_kb() -> InlineKeyboardMarkup:
     """Меню администратора."""
     builder = InlineKeyboardBuilder()
@@ -539,6 +585,7 @@ def admin_menu_kb() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def blacklist_kb() -> InlineKeyboardMarkup:
     """Меню чёрного списка."""
     builder = InlineKeyboardBuilder()
@@ -554,6 +601,7 @@ def blacklist_kb() -> InlineKeyboardMarkup:
 
 # ==================== АДМИН: УПРАВЛЕНИЕ ТУРНИРАМИ ====================
 
+@lru_cache(maxsize=None)
 def admin_events_menu_kb() -> InlineKeyboardMarkup:
     """Меню управления турнирами."""
     builder = InlineKeyboardBuilder()
@@ -600,6 +648,7 @@ def admin_events_list_kb(events: list) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def admin_event_detail_kb(event_id: int) -> InlineKeyboardMarkup:
     """Детали турнира для администратора."""
     builder = InlineKeyboardBuilder()
@@ -620,6 +669,7 @@ def admin_event_detail_kb(event_id: int) -> InlineKeyboardMarkup:
 
 # ==================== ПОДТВЕРЖДЕНИЕ ====================
 
+@lru_cache(maxsize=KEYBOARD_CACHE_SIZE)
 def confirm_kb(action: str, target_id: int) -> InlineKeyboardMarkup:
     """Универсальная клавиатура подтверждения."""
     builder = InlineKeyboardBuilder()
@@ -632,6 +682,7 @@ def confirm_kb(action: str, target_id: int) -> InlineKeyboardMarkup:
 
 # ==================== ОТМЕНА ====================
 
+@lru_cache(maxsize=None)
 def cancel_kb() -> InlineKeyboardMarkup:
     """Кнопка отмены."""
     builder = InlineKeyboardBuilder()
@@ -641,6 +692,7 @@ def cancel_kb() -> InlineKeyboardMarkup:
 
 # ==================== ПУСТАЯ ЗАГЛУШКА ====================
 
+@lru_cache(maxsize=None)
 def noop_kb() -> InlineKeyboardMarkup:
     """Пустая клавиатура (для callback noop)."""
     return InlineKeyboardMarkup(inline_keyboard=[])
@@ -648,6 +700,7 @@ def noop_kb() -> InlineKeyboardMarkup:
 
 # ==================== ВЫБОР ТИПА ДОБАВЛЕНИЯ ====================
 
+@lru_cache(maxsize=None)
 def add_type_kb() -> InlineKeyboardMarkup:
     """Выбор типа добавления: один или команда."""
     builder = InlineKeyboardBuilder()
@@ -1,2 +1,6 @@
 from .db import DatabaseMiddleware
 from .blacklist import BlacklistMiddleware
+from .dedup import DedupMiddleware
+from .throttling import ThrottlingMiddleware
+from .username import UsernameMiddleware
+from .background import BackgroundMiddleware
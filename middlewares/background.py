@@ -0,0 +1,124 @@
+"""
+Middleware для тяжёлых callback-хэндлеров: мгновенный ответ на нажатие
+и выполнение хэндлера в фоне.
+"""
+
+import asyncio
+import logging
+from typing import Callable, Dict, Any, Awaitable, Optional, Set
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject, CallbackQuery
+
+from config import BACKGROUND_TASKS_MAX, BACKGROUND_SHUTDOWN_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class AnsweredCallbackQuery(CallbackQuery):
+    """
+    CallbackQuery, на который бот уже ответил. Повторный answer() Telegram
+    не примет, поэтому:
+    - alert (show_alert=True) — ошибка, которую пользователь должен увидеть, —
+      отправляется сообщением в чат;
+    - обычное всплывающее уведомление отбрасывается: результат виден
+      по отредактированному сообщению.
+    """
+
+    async def answer(
+        self,
+        text: Optional[str] = None,
+        show_alert: Optional[bool] = None,
+        **kwargs: Any
+    ) -> bool:
+        if text and show_alert and self.message:
+            await self.message.answer(text)
+        return True
+
+
+def _answered(callback: CallbackQuery) -> AnsweredCallbackQuery:
+    """Копия callback с заменённым answer(), привязанная к тому же боту."""
+    fields = {name: getattr(callback, name) for name in CallbackQuery.model_fields}
+    answered = AnsweredCallbackQuery.model_construct(
+        _fields_set=callback.model_fields_set, **fields
+    )
+    return answered.as_(callback.bot)
+
+
+class BackgroundMiddleware(BaseMiddleware):
+    """
+    Middleware для хэндлеров с флагом background:
+    - сразу гасит «часики» на кнопке;
+    - запускает остальную цепочку (БД, чёрный список, хэндлер) фоновой задачей,
+      поэтому должно стоять раньше DatabaseMiddleware — соединение берётся
+      уже внутри задачи;
+    - задача держит блокировку пользователя из DedupMiddleware до конца работы,
+      поэтому следующие апдейты того же пользователя ждут её завершения;
+    - ограничивает число одновременно работающих фоновых задач.
+    Ошибки фоновых задач только логируются. При остановке бота shutdown()
+    даёт задачам доработать и отменяет только не успевшие.
+    """
+
+    def __init__(
+        self,
+        max_tasks: int = BACKGROUND_TASKS_MAX,
+        shutdown_timeout: float = BACKGROUND_SHUTDOWN_TIMEOUT
+    ):
+        self.shutdown_timeout = shutdown_timeout
+        self._global = asyncio.Semaphore(max_tasks)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def _run(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: Dict[str, Any],
+        release_user_lock: Optional[Callable[[], None]]
+    ) -> None:
+        try:
+            async with self._global:
+                await handler(event, data)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"❌ Ошибка в фоновом хэндлере (callback {event.data!r})")
+        finally:
+            if release_user_lock:
+                release_user_lock()
+
+    async def shutdown(self) -> None:
+        """
+        Дождаться фоновых задач (не дольше shutdown_timeout секунд),
+        оставшиеся отменить.
+        """
+        tasks = list(self._tasks)
+        if not tasks:
+            return
+        
+        _, pending = await asyncio.wait(tasks, timeout=self.shutdown_timeout)
+        if pending:
+            logger.warning(f"⚠️ Остановка: прерываем фоновых хэндлеров — {len(pending)}")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not isinstance(event, CallbackQuery) or not get_flag(data, "background"):
+            return await handler(event, data)
+        
+        await event.answer()
+        
+        # Блокировку пользователя освободит фоновая задача, а не DedupMiddleware
+        detach_user_lock = data.get("detach_user_lock")
+        release_user_lock = detach_user_lock() if detach_user_lock else None
+        
+        task = asyncio.create_task(self._run(handler, _answered(event), data, release_user_lock))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return None
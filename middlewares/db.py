@@ -5,7 +5,7 @@ Middleware для инъекции соединения с базой данны
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
-from database.connection import get_db
+from database.connection import acquire_db, release_db
 
 
 class DatabaseMiddleware(BaseMiddleware):
@@ -17,14 +17,14 @@ class DatabaseMiddleware(BaseMiddleware):
         event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
-        # Открываем соединение
-        db = await get_db()
+        # Берём соединение из пула
+        db = await acquire_db()
         data["db"] = db
         
         try:
             result = await handler(event, data)
         finally:
-            # Закрываем соединение после обработки
-            await db.close()
+            # Возвращаем соединение в пул после обработки
+            await release_db(db)
         
         return result
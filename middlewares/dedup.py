@@ -0,0 +1,127 @@
+"""
+Middleware для защиты от двойных нажатий и гонок одного пользователя.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Awaitable, List, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Message, CallbackQuery
+
+from config import CALLBACK_DEDUP_WINDOW, USER_LOCKS_MAX
+
+
+class DedupMiddleware(BaseMiddleware):
+    """
+    Middleware, которое:
+    - отбрасывает повтор того же callback (пользователь + сообщение + data)
+      в течение окна — та же кнопка на другом сообщении повтором не считается;
+    - выполняет апдейты одного пользователя строго по очереди.
+      Фоновый хэндлер забирает блокировку через data["detach_user_lock"]
+      и держит её, пока не закончит работу.
+    Таблицы повторов и блокировок ограничены по размеру.
+    """
+
+    def __init__(
+        self,
+        window: float = CALLBACK_DEDUP_WINDOW,
+        max_users: int = USER_LOCKS_MAX
+    ):
+        self.window = window
+        self.max_users = max_users
+        # (user_id, message_id, callback_data) -> время нажатия, старые — в начале
+        self._recent: "OrderedDict[Tuple[int, Optional[int], str], float]" = OrderedDict()
+        # user_id -> [блокировка, сколько апдейтов её держат или ждут]
+        self._locks: "OrderedDict[int, List[Any]]" = OrderedDict()
+
+    def _is_duplicate(self, user_id: int, message_id: Optional[int], data: str) -> bool:
+        """Проверить и запомнить нажатие кнопки."""
+        now = time.monotonic()
+        
+        # Удаляем устаревшие записи (они упорядочены по времени)
+        while self._recent:
+            pressed_at = next(iter(self._recent.values()))
+            if now - pressed_at < self.window and len(self._recent) < self.max_users:
+                break
+            self._recent.popitem(last=False)
+        
+        key = (user_id, message_id, data)
+        if key in self._recent:
+            return True
+        self._recent[key] = now
+        return False
+
+    def _acquire_entry(self, user_id: int) -> List[Any]:
+        """Получить блокировку пользователя и отметить, что апдейт её ждёт."""
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = [asyncio.Lock(), 0]
+        else:
+            self._locks.move_to_end(user_id)
+        entry[1] += 1
+        
+        # При переполнении вытесняем самые старые блокировки, которые никто не держит и не ждёт
+        excess = len(self._locks) - self.max_users
+        if excess > 0:
+            stale = []
+            for uid, (_, users) in self._locks.items():
+                if users == 0:
+                    stale.append(uid)
+                    if len(stale) >= excess:
+                        break
+            for uid in stale:
+                del self._locks[uid]
+        
+        return entry
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user_id = None
+        
+        if isinstance(event, (Message, CallbackQuery)) and event.from_user:
+            user_id = event.from_user.id
+        
+        if user_id is None:
+            return await handler(event, data)
+        
+        # Повторное нажатие той же кнопки — просто гасим «часики»
+        if isinstance(event, CallbackQuery) and event.data:
+            message_id = event.message.message_id if event.message else None
+            if self._is_duplicate(user_id, message_id, event.data):
+                await event.answer()
+                return None
+        
+        entry = self._acquire_entry(user_id)
+        try:
+            await entry[0].acquire()
+        except BaseException:
+            entry[1] -= 1
+            raise
+        
+        detached = False
+        
+        def release() -> None:
+            entry[0].release()
+            entry[1] -= 1
+        
+        def detach_user_lock() -> Callable[[], None]:
+            """
+            Оставить блокировку занятой после возврата из хэндлера
+            (работа продолжается в фоне). Возвращает функцию освобождения.
+            """
+            nonlocal detached
+            detached = True
+            return release
+        
+        data["detach_user_lock"] = detach_user_lock
+        try:
+            return await handler(event, data)
+        finally:
+            if not detached:
+                release()
@@ -0,0 +1,64 @@
+"""
+Middleware для ограничения частоты запросов (token bucket).
+"""
+
+from typing import Callable, Dict, Any, Awaitable, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject, Message, CallbackQuery
+
+from config import (
+    THROTTLING_RATES, THROTTLING_GLOBAL_RATE, THROTTLING_GLOBAL_BURST,
+    is_owner
+)
+from utils.ratelimit import RateLimiter, TokenBucket
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Middleware, которое ограничивает частоту запросов пользователя
+    (отдельно для каждого throttling_key) и общий поток запросов.
+    Должно стоять раньше DatabaseMiddleware: отклонённый запрос
+    не открывает соединение с БД.
+    """
+
+    def __init__(
+        self,
+        rates: Optional[Dict[str, Tuple[float, int]]] = None,
+        global_rate: float = THROTTLING_GLOBAL_RATE,
+        global_burst: int = THROTTLING_GLOBAL_BURST
+    ):
+        rates = rates or THROTTLING_RATES
+        self.limiters = {
+            key: RateLimiter(rate, burst)
+            for key, (rate, burst) in rates.items()
+        }
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user_id = None
+        
+        if isinstance(event, (Message, CallbackQuery)) and event.from_user:
+            user_id = event.from_user.id
+        
+        # Владельцев бота не ограничиваем
+        if user_id is None or is_owner(user_id):
+            return await handler(event, data)
+        
+        key = get_flag(data, "throttling_key", default="default")
+        limiter = self.limiters.get(key) or self.limiters["default"]
+        
+        if limiter.allow(user_id) and self.global_bucket.consume():
+            return await handler(event, data)
+        
+        # Отклоняем без обращения к БД: callback гасим коротким ответом,
+        # сообщение просто пропускаем, чтобы не отвечать на флуд флудом
+        if isinstance(event, CallbackQuery):
+            await event.answer("⏳ Слишком часто. Подождите немного.")
+        return None
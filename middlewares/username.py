@@ -0,0 +1,95 @@
+"""
+Middleware для поддержания актуального telegram_username пользователей.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Awaitable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Message, CallbackQuery
+
+from config import USERNAME_FLUSH_INTERVAL, USERNAME_CACHE_SIZE
+from database.connection import acquire_db, release_db
+from database import queries as db_queries
+
+logger = logging.getLogger(__name__)
+
+# Пользователь ещё не встречался (username может быть и None)
+_UNKNOWN = object()
+
+
+class UsernameMiddleware(BaseMiddleware):
+    """
+    Middleware, которое сравнивает username из апдейта с последним
+    увиденным и ставит запись в очередь только при изменении.
+    Очередь пишется пачкой (одна транзакция на всех) в run().
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = USERNAME_FLUSH_INTERVAL,
+        max_users: int = USERNAME_CACHE_SIZE
+    ):
+        self.flush_interval = flush_interval
+        self.max_users = max_users
+        # user_id -> последний увиденный username, старые — в начале
+        self._known: "OrderedDict[int, Optional[str]]" = OrderedDict()
+        # user_id -> username, ожидающий записи в БД
+        self._pending: Dict[int, Optional[str]] = {}
+
+    def _remember(self, user_id: int, username: Optional[str]) -> None:
+        """Запомнить username и поставить запись в очередь, если он изменился."""
+        if self._known.get(user_id, _UNKNOWN) == username:
+            self._known.move_to_end(user_id)
+            return
+        
+        self._known[user_id] = username
+        self._known.move_to_end(user_id)
+        self._pending[user_id] = username
+        
+        while len(self._known) > self.max_users:
+            self._known.popitem(last=False)
+
+    async def flush(self) -> None:
+        """Записать накопленные изменения одной транзакцией."""
+        if not self._pending:
+            return
+        
+        pending, self._pending = self._pending, {}
+        db = await acquire_db()
+        try:
+            await db_queries.update_telegram_usernames(db, pending)
+        except Exception:
+            # Возвращаем в очередь всё, что не успело смениться заново
+            for user_id, username in pending.items():
+                self._pending.setdefault(user_id, username)
+            raise
+        finally:
+            await release_db(db)
+
+    async def run(self) -> None:
+        """Фоновая запись очереди раз в flush_interval секунд (до отмены)."""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"❌ Ошибка при обновлении username: {e}")
+        except asyncio.CancelledError:
+            # Дописываем остаток перед остановкой
+            await self.flush()
+            raise
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, (Message, CallbackQuery)) and event.from_user:
+            self._remember(event.from_user.id, event.from_user.username)
+        
+        return await handler(event, data)
@@ -0,0 +1,130 @@
+"""
+Уведомления владельцев заявок о новых запросах на присоединение.
+
+Окно открывается на владельца, а не на заявку. Первый запрос к любой
+из его заявок отправляется сразу, подробным сообщением. Следующие запросы
+в течение окна — к этой же или к другим его заявкам — копятся и уходят
+одним дайджестом со списком ожидающих запросов по всем этим заявкам.
+Пока запросы продолжают приходить, окна идут одно за другим, поэтому
+владелец получает не больше одного сообщения за окно, сколько бы запросов
+и заявок у него ни было.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from aiogram import Bot
+
+from config import NOTIFY_DIGEST_WINDOW
+from database.connection import acquire_db, release_db
+from database import queries as db_queries
+from keyboards.inline import requests_list_kb
+from utils.render import JOIN_REQUESTS_DIGEST, DIGEST_ELEMENT_LINE
+
+logger = logging.getLogger(__name__)
+
+
+class _Window:
+    """Открытое окно уведомлений одного владельца."""
+
+    __slots__ = ("bot", "held", "elements", "task")
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        # Сколько запросов пришло в окне и ещё не попало в дайджест
+        self.held = 0
+        # element_id -> (event_id, event_title) заявок с отложенными запросами
+        self.elements: Dict[int, Tuple[int, str]] = {}
+        self.task: Optional[asyncio.Task] = None
+
+
+class JoinRequestDigest:
+    """Объединение уведомлений о запросах по владельцу заявок."""
+
+    def __init__(self, window: float = NOTIFY_DIGEST_WINDOW):
+        self.window = window
+        self._windows: Dict[int, _Window] = {}
+
+    def add(self, bot: Bot, creator_id: int, element_id: int, event_id: int, event_title: str) -> bool:
+        """
+        Учесть новый запрос к заявке владельца.
+        Возвращает True, если это первый запрос в окне и уведомление
+        нужно отправить сразу; иначе запрос попадёт в дайджест.
+        """
+        window = self._windows.get(creator_id)
+        if window is not None:
+            window.held += 1
+            window.elements[element_id] = (event_id, event_title)
+            return False
+        
+        window = self._windows[creator_id] = _Window(bot)
+        window.task = asyncio.create_task(self._run(creator_id, window))
+        return True
+
+    async def _run(self, creator_id: int, window: _Window) -> None:
+        """Закрывать окна по таймеру, пока в них приходят запросы."""
+        try:
+            while True:
+                await asyncio.sleep(self.window)
+                if not window.held:
+                    break
+                await self._flush(creator_id, window)
+        finally:
+            if self._windows.get(creator_id) is window:
+                del self._windows[creator_id]
+
+    async def _flush(self, creator_id: int, window: _Window) -> None:
+        """Отправить дайджест по накопленным запросам окна."""
+        if not window.held:
+            return
+        
+        held, window.held = window.held, 0
+        elements, window.elements = window.elements, {}
+        try:
+            db = await acquire_db()
+            try:
+                requests = await db_queries.get_pending_requests_for_elements(db, list(elements))
+            finally:
+                await release_db(db)
+            
+            # Всё уже разобрано — напоминать не о чем
+            if not requests:
+                return
+            
+            # Одна заявка — клавиатура ведёт к ней, несколько — в главное меню
+            if len(elements) == 1:
+                (element_id, (event_id, _)), = elements.items()
+            else:
+                element_id = event_id = None
+            
+            elements_text = "\n".join(
+                DIGEST_ELEMENT_LINE(element_id=el_id, event_title=title)
+                for el_id, (_, title) in elements.items()
+            )
+            await window.bot.send_message(
+                creator_id,
+                JOIN_REQUESTS_DIGEST(
+                    count=held,
+                    elements_text=elements_text,
+                    pending=len(requests)
+                ),
+                reply_markup=requests_list_kb(requests, element_id, event_id),
+                parse_mode="HTML"
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка при отправке дайджеста запросов {creator_id}: {e}")
+
+    async def shutdown(self) -> None:
+        """Отправить накопленные дайджесты и закрыть все окна (при остановке бота)."""
+        windows = list(self._windows.items())
+        for _, window in windows:
+            window.task.cancel()
+        await asyncio.gather(*(window.task for _, window in windows), return_exceptions=True)
+        
+        for creator_id, window in windows:
+            await self._flush(creator_id, window)
+        self._windows.clear()
+
+
+join_request_digest = JoinRequestDigest()
@@ -1,41 +1,56 @@
 """
-Планировщик задач для автоматического закрытия турниров.
+Планировщик задач: автоматическое закрытие турниров с уведомлением
+участников, напоминания о завтрашних турнирах, сверка счётчиков
+статистики, истечение запросов на присоединение и фоновая очистка
+удалённых данных.
 """
 
 import asyncio
 import logging
 from datetime import datetime, time, timedelta
+from typing import Dict, List
 
+import broadcast
+from config import (
+    REAPER_BATCH_SIZE, REAPER_INTERVAL, REMINDER_HOUR,
+    REQUEST_EXPIRY_INTERVAL, REQUEST_EXPIRY_BATCH_SIZE
+)
 from database.connection import get_db
 from database import queries as db_queries
+from utils.dates import format_date_ru
+from utils.render import (
+    EVENT_CLOSED_NOTICE, EVENT_REMINDER, EXPIRED_REQUEST_LINE, REQUESTS_EXPIRED_NOTICE
+)
 
 logger = logging.getLogger(__name__)
 
 
 async def close_expired_events_task():
-    """Задача закрытия просроченных турниров."""
+    """
+    Задача закрытия просроченных турниров: закрытие и логи — одной
+    транзакцией, участникам — уведомление через очередь доставки.
+    """
     try:
         db = await get_db()
         try:
             # Текущая дата
             current_date = datetime.now().strftime("%Y-%m-%d")
             
-            # Получаем список турниров для закрытия (для логирования)
-            expired_events = await db_queries.get_expired_events(db, current_date)
+            closed_events = await db_queries.close_expired_events(db, current_date)
             
-            if expired_events:
-                # Закрываем турниры
-                count = await db_queries.close_expired_events(db, current_date)
-                
-                # Логируем каждый закрытый турнир
-                for event in expired_events:
-                    await db_queries.create_log(
-                        db,
-                        "event_auto_closed",
-                        f"event_id={event['event_id']}, title={event['title']}, event_date={event['event_date']}"
-                    )
+            if closed_events:
+                logger.info(f"✅ Автоматически закрыто турниров: {len(closed_events)}")
                 
-                logger.info(f"✅ Автоматически закрыто турниров: {count}")
+                # Один текст на турнир, получатели — одним запросом на все турниры
+                notices = {
+                    event["event_id"]: EVENT_CLOSED_NOTICE(title=event["title"], date=format_date_ru(event["event_date"]))
+                    for event in closed_events
+                }
+                participants = await db_queries.get_events_participants(db, list(notices))
+                queued = broadcast.enqueue(
+                    (user_id, notices[event_id]) for user_id, event_id in participants
+                )
+                logger.info(f"📨 Уведомлений о закрытии в очереди: {queued}")
             else:
                 logger.debug("Нет турниров для автоматического закрытия")
                 
@@ -46,33 +61,91 @@ async def close_expired_events_task():
         logger.error(f"❌ Ошибка при закрытии турниров: {e}")
 
 
+async def event_reminders_task():
+    """Задача напоминаний участникам о завтрашних турнирах."""
+    try:
+        db = await get_db()
+        try:
+            tomorrow = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+            events = await db_queries.get_open_events_on_date(db, tomorrow)
+            
+            if events:
+                reminders = {
+                    event["event_id"]: EVENT_REMINDER(title=event["title"], date=format_date_ru(event["event_date"]))
+                    for event in events
+                }
+                participants = await db_queries.get_events_participants(db, list(reminders))
+                queued = broadcast.enqueue(
+                    (user_id, reminders[event_id]) for user_id, event_id in participants
+                )
+                logger.info(f"⏰ Напоминаний о турнирах на {tomorrow} в очереди: {queued}")
+        finally:
+            await db.close()
+            
+    except Exception as e:
+        logger.error(f"❌ Ошибка при рассылке напоминаний: {e}")
+
+
+async def reconcile_stats_task():
+    """Задача сверки счётчиков панели администратора с таблицами."""
+    try:
+        db = await get_db()
+        try:
+            drift = await db_queries.reconcile_stats(db)
+            
+            for key, (stored, actual) in drift.items():
+                logger.warning(f"⚠️ Счётчик {key} расходился: {stored} → {actual}")
+        finally:
+            await db.close()
+            
+    except Exception as e:
+        logger.error(f"❌ Ошибка при сверке счётчиков: {e}")
+
+
+# Ежедневные задачи: (время запуска, задача) — выполняются в порядке списка
+DAILY_JOBS = (
+    (time(0, 5), close_expired_events_task),
+    (time(0, 5), reconcile_stats_task),
+    (time(REMINDER_HOUR, 0), event_reminders_task),
+)
+
+# Задачи, которые выполняются и сразу при запуске бота
+STARTUP_JOBS = (close_expired_events_task, reconcile_stats_task)
+
+
+def next_run_at(at: time, now: datetime) -> datetime:
+    """Ближайший момент времени at после now."""
+    run = datetime.combine(now.date(), at)
+    if now < run:
+        return run
+    return run + timedelta(days=1)
+
+
 async def scheduler_loop():
     """
     Основной цикл планировщика.
-    Запускает проверку каждый день в 00:05.
+    Запускает каждую задачу из DAILY_JOBS раз в день в её время.
     """
     logger.info("🕐 Планировщик задач запущен")
     
+    now = datetime.now()
+    next_runs = [next_run_at(at, now) for at, _ in DAILY_JOBS]
+    
     while True:
         try:
-            # Вычисляем время до следующего запуска (00:05)
-            now = datetime.now()
-            next_run = datetime.combine(now.date() + timedelta(days=1), time(0, 5))
-            
-            # Если сейчас раньше 00:05, запускаем сегодня
-            today_run = datetime.combine(now.date(), time(0, 5))
-            if now < today_run:
-                next_run = today_run
+            next_run = min(next_runs)
+            wait_seconds = max(0.0, (next_run - datetime.now()).total_seconds())
             
-            wait_seconds = (next_run - now).total_seconds()
-            
-            logger.info(f"⏰ Следующая проверка турниров: {next_run.strftime('%Y-%m-%d %H:%M')}")
+            logger.info(f"⏰ Следующий запуск задач: {next_run.strftime('%Y-%m-%d %H:%M')}")
             
             # Ждём до следующего запуска
             await asyncio.sleep(wait_seconds)
             
-            # Выполняем задачу
-            await close_expired_events_task()
+            # Выполняем все задачи, время которых наступило
+            for i, (at, job) in enumerate(DAILY_JOBS):
+                if next_runs[i] <= next_run:
+                    await job()
+                    next_runs[i] = next_run_at(at, max(datetime.now(), next_runs[i]))
             
         except asyncio.CancelledError:
             logger.info("🛑 Планировщик остановлен")
@@ -86,7 +159,94 @@ async def scheduler_loop():
 async def run_scheduler():
     """Запустить планировщик в фоне."""
     # Сразу выполняем проверку при запуске
-    await close_expired_events_task()
+    for job in STARTUP_JOBS:
+        await job()
     
     # Запускаем цикл
     await scheduler_loop()
+
+
+async def reap_deleted_task():
+    """Задача физического удаления помеченных турниров и аккаунтов."""
+    try:
+        db = await get_db()
+        try:
+            events_rows = await db_queries.reap_deleted_events(db, REAPER_BATCH_SIZE)
+            users_rows = await db_queries.reap_deleted_users(db, REAPER_BATCH_SIZE)
+            
+            if events_rows or users_rows:
+                logger.info(
+                    f"🧹 Очистка: удалено строк турниров — {events_rows}, "
+                    f"пользователей — {users_rows}"
+                )
+        finally:
+            await db.close()
+            
+    except Exception as e:
+        logger.error(f"❌ Ошибка при очистке удалённых данных: {e}")
+
+
+async def run_reaper():
+    """
+    Фоновая очистка: раз в REAPER_INTERVAL секунд дочищает
+    удалённые турниры и аккаунты небольшими порциями.
+    """
+    logger.info("🧹 Фоновая очистка запущена")
+    
+    while True:
+        try:
+            await reap_deleted_task()
+            await asyncio.sleep(REAPER_INTERVAL)
+        except asyncio.CancelledError:
+            logger.info("🛑 Фоновая очистка остановлена")
+            break
+
+
+async def expire_requests_task():
+    """
+    Задача истечения запросов на присоединение: пачками по
+    REQUEST_EXPIRY_BATCH_SIZE, каждому отправителю — одно уведомление
+    обо всех его истёкших запросах.
+    """
+    # requester_id -> строки истёкших запросов
+    lapsed: Dict[int, List[str]] = {}
+    try:
+        db = await get_db()
+        try:
+            while True:
+                expired = await db_queries.expire_old_requests(db, REQUEST_EXPIRY_BATCH_SIZE)
+                for request in expired:
+                    lapsed.setdefault(request["requester_id"], []).append(EXPIRED_REQUEST_LINE(
+                        element_id=request["element_id"],
+                        event_title=request["event_title"] or "?"
+                    ))
+                if len(expired) < REQUEST_EXPIRY_BATCH_SIZE:
+                    break
+        finally:
+            await db.close()
+    except Exception as e:
+        logger.error(f"❌ Ошибка при истечении запросов: {e}")
+    
+    # Пачки до ошибки уже закоммичены и повторно не выберутся — уведомляем о них в любом случае
+    if lapsed:
+        broadcast.enqueue(
+            (requester_id, REQUESTS_EXPIRED_NOTICE(requests_text="\n".join(lines)))
+            for requester_id, lines in lapsed.items()
+        )
+        logger.info(
+            f"⌛ Истекло запросов: {sum(map(len, lapsed.values()))}, "
+            f"уведомлено отправителей: {len(lapsed)}"
+        )
+
+
+async def run_request_expiry():
+    """Раз в REQUEST_EXPIRY_INTERVAL секунд помечать просроченные запросы истёкшими."""
+    logger.info("⌛ Истечение запросов запущено")
+    
+    while True:
+        try:
+            await expire_requests_task()
+            await asyncio.sleep(REQUEST_EXPIRY_INTERVAL)
+        except asyncio.CancelledError:
+            logger.info("🛑 Истечение запросов остановлено")
+            break
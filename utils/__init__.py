@@ -0,0 +1,3 @@
+"""
+Вспомогательные модули, общие для хэндлеров, клавиатур и слоя БД.
+"""
@@ -0,0 +1,150 @@
+"""
+Маршрутизация callback-запросов по префиксу callback_data.
+
+callback_data имеет вид "prefix:arg1:arg2", где prefix может состоять
+из нескольких сегментов ("confirm:delete_element"). Хэндлеры роутера
+CallbackRouter индексируются в дереве префиксов по сегментам, поэтому
+апдейт проверяет только хэндлеры своего префикса, а не все подряд.
+Аргументы разбирает фильтр CallbackPrefix и передаёт в хэндлер по имени.
+"""
+
+from typing import Any, Dict, List, Optional, Union
+
+from aiogram import Router
+from aiogram.dispatcher.event.bases import UNHANDLED, SkipHandler
+from aiogram.dispatcher.event.handler import CallbackType, HandlerObject
+from aiogram.dispatcher.event.telegram import TelegramEventObserver
+from aiogram.filters import Filter
+from aiogram.types import CallbackQuery, TelegramObject
+
+SEPARATOR = ":"
+
+
+class CallbackPrefix(Filter):
+    """
+    Фильтр callback_data по префиксу с разбором аргументов.
+
+    CallbackPrefix("back_admin") — точное совпадение;
+    CallbackPrefix("view_element", element_id=int) — "view_element:15",
+    хэндлер получает element_id=15. Последний аргумент забирает остаток
+    строки целиком. Если аргумент не приводится к типу — фильтр не проходит.
+    """
+
+    def __init__(self, prefix: str, **arg_types: type):
+        self.prefix = prefix
+        self.path = tuple(prefix.split(SEPARATOR))
+        self.arg_types = arg_types
+        self._head = prefix + SEPARATOR
+
+    def parse(self, data: str) -> Optional[Dict[str, Any]]:
+        """Разобрать callback_data. Возвращает аргументы или None, если не подходит."""
+        if not self.arg_types:
+            return {} if data == self.prefix else None
+        if not data.startswith(self._head):
+            return None
+        
+        values = data[len(self._head):].split(SEPARATOR, len(self.arg_types) - 1)
+        if len(values) != len(self.arg_types):
+            return None
+        try:
+            return {
+                name: arg_type(value)
+                for (name, arg_type), value in zip(self.arg_types.items(), values)
+            }
+        except ValueError:
+            return None
+
+    async def __call__(self, callback: CallbackQuery) -> Union[bool, Dict[str, Any]]:
+        args = self.parse(callback.data or "")
+        if args is None:
+            return False
+        # Пустой словарь aiogram считает непройденным фильтром
+        return args or True
+
+    def __str__(self) -> str:
+        return self._signature_to_string(self.prefix, **self.arg_types)
+
+
+class _PrefixNode:
+    """Узел дерева префиксов: дочерние сегменты и хэндлеры этого префикса."""
+
+    __slots__ = ("children", "handlers")
+
+    def __init__(self):
+        self.children: Dict[str, "_PrefixNode"] = {}
+        self.handlers: List[HandlerObject] = []
+
+
+class PrefixCallbackObserver(TelegramEventObserver):
+    """
+    Наблюдатель callback_query, который выбирает хэндлеры по префиксу
+    callback_data за O(длина префикса) вместо перебора всех хэндлеров.
+    Остальные фильтры (состояние FSM, владелец бота) проверяются как обычно,
+    но только у хэндлеров с подходящим префиксом.
+    """
+
+    def __init__(self, router: Router, event_name: str):
+        super().__init__(router=router, event_name=event_name)
+        self._root = _PrefixNode()
+
+    def register(
+        self,
+        callback: CallbackType,
+        *filters: CallbackType,
+        flags: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> CallbackType:
+        prefix = next((f for f in filters if isinstance(f, CallbackPrefix)), None)
+        if prefix is None:
+            raise ValueError(
+                f"Хэндлер {callback.__name__} должен иметь фильтр CallbackPrefix"
+            )
+        
+        super().register(callback, *filters, flags=flags, **kwargs)
+        
+        node = self._root
+        for segment in prefix.path:
+            node = node.children.setdefault(segment, _PrefixNode())
+        node.handlers.append(self.handlers[-1])
+        return callback
+
+    def candidates(self, data: str) -> List[HandlerObject]:
+        """Хэндлеры, префикс которых совпадает с началом data (сначала самые длинные)."""
+        found: List[List[HandlerObject]] = []
+        node = self._root
+        for segment in data.split(SEPARATOR):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            if node.handlers:
+                found.append(node.handlers)
+        
+        if len(found) == 1:
+            return found[0]
+        return [handler for handlers in reversed(found) for handler in handlers]
+
+    async def trigger(self, event: TelegramObject, **kwargs: Any) -> Any:
+        for handler in self.candidates(getattr(event, "data", None) or ""):
+            kwargs["handler"] = handler
+            result, data = await handler.check(event, **kwargs)
+            if result:
+                kwargs.update(data)
+                try:
+                    wrapped_inner = self.outer_middleware.wrap_middlewares(
+                        self._resolve_middlewares(),
+                        handler.call,
+                    )
+                    return await wrapped_inner(event, kwargs)
+                except SkipHandler:
+                    continue
+        
+        return UNHANDLED
+
+
+class CallbackRouter(Router):
+    """Router, у которого callback_query маршрутизируется по префиксу (CallbackPrefix)."""
+
+    def __init__(self, *, name: Optional[str] = None):
+        super().__init__(name=name)
+        self.callback_query = PrefixCallbackObserver(router=self, event_name="callback_query")
+        self.observers["callback_query"] = self.callback_query
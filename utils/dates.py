@@ -0,0 +1,90 @@
+"""
+Работа с датами турниров (формат YYYY-MM-DD).
+
+Каждая строка даты разбирается один раз: разбор и форматирование
+кэшируются. Бейджи «через N дней» зависят от текущего дня, поэтому
+их кэш ключуется парой (дата, сегодня) и очищается после полуночи.
+"""
+
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+
+# Размер кэшей разбора и форматирования дат
+DATE_CACHE_SIZE = 1024
+
+MONTHS_RU = [
+    "", "января", "февраля", "марта", "апреля", "мая", "июня",
+    "июля", "августа", "сентября", "октября", "ноября", "декабря"
+]
+
+# День, для которого накоплен кэш бейджей
+_badges_day: Optional[date] = None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_date(date_str: str) -> Optional[date]:
+    """Разобрать дату YYYY-MM-DD. Возвращает None для пустой или некорректной строки."""
+    if not date_str:
+        return None
+    try:
+        return date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def format_date_ru(date_str: str) -> str:
+    """Форматировать дату в русский формат."""
+    if not date_str:
+        return "Не указана"
+    dt = parse_date(date_str)
+    if dt is None:
+        return date_str
+    return f"{dt.day} {MONTHS_RU[dt.month]} {dt.year}"
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def format_date_short(date_str: str) -> str:
+    """Короткий формат даты: ДД.ММ (пустая строка, если даты нет)."""
+    dt = parse_date(date_str)
+    if dt is None:
+        return ""
+    return f"{dt.day:02d}.{dt.month:02d}"
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _days_until(date_str: str, today: date) -> str:
+    event_date = parse_date(date_str)
+    if event_date is None:
+        return ""
+    delta = (event_date - today).days
+
+    if delta == 0:
+        return "Сегодня"
+    elif delta == 1:
+        return "Завтра"
+    elif delta < 0:
+        return "Прошёл"
+    elif delta <= 7:
+        return f"Через {delta}д"
+    elif delta <= 30:
+        return f"{delta}д"
+    else:
+        # Для дальних дат показываем саму дату
+        return format_date_short(date_str)
+
+
+def get_days_until(date_str: str, today: Optional[date] = None) -> str:
+    """Получить текст о количестве дней до события (компактный формат)."""
+    global _badges_day
+
+    if not date_str:
+        return ""
+    if today is None:
+        today = date.today()
+        # Наступил новый день — бейджи за прошлые дни больше не понадобятся
+        if today != _badges_day:
+            _days_until.cache_clear()
+            _badges_day = today
+    return _days_until(date_str, today)
@@ -0,0 +1,116 @@
+"""
+Редактирование сообщений бота без лишних запросов к Telegram API.
+
+Для каждого сообщения (chat_id, message_id) запоминается отпечаток
+последнего отрисованного содержимого: хэш текста с параметрами и хэш
+клавиатуры. Если экран перерисовывается тем же содержимым, запрос
+к API не отправляется. Все правки сообщений идут через эти функции,
+поэтому отпечаток всегда соответствует тому, что видит пользователь.
+"""
+
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, Message
+
+# Для скольких сообщений помнить отрисованное содержимое
+RENDERED_CACHE_SIZE = 4096
+
+# (chat_id, message_id) -> (хэш текста или None, если неизвестен; хэш клавиатуры)
+_rendered: "OrderedDict[Tuple[int, int], Tuple[Optional[int], int]]" = OrderedDict()
+
+
+def _text_hash(text: str, options: dict) -> int:
+    return hash((text, repr(sorted(options.items()))))
+
+
+def _markup_hash(reply_markup: Optional[InlineKeyboardMarkup]) -> int:
+    if reply_markup is None:
+        return hash(None)
+    return hash(reply_markup.model_dump_json(exclude_none=True))
+
+
+def _remember(message: Message, rendered: Tuple[Optional[int], int]) -> None:
+    key = (message.chat.id, message.message_id)
+    _rendered[key] = rendered
+    _rendered.move_to_end(key)
+    while len(_rendered) > RENDERED_CACHE_SIZE:
+        _rendered.popitem(last=False)
+
+
+def _is_rendered(message: Message, rendered: Tuple[Optional[int], int]) -> bool:
+    key = (message.chat.id, message.message_id)
+    if _rendered.get(key) != rendered:
+        return False
+    _rendered.move_to_end(key)
+    return True
+
+
+def _not_modified(error: TelegramBadRequest) -> bool:
+    """Telegram отклонил правку, потому что содержимое не изменилось."""
+    return "message is not modified" in str(error)
+
+
+async def send_text(
+    target: Message,
+    text: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    **kwargs: Any
+) -> Message:
+    """Отправить сообщение в чат target и запомнить его содержимое."""
+    sent = await target.answer(text, reply_markup=reply_markup, **kwargs)
+    _remember(sent, (_text_hash(text, kwargs), _markup_hash(reply_markup)))
+    return sent
+
+
+async def edit_text(
+    message: Message,
+    text: str,
+    reply_markup: Optional[InlineKeyboardMarkup] = None,
+    **kwargs: Any
+) -> bool:
+    """
+    Отредактировать текст и клавиатуру сообщения.
+    Возвращает False, если содержимое не изменилось и правка не отправлялась.
+    """
+    rendered = (_text_hash(text, kwargs), _markup_hash(reply_markup))
+    if _is_rendered(message, rendered):
+        return False
+    
+    try:
+        await message.edit_text(text, reply_markup=reply_markup, **kwargs)
+    except TelegramBadRequest as e:
+        if not _not_modified(e):
+            raise
+        _remember(message, rendered)
+        return False
+    
+    _remember(message, rendered)
+    return True
+
+
+async def edit_reply_markup(
+    message: Message,
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+) -> bool:
+    """
+    Заменить только клавиатуру сообщения.
+    Возвращает False, если клавиатура не изменилась и правка не отправлялась.
+    """
+    key = (message.chat.id, message.message_id)
+    text_hash = _rendered[key][0] if key in _rendered else None
+    rendered = (text_hash, _markup_hash(reply_markup))
+    if _is_rendered(message, rendered):
+        return False
+    
+    try:
+        await message.edit_reply_markup(reply_markup=reply_markup)
+    except TelegramBadRequest as e:
+        if not _not_modified(e):
+            raise
+        _remember(message, rendered)
+        return False
+    
+    _remember(message, rendered)
+    return True
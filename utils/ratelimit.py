@@ -0,0 +1,83 @@
+"""
+Ограничение частоты запросов по алгоритму token bucket.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class TokenBucket:
+    """
+    Ведро токенов: rate токенов в секунду, не больше capacity.
+    Каждый запрос забирает один токен.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def consume(self, now: Optional[float] = None) -> bool:
+        """Забрать токен. Возвращает False, если ведро пустое."""
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """Через сколько секунд появится следующий токен."""
+        self._refill(time.monotonic() if now is None else now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_idle(self, now: float) -> bool:
+        """Ведро успело заполниться — его можно забыть без потери состояния."""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    """
+    Набор вёдер по ключу (например, user_id) с вытеснением простаивающих.
+    Вёдра хранятся в порядке последнего обращения; полностью заполнившиеся
+    удаляются — новое ведро для того же ключа ведёт себя так же.
+    """
+
+    def __init__(self, rate: float, capacity: float, max_size: int = 100_000):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_size = max_size
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _evict(self, now: float) -> None:
+        while self._buckets:
+            bucket = next(iter(self._buckets.values()))
+            if not bucket.is_idle(now) and len(self._buckets) < self.max_size:
+                break
+            self._buckets.popitem(last=False)
+
+    def allow(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """Разрешить запрос для ключа (и списать токен)."""
+        if now is None:
+            now = time.monotonic()
+        self._evict(now)
+        
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity, now)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.consume(now)
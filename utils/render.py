@@ -0,0 +1,196 @@
+"""
+Сборка текстов сообщений.
+
+Шаблоны разбираются один раз при импорте (связанный метод str.format),
+строки участников кэшируются по содержимому профиля: если имя, пол или
+рейтинг изменились — это другой ключ, устаревшая строка просто вытесняется.
+Списки собираются через join, без += в цикле.
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Сколько отформатированных строк участников держать в кэше
+MEMBER_CACHE_SIZE = 4096
+
+GENDER_ICONS = {"male": "👨", "female": "👩"}
+DEFAULT_GENDER_ICON = "👤"
+
+
+# ==================== ШАБЛОНЫ ====================
+
+_MEMBER_LINE = "{icon} {name} — рейтинг: {rating}".format
+_MEMBER_LINE_BOLD = "{icon} <b>{name}</b> — рейтинг: {rating}".format
+_CONTACT_LINE = "\n   📱 Контакт: {contact}".format
+_CONTACT_LINK = "<a href='tg://user?id={user_id}'>написать</a>".format
+
+EVENT_DETAILS = (
+    "📌 <b>{title}</b>{owner_text}\n\n"
+    "🎯 Тип: {type_label}\n"
+    "{date_line}\n"
+    "📝 Описание: {description}\n"
+    "📊 Статус: {status_label}\n\n"
+    "📈 <b>Статистика:</b>\n"
+    "• Активных заявок: {active_elements}\n"
+    "• Сформированных групп: {total_groups}\n"
+    "• Участников в группах: {users_in_groups}\n"
+    "• Ожидающих запросов: {pending_requests}\n\n"
+    "🆔 ID: <code>{event_id}</code>"
+).format
+
+GROUP_PAIR_DETAILS = (
+    "✅ <b>Сформированная пара</b>\n\n"
+    "📌 Турнир: {event_title}\n"
+    "{date_line}\n\n"
+    "⭐ Средний рейтинг: {avg_rating}\n\n"
+    "👥 <b>Участники:</b>\n"
+    "{members_text}\n\n"
+    "💬 Свяжитесь с партнёром для координации!\n"
+    "🆔 Группа: <code>{group_id}</code>"
+).format
+
+GROUP_TEAM_DETAILS = (
+    "✅ <b>Сформированная команда</b>\n\n"
+    "📌 Турнир: {event_title}\n"
+    "{date_line}\n\n"
+    "⭐ Средний рейтинг команды: {avg_rating}\n"
+    "👥 Участников: {members_count}\n\n"
+    "<b>Участники:</b>\n"
+    "{members_text}\n\n"
+    "💬 Свяжитесь с командой для координации!\n"
+    "🆔 Группа: <code>{group_id}</code>"
+).format
+
+GROUP_LIST_LINE = "{index}. ⭐ {avg_rating} — {names}".format
+
+ADMIN_PANEL = (
+    "🔐 <b>Панель администратора</b>\n\n"
+    "📊 <b>Статистика:</b>\n"
+    "• Пользователей: {users}\n"
+    "• Турниров: {events_total} (открытых: {events_open}, закрытых: {events_closed})\n"
+    "• Сформированных групп: {groups}\n"
+    "• В чёрном списке: {blacklist}\n"
+).format
+
+JOIN_REQUESTS_DIGEST = (
+    "📨 <b>Новые запросы на присоединение: {count}</b>\n\n"
+    "К вашим заявкам:\n"
+    "{elements_text}\n"
+    "Всего ожидают ответа: {pending}\n\n"
+    "Выберите запрос, чтобы принять или отклонить:"
+).format
+
+DIGEST_ELEMENT_LINE = "• #{element_id} в турнире «{event_title}»".format
+
+EVENT_REMINDER = (
+    "⏰ <b>Напоминание</b>\n\n"
+    "Завтра, {date}, — турнир «{title}».\n"
+    "Удачной игры!"
+).format
+
+EVENT_CLOSED_NOTICE = (
+    "🔒 <b>Турнир закрыт</b>\n\n"
+    "Турнир «{title}» ({date}) завершён, приём заявок закрыт.\n"
+    "Спасибо за участие!"
+).format
+
+REQUESTS_EXPIRED_NOTICE = (
+    "⌛ <b>Истёк срок ваших запросов на присоединение</b>\n\n"
+    "{requests_text}\n\n"
+    "Владельцы заявок не успели ответить. Можно отправить запрос заново или найти другую заявку."
+).format
+
+EXPIRED_REQUEST_LINE = "• Заявка #{element_id} — турнир «{event_title}»".format
+
+BROADCAST_REPORT = (
+    "📣 <b>Рассылка #{broadcast_id} завершена</b>\n\n"
+    "✅ Отправлено: {sent_count}\n"
+    "🚫 Заблокировали бота: {blocked_count}\n"
+    "⚠️ Ошибок: {failed_count}"
+).format
+
+BROADCAST_LINE = (
+    "#{broadcast_id} {status_label} — {audience}\n"
+    "   ✅ {sent_count}  🚫 {blocked_count}  ⚠️ {failed_count}"
+).format
+
+USER_CHECK_HEADER = (
+    "🔍 <b>Информация о пользователе</b>\n\n"
+    "🆔 ID: <code>{user_id}</code>\n"
+).format
+
+USER_CHECK_PROFILE = (
+    "👤 Имя: {username}\n"
+    "📱 Telegram: {telegram_text}\n"
+    "🚻 Пол: {gender}\n"
+    "📊 Рейтинг: {rating_text}\n"
+    "📅 Регистрация: {created_at}\n"
+    "\n📈 <b>Статистика:</b>\n"
+    "• Создано турниров: {events_owned}\n"
+    "• Активных элементов: {active_elements}\n"
+    "• Сформированных групп: {groups}\n"
+).format
+
+USER_CHECK_BANNED = (
+    "\n🚫 <b>ЗАБЛОКИРОВАН</b>\n"
+    "📝 Причина: {reason}\n"
+    "📅 Дата: {banned_at}\n"
+    "👮 Заблокировал: {admin_name}\n"
+).format
+
+
+# ==================== УЧАСТНИКИ ====================
+
+def gender_icon(gender: Optional[str]) -> str:
+    """Иконка пола."""
+    return GENDER_ICONS.get(gender, DEFAULT_GENDER_ICON)
+
+
+def contact_text(member: Dict[str, Any]) -> str:
+    """Контакт участника: @username или ссылка на личные сообщения."""
+    telegram_username = member.get("telegram_username")
+    if telegram_username:
+        return f"@{telegram_username}"
+    return _CONTACT_LINK(user_id=member["user_id"])
+
+
+@lru_cache(maxsize=MEMBER_CACHE_SIZE)
+def _member_line(user_id: Optional[int], username: Optional[str], gender: Optional[str],
+                 rating: Optional[float], bold: bool) -> str:
+    template = _MEMBER_LINE_BOLD if bold else _MEMBER_LINE
+    return template(
+        icon=gender_icon(gender),
+        name=username or "Без имени",
+        rating=int(rating or 0)
+    )
+
+
+def member_line(member: Dict[str, Any], bold: bool = False) -> str:
+    """Строка участника: иконка пола, имя и рейтинг."""
+    return _member_line(
+        member.get("user_id"),
+        member.get("username"),
+        member.get("gender"),
+        member.get("rating"),
+        bold
+    )
+
+
+def member_contact_line(member: Dict[str, Any], is_current_user: bool = False) -> str:
+    """Строка участника с контактом (для себя — пометка «вы» вместо контакта)."""
+    line = member_line(member, bold=True)
+    if is_current_user:
+        return line + " (вы)"
+    return line + _CONTACT_LINE(contact=contact_text(member))
+
+
+# ==================== СПИСКИ ====================
+
+def bullet_list(
+    items: Iterable[Any],
+    render: Callable[[Any], str] = member_line,
+    empty: str = ""
+) -> str:
+    """Маркированный список: по строке «• ...» на элемент, empty — для пустого."""
+    text = "\n".join(["• " + render(item) for item in items])
+    return text or empty